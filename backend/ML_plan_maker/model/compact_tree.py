@@ -0,0 +1,249 @@
+"""
+Pickle free format for the plan generator's decision trees.
+
+A tree is stored as a directory of flat NumPy arrays (one .npy file each):
+    feature.npy         int32   (nodes,)            feature tested at each node, -2 at leaves
+    threshold.npy       float64 (nodes,)            go left when the feature value is <= threshold
+    children.npy        int32   (nodes, 2)          left and right child of each node, -1 at leaves
+    values.npy          (nodes, outputs)            what the tree predicts at each node
+
+A model directory holds a manifest.json (format version, kind, feature names, sizes), lift_names.npy and its trees, in one of two kinds:
+    combination     one tree with two outputs (the original train.py model): the lift combination, as an index into lift_names of the
+                    combinations some node predicts, and the reps class. Every distinct lift combination is a class.
+    multilabel      lifts/ tree whose values are the probability of each lift in lift_names (one output per lift, so the model grows
+                    with the catalog rather than the training data) and a reps/ regression tree. A plan is the k most likely lifts,
+                    k being the expected number of lifts at the leaf (the sum of its probabilities).
+
+.npy files can be memory mapped, so worker processes loading the same model share its pages instead of each unpickling a copy,
+and serving only needs NumPy: predictions walk the arrays for a whole batch at once.
+
+Exporting needs the trained sklearn models (and so sklearn); loading and predicting do not.
+
+From backend run (converts the original pickles):
+    py -m ML_plan_maker.model.compact_tree /tmp/converted_tree
+"""
+import json
+import os
+import sys
+import numpy as np
+
+FORMAT_VERSION = 2
+BASE_DIR = os.path.dirname(os.path.dirname(os.path.abspath(__file__)))
+MODEL_DIR = os.path.join(BASE_DIR, 'saved_models', 'decision_tree') # model bundled with the backend
+PICKLED_MODEL_PATH = os.path.join(BASE_DIR, 'saved_models', 'decision_tree_model.pkl')
+PICKLED_ENCODER_PATH = os.path.join(BASE_DIR, 'saved_models', 'label_encoder.pkl')
+OUTPUT_NAMES = ['Lifts', 'Reps'] # combination model targets
+
+LEAF = -1 # sklearn's TREE_LEAF
+
+
+def split_lift_names(names):
+    """
+    Lift names of a combination, which are semicolon separated.
+    """
+    return tuple(name.strip() for name in str(names).split(';') if name.strip())
+
+
+# ----- EXPORT --------
+
+def save_tree(tree, values, path):
+    """
+    Writes a fitted sklearn tree's structure (model.tree_) and per node values to path.
+    """
+    os.makedirs(path, exist_ok=True)
+    np.save(os.path.join(path, 'feature.npy'), tree.feature.astype(np.int32))
+    np.save(os.path.join(path, 'threshold.npy'), tree.threshold.astype(np.float64))
+    np.save(os.path.join(path, 'children.npy'), np.column_stack([tree.children_left, tree.children_right]).astype(np.int32))
+    np.save(os.path.join(path, 'values.npy'), values)
+
+
+def write_manifest(path, manifest):
+    with open(os.path.join(path, 'manifest.json'), 'w') as file:
+        json.dump({"format_version": FORMAT_VERSION, **manifest}, file, indent=2)
+    return manifest
+
+
+def feature_names_of(model):
+    return [str(name) for name in getattr(model, 'feature_names_in_', range(model.n_features_in_))]
+
+
+def export_tree(model, label_encoder, path=MODEL_DIR):
+    """
+    Writes a fitted combination DecisionTreeClassifier (Lifts, Reps outputs) and the lift label encoder to path.
+    Only the lift combinations some node predicts are kept: the encoder can hold millions that no prediction uses.
+    """
+    tree = model.tree_
+    classes = model.classes_ if isinstance(model.classes_, list) else [model.classes_]
+    # Per output, the class with the most weight at each node, as DecisionTreeClassifier.predict picks it
+    values = np.column_stack([
+        np.asarray(output_classes, dtype=np.float64)[np.argmax(tree.value[:, output, :len(output_classes)], axis=1)]
+        for output, output_classes in enumerate(classes)
+    ])
+    lift_codes, values[:, 0] = np.unique(values[:, 0].astype(np.int64), return_inverse=True)
+
+    save_tree(tree, values, path)
+    np.save(os.path.join(path, 'lift_names.npy'), np.asarray(label_encoder.classes_)[lift_codes].astype(str))
+    return write_manifest(path, {
+        "kind": "combination",
+        "feature_names": feature_names_of(model),
+        "output_names": OUTPUT_NAMES[:len(classes)],
+        "node_count": int(tree.node_count),
+    })
+
+
+def lift_probabilities(model):
+    """
+    (nodes, lifts) probability of each lift at each node of a fitted multilabel DecisionTreeClassifier (one 0/1 output per lift).
+    """
+    value = model.tree_.value
+    totals = value.sum(axis=2)
+    probabilities = np.zeros(value.shape[:2], dtype=np.float64)
+    for output, output_classes in enumerate(model.classes_):
+        present = np.flatnonzero(np.asarray(output_classes) == 1)
+        if present.size: # a lift seen in every or no training row has a single class
+            probabilities[:, output] = value[:, output, present[0]] / totals[:, output]
+    return probabilities
+
+
+def export_multilabel(lift_model, reps_model, lift_names, path=MODEL_DIR):
+    """
+    Writes a fitted multilabel lift DecisionTreeClassifier, its lift names (one per output) and a reps DecisionTreeRegressor to path.
+    """
+    save_tree(lift_model.tree_, lift_probabilities(lift_model).astype(np.float32), os.path.join(path, 'lifts'))
+    save_tree(reps_model.tree_, reps_model.tree_.value[:, :, 0].astype(np.float64), os.path.join(path, 'reps'))
+    np.save(os.path.join(path, 'lift_names.npy'), np.asarray(lift_names).astype(str))
+    return write_manifest(path, {
+        "kind": "multilabel",
+        "feature_names": feature_names_of(lift_model),
+        "lift_count": len(lift_names),
+        "node_count": int(lift_model.tree_.node_count + reps_model.tree_.node_count),
+    })
+
+
+# ----- INFERENCE --------
+
+class TreeArrays:
+    """
+    One exported tree. With mmap the arrays are read only views of the files.
+    """
+    def __init__(self, path, mmap=True):
+        mmap_mode = 'r' if mmap else None
+        load = lambda name: np.load(os.path.join(path, f'{name}.npy'), mmap_mode=mmap_mode, allow_pickle=False)
+        self.feature = load('feature')
+        self.threshold = load('threshold')
+        self.children = load('children')
+        self.values = load('values')
+
+    def apply(self, X):
+        """
+        Leaf index each row of X (samples, features) ends in. All rows step down one level per iteration.
+        """
+        X = np.asarray(X, dtype=np.float32) # sklearn compares float32 features with float64 thresholds
+        rows = np.arange(len(X))
+        node = np.zeros(len(X), dtype=np.int32)
+        active = self.children[node, 0] != LEAF
+        while active.any():
+            at = node[active]
+            go_right = X[rows[active], self.feature[at]] > self.threshold[at]
+            node[active] = self.children[at, go_right.astype(np.intp)]
+            active = self.children[node, 0] != LEAF
+        return node
+
+    def predict(self, X):
+        return self.values[self.apply(X)]
+
+
+def read_manifest(path):
+    with open(os.path.join(path, 'manifest.json')) as file:
+        manifest = json.load(file)
+    if manifest.get("format_version") != FORMAT_VERSION:
+        raise ValueError(f"Unsupported model format version {manifest.get('format_version')} in {path}")
+    return manifest
+
+
+class CompactTree(TreeArrays):
+    """
+    A combination model loaded from export_tree's arrays. predict() returns (samples, 2): an index into lift_names and the reps.
+    """
+    def __init__(self, path=MODEL_DIR, mmap=True):
+        self.manifest = read_manifest(path)
+        super().__init__(path, mmap)
+        self.lift_names = np.load(os.path.join(path, 'lift_names.npy'), mmap_mode='r' if mmap else None, allow_pickle=False)
+        self.feature_names = self.manifest["feature_names"]
+
+    def predict_plans(self, X):
+        """
+        (lift names, reps) planned for each row of X.
+        """
+        return [
+            (split_lift_names(self.lift_names[int(lift_index)]), int(reps))
+            for lift_index, reps in self.predict(X).tolist()
+        ]
+
+
+def top_lifts(probabilities):
+    """
+    Boolean (samples, lifts) mask of the lifts planned for rows of lift probabilities: the k most likely, k being the rounded sum
+    of the row's probabilities (at least one). Ties go to the lift listed first.
+    """
+    probabilities = np.asarray(probabilities)
+    count = np.clip(np.rint(probabilities.sum(axis=1)).astype(np.intp), 1, probabilities.shape[1])
+    order = np.argsort(-probabilities, axis=1, kind='stable')
+    rank = np.empty(probabilities.shape, dtype=np.intp)
+    np.put_along_axis(rank, order, np.arange(probabilities.shape[1])[None, :], axis=1)
+    return rank < count[:, None]
+
+
+class MultiLabelTree:
+    """
+    A multilabel model loaded from export_multilabel's arrays: lift probabilities and reps are separate trees.
+    """
+    def __init__(self, path=MODEL_DIR, mmap=True):
+        self.manifest = read_manifest(path)
+        self.lifts = TreeArrays(os.path.join(path, 'lifts'), mmap)
+        self.reps = TreeArrays(os.path.join(path, 'reps'), mmap)
+        self.lift_names = np.load(os.path.join(path, 'lift_names.npy'), mmap_mode='r' if mmap else None, allow_pickle=False)
+        self.feature_names = self.manifest["feature_names"]
+
+    def predict_plans(self, X):
+        """
+        (lift names, reps) planned for each row of X, most likely lift first.
+        """
+        probabilities = self.lifts.predict(X)
+        planned = top_lifts(probabilities)
+        order = np.argsort(-probabilities, axis=1, kind='stable')
+        reps = np.rint(self.reps.predict(X)[:, 0]).astype(int)
+        return [
+            (tuple(str(self.lift_names[lift]) for lift in row_order if row_planned[lift]), row_reps)
+            for row_order, row_planned, row_reps in zip(order.tolist(), planned.tolist(), reps.tolist())
+        ]
+
+
+MODEL_KINDS = {"combination": CompactTree, "multilabel": MultiLabelTree}
+
+
+def load_model(path=MODEL_DIR, mmap=True):
+    """
+    The exported model in path, of whichever kind its manifest names.
+    """
+    kind = read_manifest(path).get("kind", "combination")
+    if kind not in MODEL_KINDS:
+        raise ValueError(f"Unknown model kind '{kind}' in {path}")
+    return MODEL_KINDS[kind](path, mmap)
+
+
+def main():
+    import pickle
+
+    if len(sys.argv) != 2:
+        sys.exit("usage: py -m ML_plan_maker.model.compact_tree OUTPUT_DIR")
+    with open(PICKLED_MODEL_PATH, 'rb') as file:
+        model = pickle.load(file)
+    with open(PICKLED_ENCODER_PATH, 'rb') as file:
+        label_encoder = pickle.load(file)
+    manifest = export_tree(model, label_encoder, sys.argv[1])
+    print(f"Exported {manifest['node_count']} nodes to '{sys.argv[1]}'.")
+
+
+if __name__ == "__main__":
+    main()
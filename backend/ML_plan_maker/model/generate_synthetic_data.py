@@ -1,110 +1,182 @@
-import random
+"""
+Synthetic training data for the plan generator: random goal and body part selections with the lifts and reps a plan for them gets.
+
+Each row picks one lift from every targeted body part, then fills up to LIFTS_PER_PLAN distinct lifts from the targeted body parts'
+other lifts. Reps come from the goal's rep range. Rows are generated in chunks with NumPy, each chunk from its own child of one
+seed (the output only depends on the seed, rows and chunk size, not on the number of workers), by a process pool that writes every
+chunk to disk, so memory stays bounded by workers x chunk size whatever the row count.
+
+Lifts are read from a CSV file with name and targeted_area columns, or from the lifts table of a SQLite database (the app's by default).
+
+From backend run:
+    py -m ML_plan_maker.model.generate_synthetic_data                                  1000 rows to data/Synthetic_data_FF.csv
+    py -m ML_plan_maker.model.generate_synthetic_data --rows 20000000 --workers 8 --format parquet --output /tmp/synthetic
+"""
+import argparse
+import csv
+import os
+import shutil
 import sqlite3
-import pandas as pd
-
-# Connect to the SQLite database
-conn = sqlite3.connect('../../instance/fitness_app.db')
-cursor = conn.cursor()
-
-# Get all lifts and targeted area 
-cursor.execute("SELECT name, targeted_area FROM Lifts")
-lifts_data = cursor.fetchall()
-
-# Organize the lifts by target area
-exercises = {
-    "Legs": [],
-    "Chest": [],
-    "Arms": [],
-    "Back": [],
-    "Full Body": []
-}
+import tempfile
+from concurrent.futures import ProcessPoolExecutor
+import numpy as np
 
-# Loop through the data and organize by target area before closing connection
-for lift_name, target_area in lifts_data:
-    if target_area in exercises:
-        exercises[target_area].append(lift_name)
+BASE_DIR = os.path.dirname(os.path.dirname(os.path.abspath(__file__)))
+DEFAULT_OUTPUT = os.path.join(BASE_DIR, 'data', 'Synthetic_data_FF.csv')
+DEFAULT_LIFTS = os.path.join(os.path.dirname(BASE_DIR), 'instance', 'fitness_app.db')
 
-# Close the connection
-conn.close()
+BODY_PARTS = ['Legs', 'Chest', 'Arms', 'Back', 'Full Body'] # feature order after Goal, as predict.py expects
+COLUMNS = ['Goal', *BODY_PARTS, 'Lifts', 'Reps']
+LIFTS_PER_PLAN = 6
 
-# Rep ranges based on the goal - low range for strenght with higher weight and high range with hypertrophy
-rep_ranges = {
+# Rep ranges based on the goal - low range for strength with higher weight and high range with hypertrophy
+REP_RANGES = {
     1: (4, 6), # Strength
     0: (8, 14), # Hypertrophy
 }
 
-def generate_synthetic_data(num_samples):
-    data = []
-    
-    for _ in range(num_samples):
-        while True:  # Repeat until valid data is generated
-            # Randomly choosing strength or hypertrophy and other body parts being targeted
-            goal = random.choice([0, 1])
-            legs = random.choice([0, 1])
-            chest = random.choice([0, 1])
-            arms = random.choice([0, 1])
-            back = random.choice([0, 1])
-            full_body = random.choice([0, 1])
-
-            # Ensure at least one body part is targeted
-            if legs or chest or arms or back or full_body:
-                break
-
-        # Set the rep range based on the goal
-        rep_min, rep_max = rep_ranges[goal]
-        
-        # Collecting exercises based on the input - ensuring correct targeting
-        lifts = []
-        selected_lifts = set()
-        
-        target_groups = {
-            "Legs": legs,
-            "Chest": chest,
-            "Arms": arms,
-            "Back": back,
-            "Full Body": full_body
-        }
-        
-        for group, is_targeted in target_groups.items():
-            if is_targeted and group in exercises:
-                lift = random.choice(exercises[group])
-                lifts.append(lift)
-                selected_lifts.add(lift)
-
-        # Ensure at least 6 exercises are selected and avoid duplicates
-        while 6< len(lifts) <9:
-            available_groups = [group for group, is_targeted in target_groups.items() if is_targeted and group in exercises]
-            if not available_groups:
-                break
-            group_choice = random.choice(available_groups)
-            new_lift = random.choice(exercises[group_choice])
-            
-            # Avoid duplicates
-            if new_lift not in selected_lifts:
-                lifts.append(new_lift)
-                selected_lifts.add(new_lift)
-
-        # Reps for the exercises
-        reps = random.randint(rep_min, rep_max)
-        
-        # Create the record for this sample (input and output)
-        record = {
-            "Goal": goal,
-            "Legs": legs,
-            "Chest": chest,
-            "Arms": arms,
-            "Back": back,
-            "Full Body": full_body,
-            "Lifts": ";".join(lifts),
-            "Reps": reps
-        }
-        
-        data.append(record)
-
-    # Convert to dataframe and create csv file
-    df = pd.DataFrame(data)
-    df.to_csv("../data/Synthetic_data_FF.csv", index=False)
-    print(f"Generated {len(data)} samples of synthetic data.")
+
+def load_exercises(path=DEFAULT_LIFTS):
+    """
+    Lift names by targeted body part, from a .csv file (name, targeted_area columns) or a SQLite database's lifts table.
+    Lifts of other areas are ignored.
+    """
+    if path.endswith('.csv'):
+        with open(path, newline='') as file:
+            rows = [(row['name'], row['targeted_area']) for row in csv.DictReader(file)]
+    else:
+        if not os.path.exists(path):
+            raise FileNotFoundError(f"No lifts database at '{path}', pass --lifts with a database or CSV file")
+        conn = sqlite3.connect(f"file:{path}?mode=ro", uri=True)
+        try:
+            rows = conn.execute("SELECT name, targeted_area FROM lifts").fetchall()
+        finally:
+            conn.close()
+
+    exercises = {part: [] for part in BODY_PARTS}
+    for name, area in rows:
+        if area in exercises and name.strip():
+            exercises[area].append(name.strip())
+    return exercises
+
+
+def generate_chunk(exercises, rows, seed):
+    """
+    rows samples as a dict of column -> NumPy array (Lifts as an object array of ';' joined names).
+    """
+    rng = np.random.default_rng(seed)
+    names = np.array([name for part in BODY_PARTS for name in exercises[part]], dtype=object)
+    group_slices, start = [], 0
+    for part in BODY_PARTS:
+        group_slices.append(slice(start, start + len(exercises[part])))
+        start += len(exercises[part])
+
+    goal = rng.integers(0, 2, rows)
+    mask = rng.integers(1, 1 << len(BODY_PARTS), rows) # at least one body part targeted, every selection equally likely
+    reps = np.where(goal == 1, rng.integers(*REP_RANGES[1], endpoint=True, size=rows), rng.integers(*REP_RANGES[0], endpoint=True, size=rows))
+    lifts = np.empty(rows, dtype=object)
+
+    # Rows with the same selection share a lift pool, so each selection is sampled as one matrix
+    for selection in np.unique(mask):
+        selected = np.flatnonzero(mask == selection)
+        groups = [index for index in range(len(BODY_PARTS)) if selection >> index & 1 and group_slices[index].stop > group_slices[index].start]
+        if not groups:
+            lifts[selected] = ""
+            continue
+        pool = np.concatenate([np.arange(group_slices[index].start, group_slices[index].stop) for index in groups])
+
+        # A random priority per row and pooled lift: the top lift of each targeted group is that group's pick (put first, in
+        # body part order), the remaining slots go to the highest priorities among the rest, so every row gets distinct lifts.
+        priority = rng.random((len(selected), len(pool)))
+        offset = 0
+        for order, index in enumerate(groups):
+            size = group_slices[index].stop - group_slices[index].start
+            picks = offset + np.argmax(priority[:, offset:offset + size], axis=1)
+            priority[np.arange(len(selected)), picks] = 2 + len(groups) - order
+            offset += size
+        count = min(max(LIFTS_PER_PLAN, len(groups)), len(pool))
+        chosen = names[pool[np.argsort(-priority, axis=1)[:, :count]]]
+        lifts[selected] = [";".join(row) for row in chosen.tolist()]
+
+    columns = {'Goal': goal}
+    for index, part in enumerate(BODY_PARTS):
+        columns[part] = mask >> index & 1
+    columns['Lifts'] = lifts
+    columns['Reps'] = reps
+    return columns
+
+
+def write_chunk(task):
+    """
+    Process pool task: generates one chunk and writes it to its part file, returns the number of rows written.
+    """
+    exercises, rows, seed, path, file_format = task
+    import pandas as pd
+
+    frame = pd.DataFrame(generate_chunk(exercises, rows, seed), columns=COLUMNS)
+    if file_format == 'parquet':
+        frame.to_parquet(path, index=False) # needs pyarrow or fastparquet
+    else:
+        frame.to_csv(path, index=False, header=False)
+    return len(frame)
+
+
+def generate_synthetic_data(num_samples, output=DEFAULT_OUTPUT, lifts_path=DEFAULT_LIFTS, seed=0, chunk_rows=100_000, workers=None, file_format='csv'):
+    """
+    Writes num_samples rows to output: one CSV file, or for parquet a directory of part files (readable as one dataset).
+    Parts are written to a staging directory next to output; a parquet output directory is replaced as a whole once every part
+    is written, so no part files of an earlier run are left mixed in. Returns the number of rows written.
+    """
+    exercises = load_exercises(lifts_path)
+    if not any(exercises.values()):
+        raise ValueError(f"No lifts for {BODY_PARTS} in '{lifts_path}'")
+
+    sizes = [min(chunk_rows, num_samples - start) for start in range(0, num_samples, chunk_rows)]
+    seeds = np.random.SeedSequence(seed).spawn(len(sizes))
+    parts_dir = tempfile.mkdtemp(prefix='.staging-', dir=os.path.dirname(os.path.abspath(output)))
+    tasks = [
+        (exercises, size, child_seed, os.path.join(parts_dir, f"part-{index:05d}.{file_format}"), file_format)
+        for index, (size, child_seed) in enumerate(zip(sizes, seeds))
+    ]
+
+    try:
+        workers = min(workers or os.cpu_count() or 1, len(tasks) or 1)
+        if workers == 1:
+            written = sum(map(write_chunk, tasks))
+        else:
+            with ProcessPoolExecutor(max_workers=workers) as pool:
+                written = sum(pool.map(write_chunk, tasks))
+
+        if file_format == 'csv': # stitch the parts together in order behind one header
+            with open(output, 'w', newline='') as out:
+                out.write(",".join(COLUMNS) + "\n")
+                for task in tasks:
+                    with open(task[3]) as part:
+                        shutil.copyfileobj(part, out)
+        else:
+            if os.path.isdir(output):
+                shutil.rmtree(output)
+            os.rename(parts_dir, output)
+    finally:
+        shutil.rmtree(parts_dir, ignore_errors=True) # gone already once a parquet output is in place
+    return written
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__, formatter_class=argparse.RawDescriptionHelpFormatter)
+    parser.add_argument("--rows", type=int, default=1000, help="samples to generate")
+    parser.add_argument("--output", default=DEFAULT_OUTPUT, help="CSV file, or directory of part files for parquet")
+    parser.add_argument("--format", choices=["csv", "parquet"], default="csv")
+    parser.add_argument("--lifts", default=DEFAULT_LIFTS, help="lifts CSV (name,targeted_area) or SQLite database")
+    parser.add_argument("--seed", type=int, default=0)
+    parser.add_argument("--chunk-rows", type=int, default=100_000, help="rows each worker generates and writes at a time")
+    parser.add_argument("--workers", type=int, default=None, help="worker processes (default: CPU count)")
+    args = parser.parse_args()
+
+    written = generate_synthetic_data(args.rows, args.output, args.lifts, args.seed, args.chunk_rows, args.workers, args.format)
+    print(f"Generated {written} samples of synthetic data in '{args.output}'.")
+
 
 # Running script
-generate_synthetic_data(1000)
\ No newline at end of file
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,93 @@
+"""
+Versioned registry of trained plan models.
+
+    registry/
+        CURRENT             name of the version the backend serves
+        0001/
+            model/          compact tree export (compact_tree.py)
+            manifest.json   training parameters, data, cross validation scores, timings, size and latency
+        0002/
+        ...
+
+A version is written to a temporary directory inside the registry and renamed into place when complete, and CURRENT is replaced
+with os.replace, so readers only ever see finished versions and a pointer to one of them.
+"""
+import json
+import os
+import re
+import tempfile
+
+BASE_DIR = os.path.dirname(os.path.dirname(os.path.abspath(__file__)))
+REGISTRY_DIR = os.path.join(BASE_DIR, 'registry')
+CURRENT_FILE = 'CURRENT'
+MODEL_SUBDIR = 'model'
+MANIFEST_FILE = 'manifest.json'
+
+VERSION_PATTERN = re.compile(r'^\d{4,}$')
+
+
+def list_versions(registry=REGISTRY_DIR):
+    """
+    Published version names, oldest first.
+    """
+    if not os.path.isdir(registry):
+        return []
+    return sorted((name for name in os.listdir(registry) if VERSION_PATTERN.match(name)), key=int)
+
+
+def current_version(registry=REGISTRY_DIR):
+    """
+    The version CURRENT points to, None when nothing has been promoted.
+    """
+    try:
+        with open(os.path.join(registry, CURRENT_FILE)) as file:
+            return file.read().strip() or None
+    except FileNotFoundError:
+        return None
+
+
+def model_dir(version, registry=REGISTRY_DIR):
+    return os.path.join(registry, version, MODEL_SUBDIR)
+
+
+def read_manifest(version, registry=REGISTRY_DIR):
+    with open(os.path.join(registry, version, MANIFEST_FILE)) as file:
+        return json.load(file)
+
+
+def staging_dir(registry=REGISTRY_DIR):
+    """
+    Empty temporary directory inside the registry to build a version in (same filesystem, so publishing is a rename).
+    """
+    os.makedirs(registry, exist_ok=True)
+    return tempfile.mkdtemp(prefix='.staging-', dir=registry)
+
+
+def publish(staged, manifest, registry=REGISTRY_DIR):
+    """
+    Writes the manifest into a staged version and renames it to the next version number, returns the version name.
+    """
+    with open(os.path.join(staged, MANIFEST_FILE), 'w') as file:
+        json.dump(manifest, file, indent=2)
+    while True:
+        versions = list_versions(registry)
+        version = f"{int(versions[-1]) + 1 if versions else 1:04d}"
+        try:
+            os.rename(staged, os.path.join(registry, version))
+            return version
+        except OSError:
+            if not os.path.exists(os.path.join(registry, version)):
+                raise
+            # another trainer published this number first, take the next one
+
+
+def set_current(version, registry=REGISTRY_DIR):
+    """
+    Points CURRENT at a published version, atomically.
+    """
+    if not os.path.isdir(model_dir(version, registry)):
+        raise FileNotFoundError(f"No model for version '{version}' in '{registry}'")
+    handle, path = tempfile.mkstemp(prefix='.current-', dir=registry)
+    with os.fdopen(handle, 'w') as file:
+        file.write(version + "\n")
+    os.replace(path, os.path.join(registry, CURRENT_FILE))
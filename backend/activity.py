@@ -0,0 +1,119 @@
+from collections import Counter
+from datetime import MAXYEAR, date, datetime, timezone
+from sqlalchemy import delete, func, insert, select, update
+from sqlalchemy.dialects.sqlite import insert as sqlite_insert
+from models import db, LiftPerformance, PlanLift, UserDailyActivity
+
+
+def utc_now():
+    """
+    Current UTC time in the same form as the CURRENT_TIMESTAMP column default (no timezone, whole seconds).
+    Performances get their date from here so the tracked day is known without reading the row back.
+    """
+    return datetime.now(timezone.utc).replace(tzinfo=None, microsecond=0)
+
+
+def count_days(performances):
+    """
+    Counts performances per (user_id, day) from an iterable of (user_id, datetime) pairs.
+    """
+    return Counter((user_id, performed.date()) for user_id, performed in performances)
+
+
+def record_activity(day_counts):
+    """
+    Adds tracked sets to the daily activity table in the current transaction, day_counts is a Counter of (user_id, day) -> sets.
+    """
+    for (user_id, day), sets in day_counts.items():
+        statement = sqlite_insert(UserDailyActivity).values(user_id=user_id, day=day, sets_tracked=sets)
+        db.session.execute(statement.on_conflict_do_update(
+            index_elements=[UserDailyActivity.user_id, UserDailyActivity.day],
+            set_={"sets_tracked": UserDailyActivity.sets_tracked + statement.excluded.sets_tracked}
+        ))
+
+
+def remove_activity(day_counts):
+    """
+    Takes deleted sets back out of the daily activity table, days left with no sets are removed.
+    """
+    for (user_id, day), sets in day_counts.items():
+        db.session.execute(update(UserDailyActivity).where(
+            UserDailyActivity.user_id == user_id,
+            UserDailyActivity.day == day
+        ).values(sets_tracked=UserDailyActivity.sets_tracked - sets))
+
+    user_ids = {user_id for user_id, _ in day_counts}
+    if user_ids:
+        db.session.execute(delete(UserDailyActivity).where(
+            UserDailyActivity.user_id.in_(user_ids),
+            UserDailyActivity.sets_tracked <= 0
+        ))
+
+
+def clear_activity(user_id):
+    """
+    Removes all of a user's daily activity, used when the user is deleted.
+    """
+    db.session.execute(delete(UserDailyActivity).where(UserDailyActivity.user_id == user_id))
+
+
+def plan_day_counts(plan_id):
+    """
+    Counts the performances tracked for a plan per (user_id, day), used before the plan's performances are deleted.
+    """
+    rows = db.session.execute(select(
+        LiftPerformance.user_id,
+        func.date(LiftPerformance.date),
+        func.count()
+    ).join(
+        PlanLift, PlanLift.id == LiftPerformance.plan_lift_id
+    ).where(
+        PlanLift.plan_id == plan_id
+    ).group_by(LiftPerformance.user_id, func.date(LiftPerformance.date))).all()
+    return Counter({(user_id, date.fromisoformat(day)): sets for user_id, day, sets in rows})
+
+
+def tracked_days_query(user_id, start, end):
+    """
+    Days in [start, end) on which the user tracked at least one set, a single range lookup on the table's primary key.
+    An end of None leaves the range open (the month after December 9999 is not a date).
+    """
+    query = select(UserDailyActivity.day).where(
+        UserDailyActivity.user_id == user_id,
+        UserDailyActivity.day >= start,
+    )
+    if end is not None:
+        query = query.where(UserDailyActivity.day < end)
+    return query.order_by(UserDailyActivity.day)
+
+
+def get_tracked_dates(user_id, year, month):
+    """
+    Tracked days of one month as 'YYYY-MM-DD' strings in order. year must be a valid date year (see MINYEAR and MAXYEAR).
+    """
+    first_day = date(year, month, 1)
+    if month < 12:
+        next_month = date(year, month + 1, 1)
+    else:
+        next_month = date(year + 1, 1, 1) if year < MAXYEAR else None
+    tracked_days = db.session.execute(tracked_days_query(user_id, first_day, next_month)).scalars().all()
+    return [day.strftime("%Y-%m-%d") for day in tracked_days]
+
+
+def rebuild_daily_activity(conn):
+    """
+    Recomputes the whole daily activity table from lift_performances. Performances whose plan lift no longer exists
+    are left out, matching what the calendar showed before the table existed.
+    """
+    conn.execute(delete(UserDailyActivity))
+    conn.execute(insert(UserDailyActivity).from_select(
+        ['user_id', 'day', 'sets_tracked'],
+        select(
+            LiftPerformance.user_id,
+            func.date(LiftPerformance.date),
+            func.count()
+        ).join(
+            PlanLift, PlanLift.id == LiftPerformance.plan_lift_id
+        ).group_by(LiftPerformance.user_id, func.date(LiftPerformance.date))
+    ))
+    return conn.execute(select(func.count()).select_from(UserDailyActivity)).scalar()
@@ -0,0 +1,172 @@
+from datetime import date, timedelta
+from sqlalchemy import String, case, func, literal, select, type_coerce
+from models import db, LiftPerformance, UserLiftStats
+
+WEEKLY_DEFAULT_WEEKS = 12 # most recent weeks of per week stats returned by default
+WEEKLY_MAX_WEEKS = 104 # cap on weekly rows so the response size stays bounded for any range
+
+
+# ----- ESTIMATED 1RM --------
+# Estimated one rep max from a set of `reps` at `weight`. A single rep is its own max, Brzycki is undefined from 37 reps on.
+
+def epley(weight, reps):
+    return weight if reps <= 1 else weight * (1 + reps / 30)
+
+
+def brzycki(weight, reps):
+    if reps <= 1:
+        return weight
+    return weight * 36 / (37 - reps) if reps < 37 else None
+
+
+def epley_expr(weight, reps):
+    """
+    epley() as a SQL expression over the given columns.
+    """
+    return case((reps <= 1, weight), else_=weight * (1 + reps / literal(30.0)))
+
+
+def brzycki_expr(weight, reps):
+    """
+    brzycki() as a SQL expression over the given columns, NULL where it is undefined.
+    """
+    return case((reps <= 1, weight), (reps < 37, weight * 36.0 / (37 - reps)), else_=None)
+
+
+# ----- LIFT ANALYTICS QUERIES --------
+
+def lift_performances_in_range(query, user_id, lift_id, start=None, end=None):
+    """
+    Restricts a query to one user's performances of one lift, optionally to days in [start, end] (both inclusive).
+    Dates are compared as the stored text, so a day bound matches every time on that day.
+    """
+    date_key = type_coerce(LiftPerformance.date, String)
+    query = query.where(LiftPerformance.user_id == user_id, LiftPerformance.lift_id == lift_id)
+    if start is not None:
+        query = query.where(date_key >= start.isoformat())
+    if end is not None:
+        query = query.where(date_key < (end + timedelta(days=1)).isoformat())
+    return query
+
+
+def lift_summary_query(user_id, lift_id, start=None, end=None):
+    """
+    One aggregate row over every set of the lift in range: set count, weight max/avg, volume (weight x reps), best e1RMs and first/last day.
+    """
+    weight, reps = LiftPerformance.weight_performed, LiftPerformance.reps_performed
+    return lift_performances_in_range(select(
+        func.count().label("sets"),
+        func.max(weight).label("max_weight"),
+        func.avg(weight).label("avg_weight"),
+        func.coalesce(func.sum(weight * reps), 0).label("total_volume"),
+        func.coalesce(func.sum(reps), 0).label("total_reps"),
+        func.max(epley_expr(weight, reps)).label("e1rm_epley"),
+        func.max(brzycki_expr(weight, reps)).label("e1rm_brzycki"),
+        func.min(func.date(LiftPerformance.date)).label("first_date"),
+        func.max(func.date(LiftPerformance.date)).label("last_date"),
+    ), user_id, lift_id, start, end)
+
+
+def max_weight_day_query(user_id, lift_id, start=None, end=None):
+    """
+    Day the heaviest set in range was first lifted.
+    """
+    return lift_performances_in_range(
+        select(func.date(LiftPerformance.date)), user_id, lift_id, start, end
+    ).order_by(LiftPerformance.weight_performed.desc(), LiftPerformance.date).limit(1)
+
+
+def lift_weekly_query(user_id, lift_id, start=None, end=None, weeks=WEEKLY_DEFAULT_WEEKS):
+    """
+    Per week (starting Monday) set count, best weight, best e1RMs and volume for the most recent `weeks` weeks with sets in range, newest first.
+    """
+    weight, reps = LiftPerformance.weight_performed, LiftPerformance.reps_performed
+    week_start = func.date(LiftPerformance.date, 'weekday 0', '-6 days') # Monday on or before the day
+    return lift_performances_in_range(select(
+        week_start.label("week_start"),
+        func.count().label("sets"),
+        func.max(weight).label("best_weight"),
+        func.max(epley_expr(weight, reps)).label("e1rm_epley"),
+        func.max(brzycki_expr(weight, reps)).label("e1rm_brzycki"),
+        func.sum(weight * reps).label("volume"),
+    ), user_id, lift_id, start, end).group_by(week_start).order_by(week_start.desc()).limit(weeks)
+
+
+def round_or_none(value, digits=2):
+    return round(value, digits) if value is not None else None
+
+
+def range_summary(user_id, lift_id, start, end):
+    """
+    Summary of the sets in a date range, aggregated over the range's performances.
+    """
+    summary = db.session.execute(lift_summary_query(user_id, lift_id, start, end)).one()
+    max_weight_day = db.session.execute(max_weight_day_query(user_id, lift_id, start, end)).scalar() if summary.sets else None
+    return {
+        "sets": summary.sets,
+        "max_weight": summary.max_weight,
+        "max_weight_date": max_weight_day,
+        "avg_weight": round_or_none(summary.avg_weight),
+        "total_volume": round(summary.total_volume, 2),
+        "total_reps": summary.total_reps,
+        "e1rm_epley": round_or_none(summary.e1rm_epley),
+        "e1rm_brzycki": round_or_none(summary.e1rm_brzycki),
+        "first_date": summary.first_date,
+        "last_date": summary.last_date,
+    }
+
+
+def all_time_summary(user_id, lift_id):
+    """
+    Summary of every set of the lift, a single row lookup in the incrementally maintained user_lift_stats table.
+    """
+    stats = db.session.get(UserLiftStats, (user_id, lift_id))
+    if stats is None or not stats.sets_count:
+        return {"sets": 0, "max_weight": None, "max_weight_date": None, "avg_weight": None, "total_volume": 0, "total_reps": 0,
+                "e1rm_epley": None, "e1rm_brzycki": None, "first_date": None, "last_date": None}
+    return {
+        "sets": stats.sets_count,
+        "max_weight": stats.best_weight,
+        "max_weight_date": stats.best_weight_date.date().isoformat(),
+        "avg_weight": round(stats.total_weight / stats.sets_count, 2),
+        "total_volume": round(stats.total_volume, 2),
+        "total_reps": stats.total_reps,
+        "e1rm_epley": round_or_none(stats.best_e1rm),
+        "e1rm_brzycki": round_or_none(stats.best_e1rm_brzycki),
+        "first_date": stats.first_performed.date().isoformat(),
+        "last_date": stats.last_performed.date().isoformat(),
+    }
+
+
+def get_lift_analytics(user_id, lift_id, start=None, end=None, weeks=WEEKLY_DEFAULT_WEEKS):
+    """
+    Aggregated stats for one user's lift in the json format of the analytics endpoint. Everything is computed by the database,
+    so the response size does not depend on how many sets were tracked. Without a date range the summary comes from user_lift_stats.
+    """
+    if start is None and end is None:
+        summary = all_time_summary(user_id, lift_id)
+    else:
+        summary = range_summary(user_id, lift_id, start, end)
+    weekly = db.session.execute(lift_weekly_query(user_id, lift_id, start, end, weeks)).all() if summary["sets"] else []
+
+    return {
+        "summary": summary,
+        "weekly": [
+            {
+                "week_start": week.week_start,
+                "sets": week.sets,
+                "best_weight": week.best_weight,
+                "e1rm_epley": round_or_none(week.e1rm_epley),
+                "e1rm_brzycki": round_or_none(week.e1rm_brzycki),
+                "volume": round(week.volume, 2),
+            }
+            for week in reversed(weekly) # oldest first
+        ],
+    }
+
+
+def parse_day(value):
+    """
+    Parses an optional 'YYYY-MM-DD' query arg, raises ValueError for anything else.
+    """
+    return date.fromisoformat(value) if value else None
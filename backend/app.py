@@ -1,13 +1,20 @@
-from datetime import datetime
+from datetime import MAXYEAR, MINYEAR, datetime
+import numpy as np
 from dotenv import load_dotenv
 from flask_bcrypt import bcrypt
-from flask import Flask, abort, jsonify, request
-from sqlalchemy import func
-from models import LiftPerformance, db, bcrypt, User, Lift, Plan, PlanLift
-from predict import predict_lifts
-from recommend_weight import true_math
+from flask import Flask, Response, abort, jsonify, request, stream_with_context
+from sqlalchemy import insert, select, text
+from models import LiftPerformance, db, bcrypt, User, Plan, PlanLift
+from lift_catalog import lift_catalog
+from predict import plan_predictor
+from recommend_weight import next_weights, recent_sessions, weights_or_none, with_new_session
 from config import Config
 from email_validator import validate_email
+from activity import clear_activity, count_days, get_tracked_dates, plan_day_counts, record_activity, remove_activity, utc_now
+from lift_stats import clear_stats, plan_stats_keys, record_sets, refresh_stats
+from analytics import WEEKLY_DEFAULT_WEEKS, WEEKLY_MAX_WEEKS, get_lift_analytics, parse_day
+from progression import SERIES_DEFAULT_POINTS, SERIES_MAX_POINTS, TONNAGE_DEFAULT_WEEKS, TONNAGE_MAX_WEEKS, compute_progression, load_lift_history
+from queries import decode_cursor, get_user_plans_data, plan_name_conflicts_query, get_user_trackings_page, stream_user_trackings
 
 
 app = Flask(__name__)
@@ -16,6 +23,23 @@ db.init_app(app)
 
 load_dotenv()
 
+TRACKINGS_PAGE_SIZE = 50 # default and max page sizes for the trackings endpoint
+TRACKINGS_MAX_PAGE_SIZE = 500
+LIFTS_MAX_AGE = 300 # seconds callers may reuse /api/lifts before revalidating
+GENERATE_PLANS_MAX_BATCH = 1000 # default max plans per /api/generate_plans request
+MODEL_WATCH_INTERVAL = 10 # default seconds between checks of the model registry's current version, 0 disables the watch
+MODEL_BATCH_MAX_SIZE = 64 # default max inputs per model call when the prediction table is off
+MODEL_BATCH_MAX_WAIT_MS = 2 # default ms a prediction waits for others to share its model call
+
+
+# Plan predictions come from the table precomputed when the model loads. With MODEL_PREDICTION_TABLE off the model predicts on
+# request instead, the inputs of concurrent requests gathered into one call (up to MODEL_BATCH_MAX_SIZE inputs or
+# MODEL_BATCH_MAX_WAIT_MS of waiting); /api/metrics/model then reports the queue depth and batch size histograms.
+if not getattr(Config, 'MODEL_PREDICTION_TABLE', True):
+    plan_predictor.use_batching(
+        getattr(Config, 'MODEL_BATCH_MAX_SIZE', MODEL_BATCH_MAX_SIZE), getattr(Config, 'MODEL_BATCH_MAX_WAIT_MS', MODEL_BATCH_MAX_WAIT_MS)
+    )
+
 
 #  validate API key
 @app.before_request
@@ -28,6 +52,19 @@ def validate_api_key():
         abort(403, "Invalid API Key") 
 
 
+# Model warm-up and registry watch - start with the first authenticated request (usually a readiness probe) rather than at import,
+# so tools importing the app never load the ML stack. Registered after the API key check, so requests without a valid key
+# cannot start them. generate_plan loads the model itself if the warm-up has not finished; a newly promoted model is swapped
+# in by the watch.
+@app.before_request
+def start_model_threads():
+    if getattr(Config, 'MODEL_WARMUP', True) and not plan_predictor.ready:
+        plan_predictor.warm_up()
+    watch_interval = getattr(Config, 'MODEL_WATCH_INTERVAL', MODEL_WATCH_INTERVAL)
+    if watch_interval:
+        plan_predictor.watch(watch_interval)
+
+
 # backend health check 
 @app.route('/')
 def index():
@@ -38,6 +75,58 @@ def index():
     return "Backend is running!"
 
 
+# backend readiness check
+@app.route('/api/ready')
+def ready():
+    """
+    Readiness check, unlike the / health check this only succeeds once the backend can serve every endpoint:
+    200 when the plan generator's model is loaded and the database answers, 503 while warming up or if either failed.
+    """
+    try:
+        database_ok = db.session.execute(text("SELECT 1")).scalar() == 1
+    except Exception as e:
+        app.logger.error(f"Readiness database check failed: {e}")
+        database_ok = False
+
+    is_ready = plan_predictor.ready and database_ok
+    return jsonify({
+        "ready": is_ready,
+        "checks": {"model": plan_predictor.ready, "database": database_ok},
+        "model_version": plan_predictor.version,
+        "model_load_seconds": round(plan_predictor.load_seconds, 3) if plan_predictor.load_seconds is not None else None,
+        "model_error": plan_predictor.load_error,
+    }), 200 if is_ready else 503
+
+
+# plan model metrics
+@app.route('/api/metrics/model')
+def model_metrics():
+    """
+    Plan generator model state: served version, last load time and duration, load and failure counts, reload and watch activity,
+    and with the prediction table off the micro-batching queue depth, batch sizes and waits.
+    """
+    return jsonify(plan_predictor.metrics()), 200
+
+
+# reload the plan model
+@app.route('/api/admin/model/reload', methods=['POST'])
+def reload_model():
+    """
+    Loads the model registry's current version in the background and swaps it in once it passes its self check, requests keep being
+    served by the previous model meanwhile. Poll /api/metrics/model for the outcome. If ADMIN_API_KEY is configured the
+    'X-ADMIN-KEY' header must match it.
+    """
+    admin_key = getattr(Config, 'ADMIN_API_KEY', None)
+    if admin_key and request.headers.get('X-ADMIN-KEY') != admin_key:
+        abort(403, "Invalid admin key")
+
+    started = plan_predictor.reload()
+    return jsonify({
+        "message": "Model reload started" if started else "A model reload is already running",
+        "model": plan_predictor.metrics(),
+    }), 202
+
+
 #-------- BASIC ENDPOINTS --------------
 
 # Get id endpoint
@@ -86,6 +175,8 @@ def delete_user(user_id):
     try:
         user = db.session.get(User, user_id)
         if user:
+            clear_activity(user_id)
+            clear_stats(user_id)
             db.session.delete(user)
             db.session.commit()
             return jsonify({"message": f"User {user.username} has been deleted successfully"}), 200
@@ -134,13 +225,25 @@ def change_email():
         return jsonify({"error": f"An error occured: {str(e)}"}),500
 
 
+def calendar_month_error(year, month):
+    """
+    Error message for a year and month that do not name a calendar month, None when they do.
+    """
+    if not 1 <= month <= 12:
+        return "Month must be between 1 and 12"
+    if not MINYEAR <= year <= MAXYEAR:
+        return f"Year must be between {MINYEAR} and {MAXYEAR}"
+    return None
+
+
 # End point for getting user tracked dates for calander display on dashboard
 @app.route('/api/tracked-dates', methods=['GET'])
 def get_tracked_dates_api():
     """
     GET /api/tracked-dates
     ---
-    Retrieves the dates a user has tracked performance for a specific year and month for calendar display
+    Retrieves the dates a user has tracked performance for a specific year and month for calendar display. Answered from the
+    user_daily_activity table which is kept up to date whenever performances are tracked or deleted (activity.py).
     """
     try: # Gets user id, year, and month info
         user_id = request.args.get('user_id', type=int)
@@ -152,18 +255,12 @@ def get_tracked_dates_api():
         if not year or not month:
             return jsonify({"error": "Year and Month are required"}), 400 # Unable to populate calander information error
 
-        tracked_dates = db.session.query(LiftPerformance.date).join( # Gathering all dates that user liftperformance entries have been created (days users tracked lifts)
-            PlanLift, LiftPerformance.plan_lift_id == PlanLift.id
-        ).join(
-            Plan, PlanLift.plan_id == Plan.id
-        ).filter(
-            Plan.user_id == user_id,  # Filter by user_id
-            func.extract('year', LiftPerformance.date) == year,  
-            func.extract('month', LiftPerformance.date) == month 
-        ).distinct().all()  # Use distinct to remove duplicates
-
-        unique_dates = set(date[0].date() for date in tracked_dates)  #Get unique dates - a user can track multiple times in one day and this will prevent issues with this
-        tracked_dates_list = [date.strftime("%Y-%m-%d") for date in sorted(unique_dates)]  # Sorting dates into order
+        error = calendar_month_error(year, month)
+        if error:
+            return jsonify({"error": error}), 400
+
+        # Range lookup on the daily activity table (one row per user per tracked day)
+        tracked_dates_list = get_tracked_dates(user_id, year, month)
         return jsonify({"tracked_dates": tracked_dates_list}), 200
 
     except Exception as e:
@@ -316,6 +413,10 @@ def create_plan():
         if not user_id or not plan_name:
             return jsonify({"error": "user_id and plan_name are required"}), 400
 
+        lift_ids = [lift['lift_id'] for lift in lifts_data]
+        if len(lift_ids) != len(set(lift_ids)):
+            return jsonify({"error": "Each lift can only be added to a plan once"}), 400
+
         # Create the Plan
         new_plan = Plan(
             user_id=user_id,
@@ -348,7 +449,8 @@ def create_plan():
 @app.route('/api/users/<int:user_id>/plans', methods=['GET'])
 def get_user_plans(user_id):
     """
-    Get all plans for a specific user.
+    Get all plans for a specific user. Plans, plan lifts and lift names are read with a single joined query (queries.py)
+    and serialized straight from the rows.
     """
     try:
         user = db.session.get(User, user_id) 
@@ -356,36 +458,9 @@ def get_user_plans(user_id):
             app.logger.error(f"User {user_id} not found.")
             return jsonify({"error": "User not found"}), 404
 
-        # Fetch plans for the user
-        plans = Plan.query.filter_by(user_id=user_id).all()
-        if not plans:
-            app.logger.info(f"No plans found for user {user_id}.")
-            return jsonify([]), 200  # No plans for the user
-
-        # Format the response
-        plans_data = []
-        for plan in plans:
-            lifts_list = []
-            for pl in plan.plan_lifts:
-                lift_obj = db.session.get(Lift, pl.lift_id)
-                if lift_obj:
-                    lifts_list.append({
-                        "lift_id": pl.lift_id,
-                        "lift_name": lift_obj.name,
-                        "sets": pl.sets,
-                        "reps": pl.reps
-                    })
-
-            plans_data.append({
-                "plan_id": plan.id,
-                "plan_name": plan.plan_name,
-                "plan_type": plan.plan_type,
-                "plan_duration": plan.plan_duration,
-                "creation_date": plan.creation_date.isoformat() if plan.creation_date else None,
-                "lifts": lifts_list
-            })
-
-        app.logger.info(f"Plans for user {user_id}: {plans_data}")
+        # Fetch plans, plan lifts and lift names in one joined query
+        plans_data = get_user_plans_data(user_id)
+        app.logger.debug(f"Fetched {len(plans_data)} plans for user {user_id}")
         return jsonify(plans_data), 200
 
     except Exception as e:
@@ -397,15 +472,32 @@ def get_user_plans(user_id):
 @app.route('/api/lifts', methods=['GET'])
 def get_lifts():
     """
-    Get all predefined lifts from lifts db.
+    Get all predefined lifts from the lift catalog. Responses carry an ETag so callers can revalidate with If-None-Match and get a 304.
     """
-    lifts = Lift.query.all() # retrieves all lifts
-    lifts_data = [{"id": lift.id, "name": lift.name} for lift in lifts] #formatting data into json 
-    return jsonify(lifts_data), 200
+    catalog = lift_catalog.snapshot()
+    response = jsonify(catalog.json)
+    response.set_etag(catalog.etag)
+    response.headers['Cache-Control'] = f"private, max-age={LIFTS_MAX_AGE}"
+    return response.make_conditional(request)
 
 
 # -----TRACKING ENDPOINTS  --------
 
+def validate_performance_input(entry):
+    """
+    Validates one tracked lift entry (reps performed, weight performed, reps in reserve). Returns an error message or None if valid.
+    """
+    reps_performed = entry.get('reps_performed')
+    weight_performed = entry.get('weight_performed')
+    reps_in_reserve = entry.get('reps_in_reserve')
+
+    if reps_performed is None or weight_performed is None or reps_in_reserve is None:
+        return "Missing required fields"
+    if not isinstance(reps_performed, int) or not isinstance(weight_performed, (int, float)) or not isinstance(reps_in_reserve, int):
+        return "Invalid data types"
+    return None
+
+
 #Track workout endpoint
 @app.route('/api/plans/<int:plan_id>/lifts/<int:lift_id>/track', methods=['POST'])
 def track_lift_performance(plan_id, lift_id):
@@ -421,7 +513,7 @@ def track_lift_performance(plan_id, lift_id):
         
 
         # Validate the existence of the lift
-        lift = db.session.get(Lift, lift_id)
+        lift = lift_catalog.get(lift_id)
         if not lift:
             return jsonify({"error": "Lift not found"}), 404
 
@@ -434,23 +526,26 @@ def track_lift_performance(plan_id, lift_id):
             return jsonify({"error": "No input data provided"}), 400
 
 
-        user_id = data.get('user_id')
+        # Validate inputs and data types
+        error = validate_performance_input(data)
+        if error:
+            return jsonify({"error": error}), 400
+
+        user_id = data.get('user_id', plan.user_id)
         reps_performed = data.get('reps_performed')
         weight_performed = data.get('weight_performed')
         reps_in_reserve = data.get('reps_in_reserve')
         additional_notes = data.get('additional_notes')
-        recommended_weight = true_math(weight_performed,reps_in_reserve)
 
-        # Validate inputs
-        if reps_performed is None or weight_performed is None or reps_in_reserve is None:
-            return jsonify({"error": "Missing required fields"}), 400
-        # Validate data types
-        if not isinstance(reps_performed, int) or not isinstance(weight_performed, (int, float)) or not isinstance(reps_in_reserve, int):
-            return jsonify({"error": "Invalid data types"}), 400
+        # Next session weight from this set and the plan lift's recent sessions (read before the new record is added)
+        history = with_new_session(recent_sessions([plan_lift.id]), [weight_performed], [reps_performed], [reps_in_reserve])
+        recommended_weight = float(next_weights(*history, np.array([plan_lift.reps], dtype=np.float64))[0])
 
         # Create a new LiftPerformance record
+        performed_at = utc_now()
         performance = LiftPerformance(
             plan_lift_id=plan_lift.id,
+            date=performed_at,
             lift_id = lift.id,
             user_id = user_id,
             reps_performed=reps_performed,
@@ -461,11 +556,14 @@ def track_lift_performance(plan_id, lift_id):
         )
 
         db.session.add(performance) #Adding new record to LiftPerformance db
+        record_activity(count_days([(user_id, performed_at)])) # calendar activity in the same transaction
+        records = record_sets([(user_id, lift.id, weight_performed, reps_performed, performed_at)]) # lift stats and personal records
         db.session.commit()
 
         return jsonify({
             "message": "Lift performance tracked successfully",
-            "performance_id": performance.id
+            "performance_id": performance.id,
+            "personal_record": records[0]
         }), 201
 
     except Exception as e:
@@ -473,6 +571,143 @@ def track_lift_performance(plan_id, lift_id):
         return jsonify({"error": "Server error"}), 500
     
 
+def valid_lift_id(lift_id):
+    return isinstance(lift_id, int) and not isinstance(lift_id, bool)
+
+
+#Track whole workout session endpoint
+@app.route('/api/plans/<int:plan_id>/track', methods=['POST'])
+def track_workout_session(plan_id):
+    """
+    Track a whole workout session for a plan in one request. Expects {"user_id", "lifts": [{"lift_id", "reps_performed", "weight_performed",
+    "reps_in_reserve", "additional_notes"}, ...]}. The plan is validated once and every lift is checked against the plan with one query,
+    then all valid LiftPerformance records are inserted with a single bulk insert and one commit. Returns a result per submitted lift.
+    """
+    try:
+        data = request.get_json()
+        if not data or not isinstance(data.get('lifts'), list) or not data['lifts']:
+            return jsonify({"error": "No lifts provided"}), 400
+
+        plan = db.session.get(Plan, plan_id)
+        if not plan:
+            return jsonify({"error": "Plan not found"}), 404
+
+        user_id = data.get('user_id', plan.user_id)
+        if user_id != plan.user_id:
+            return jsonify({"error": "Plan does not belong to this user"}), 403
+
+        entries = data['lifts']
+        catalog = lift_catalog.snapshot()
+        lift_ids = {
+            entry['lift_id'] for entry in entries
+            if isinstance(entry, dict) and valid_lift_id(entry.get('lift_id')) and entry['lift_id'] in catalog.by_id
+        }
+
+        # lift_id -> (plan_lift_id, planned reps) for every requested lift that exists and is part of this plan (one query)
+        plan_lifts = {lift_id: (plan_lift_id, reps) for lift_id, plan_lift_id, reps in db.session.execute(
+            select(PlanLift.lift_id, PlanLift.id, PlanLift.reps).where(
+                PlanLift.plan_id == plan_id,
+                PlanLift.lift_id.in_(lift_ids)
+            )
+        )}
+
+        performed_at = utc_now()
+        results = []
+        rows = []
+        for entry in entries:
+            if not isinstance(entry, dict):
+                results.append({"lift_id": None, "error": "Invalid lift entry"})
+                continue
+
+            lift_id = entry.get('lift_id')
+            if not valid_lift_id(lift_id): # also keeps lists and dicts, which are unhashable, out of the lookups
+                results.append({"lift_id": None, "error": "lift_id must be an integer"})
+                continue
+            if lift_id not in plan_lifts:
+                results.append({"lift_id": lift_id, "error": "Lift not found in the specified plan"})
+                continue
+
+            error = validate_performance_input(entry)
+            if error:
+                results.append({"lift_id": lift_id, "error": error})
+                continue
+
+            rows.append({
+                "plan_lift_id": plan_lifts[lift_id][0],
+                "lift_id": lift_id,
+                "user_id": user_id,
+                "date": performed_at,
+                "reps_performed": entry['reps_performed'],
+                "weight_performed": entry['weight_performed'],
+                "reps_in_reserve": entry['reps_in_reserve'],
+                "additional_notes": entry.get('additional_notes'),
+            })
+            results.append({"lift_id": lift_id, "performance_id": None}) # filled in after the insert
+
+        if rows:
+            # Next session weights for the whole session in one history query and one vectorized call
+            history = with_new_session(
+                recent_sessions([row["plan_lift_id"] for row in rows]),
+                [row["weight_performed"] for row in rows],
+                [row["reps_performed"] for row in rows],
+                [row["reps_in_reserve"] for row in rows],
+            )
+            planned_reps = np.array([plan_lifts[row["lift_id"]][1] for row in rows], dtype=np.float64)
+            for row, recommended_weight in zip(rows, next_weights(*history, planned_reps).tolist()):
+                row["recommended_weight"] = recommended_weight
+
+            # One bulk insert and one commit for the whole session
+            performance_ids = db.session.scalars(
+                insert(LiftPerformance).returning(LiftPerformance.id, sort_by_parameter_order=True),
+                rows
+            ).all()
+            record_activity(count_days((user_id, performed_at) for _ in rows)) # calendar activity in the same transaction
+            records = record_sets((user_id, row["lift_id"], row["weight_performed"], row["reps_performed"], performed_at) for row in rows)
+            db.session.commit()
+
+            tracked = iter(zip(performance_ids, records))
+            for result in results:
+                if "performance_id" in result:
+                    result["performance_id"], result["personal_record"] = next(tracked)
+
+        if not rows:
+            return jsonify({"error": "No lifts could be tracked", "results": results}), 400
+        if len(rows) < len(results):
+            return jsonify({"message": "Some lifts could not be tracked", "results": results}), 207 # partial success
+        return jsonify({"message": "Workout session tracked successfully", "results": results}), 201
+
+    except Exception as e:
+        db.session.rollback()
+        app.logger.error(f"Error tracking workout session: {str(e)}")
+        return jsonify({"error": "Server error"}), 500
+    
+
+# Next session weights for a whole plan endpoint
+@app.route('/api/plans/<int:plan_id>/next-weights', methods=['GET'])
+def get_next_weights(plan_id):
+    """
+    Recommended weight for the next session of every lift in a plan, from each plan lift's last sessions (reps, weight and reps in reserve)
+    in one history query and one vectorized call. Lifts that were never tracked in the plan get null.
+    """
+    plan = db.session.get(Plan, plan_id)
+    if not plan:
+        return jsonify({"error": "Plan not found"}), 404
+
+    plan_lifts = db.session.execute(
+        select(PlanLift.id, PlanLift.lift_id, PlanLift.reps).where(PlanLift.plan_id == plan_id).order_by(PlanLift.id)
+    ).all()
+    history = recent_sessions([plan_lift.id for plan_lift in plan_lifts])
+    recommended = next_weights(*history, np.array([plan_lift.reps for plan_lift in plan_lifts], dtype=np.float64))
+
+    return jsonify({
+        "plan_id": plan_id,
+        "next_weights": [
+            {"lift_id": plan_lift.lift_id, "recommended_weight": weight}
+            for plan_lift, weight in zip(plan_lifts, weights_or_none(recommended))
+        ]
+    }), 200
+
+
 #Retrive tracking data for display purposes
 @app.route('/api/plans/<int:plan_id>/lifts/<int:lift_id>/track', methods=['GET'])
 def get_lift_performance(plan_id, lift_id):
@@ -511,41 +746,38 @@ def get_lift_performance(plan_id, lift_id):
         return jsonify({"error": "Server error"}), 500
     
     
-# Retreive all tracking data for a specific user endpoint
+def trackings_page_args():
+    """
+    Reads the 'limit' and 'cursor' query args of the tracking history endpoints, raises ValueError for a malformed cursor.
+    """
+    limit = min(max(request.args.get('limit', TRACKINGS_PAGE_SIZE, type=int), 1), TRACKINGS_MAX_PAGE_SIZE)
+    cursor = request.args.get('cursor')
+    return limit, decode_cursor(cursor) if cursor else None
+
+
+# Retreive tracking data for a specific user endpoint
 @app.route('/api/users/<int:user_id>/trackings', methods=['GET'])
 def get_user_trackings(user_id):
     """
-    Retrieve all tracking data for a specific user. Retreives user id, finds all plans that belong to user, searches through all plans and planlift records to find lift_performance records,
-    which are then stored into the trackings list in json format to be returned to the frontend for display
+    Retrieve tracking data for a specific user, newest first. Results are keyset paginated on (date, id): pass 'limit' (default 50, max 500)
+    and the 'cursor' returned as next_cursor to get the following page. With format=ndjson every tracking from the cursor on is streamed
+    as one json object per line from a single joined query instead of being built in memory.
     """
     try:
         user = db.session.get(User, user_id) # Getting user id
         if not user:
             return jsonify({"error": "User not found"}), 404
 
-        plans = Plan.query.filter_by(user_id=user_id).all() # Getting plan id
-        if not plans:
-            return jsonify([]), 200
-
-        trackings = [] #All PlanLift performance records
-        for plan in plans:
-            for plan_lift in plan.plan_lifts:
-                for perf in plan_lift.performances:
-                    trackings.append({
-                        "plan_id": plan.id,
-                        "plan_name": plan.plan_name,
-                        "lift_id": plan_lift.lift_id,
-                        "lift_name": plan_lift.lift.name,
-                        "performance_id": perf.id,
-                        "date": perf.date.date().isoformat(),
-                        "reps_performed": perf.reps_performed,
-                        "weight_performed": perf.weight_performed,
-                        "reps_in_reserve": perf.reps_in_reserve,
-                        "additional_notes":perf.additional_notes,
-                        "recommended_weight":perf.recommended_weight
-                    })
-                           
-        return jsonify(trackings), 200
+        try:
+            limit, cursor = trackings_page_args()
+        except ValueError:
+            return jsonify({"error": "Invalid cursor"}), 400
+
+        if request.args.get('format') == 'ndjson':
+            return Response(stream_with_context(stream_user_trackings(user_id, cursor)), mimetype='application/x-ndjson')
+
+        trackings, next_cursor = get_user_trackings_page(user_id, limit, cursor)
+        return jsonify({"trackings": trackings, "next_cursor": next_cursor}), 200
 
     except Exception as e:
         app.logger.error(f"Error retrieving user trackings: {str(e)}")
@@ -559,7 +791,7 @@ def get_performance_data(user_id, lift_name):
     Get performance data for a specific user and lift.
     """
     # Get the lift ID from the name
-    lift = Lift.query.filter_by(name=lift_name).first()
+    lift = lift_catalog.find(lift_name)
     if not lift:
         return jsonify({"error": "Lift not found"}), 404
 
@@ -582,8 +814,73 @@ def get_performance_data(user_id, lift_name):
     return jsonify({"performance_data": performance_data_formatted}), 200 #Success 
 
 
+# Aggregated stats for a specific user and lift endpoint
+@app.route('/api/users/<int:user_id>/lifts/<string:lift_name>/analytics', methods=['GET'])
+def get_lift_analytics_data(user_id, lift_name):
+    """
+    Summary stats (max/avg weight, volume, estimated 1RM by Epley and Brzycki) and per week bests/volume for a user's lift, aggregated in the
+    database instead of sending every tracked set. Optional 'start' and 'end' (YYYY-MM-DD, inclusive) limit the range, 'weeks' (default 12,
+    max 104) limits how many of the most recent weeks are returned.
+    """
+    lift = lift_catalog.find(lift_name)
+    if not lift:
+        return jsonify({"error": "Lift not found"}), 404
+
+    try:
+        start = parse_day(request.args.get('start'))
+        end = parse_day(request.args.get('end'))
+    except ValueError:
+        return jsonify({"error": "start and end must be dates in YYYY-MM-DD format"}), 400
+    if start and end and start > end:
+        return jsonify({"error": "start must not be after end"}), 400
+    weeks = min(max(request.args.get('weeks', WEEKLY_DEFAULT_WEEKS, type=int), 1), WEEKLY_MAX_WEEKS)
+
+    analytics = get_lift_analytics(user_id, lift.id, start, end, weeks)
+    return jsonify({
+        "lift_id": lift.id,
+        "lift_name": lift.name,
+        "start": start.isoformat() if start else None,
+        "end": end.isoformat() if end else None,
+        **analytics
+    }), 200
+
+
+# Progression trends for a specific user and lift endpoint
+@app.route('/api/users/<int:user_id>/lifts/<string:lift_name>/progression', methods=['GET'])
+def get_lift_progression(user_id, lift_name):
+    """
+    Progression trends over a user's whole history of a lift: per session e1RM with a rolling 4 week trend and effort, week over week
+    tonnage, plateau detection and recent effort. Computed with NumPy over the loaded history, see progression.py. 'points' (default 52,
+    max 365) and 'weeks' (default 12, max 104) limit how many of the most recent sessions and weeks are returned.
+    """
+    lift = lift_catalog.find(lift_name)
+    if not lift:
+        return jsonify({"error": "Lift not found"}), 404
+
+    points = min(max(request.args.get('points', SERIES_DEFAULT_POINTS, type=int), 1), SERIES_MAX_POINTS)
+    weeks = min(max(request.args.get('weeks', TONNAGE_DEFAULT_WEEKS, type=int), 1), TONNAGE_MAX_WEEKS)
+
+    history = load_lift_history(db.session, user_id, lift.id)
+    return jsonify({
+        "lift_id": lift.id,
+        "lift_name": lift.name,
+        **compute_progression(history, points, weeks)
+    }), 200
+
+
 #---------GENERATE/REMOVE PLAN ENDPOINTS ------------
 
+def generated_plan_name(body_parts):
+    """
+    Name of a generated plan, if 1 body part targeted - __ workout, if 2 - __ and __ workout, if more so on
+    """
+    if len(body_parts) == 1:
+        return f"{body_parts[0]} workout"
+    elif len(body_parts) == 2:
+        return f"{body_parts[0]} and {body_parts[1]} workout"
+    return f"{', '.join(body_parts[:-1])}, and {body_parts[-1]} workout"
+
+
 # Generate plan using decision tree model endpoint
 @app.route('/api/generate_plan', methods=['POST'])
 def generate_plan():
@@ -591,6 +888,7 @@ def generate_plan():
     Generates user plan based on user input and decision tree model. First retrieves user inputed data in json form, creates plan name based on selected user input (target body parts),
     and ensures no existing plan of identical name exists. Calls our prediction model with features (user input), returning our target information (lifts and reps). These predictions are then
     seperated into individual lifts and added to the new Plan, PlanLift information before being sent to the database.
+    Predicted names are matched to the lift catalog case and whitespace insensitively, names without a catalog lift are returned as unresolved_lifts.
     """
     try:
         data = request.get_json() # recieving json information from frontend
@@ -604,21 +902,16 @@ def generate_plan():
         if not user_id or not goal or not body_parts:
             return jsonify({"error": "user_id, goal, and body_parts are required"}), 400
 
-        # Generate plan name, if 1 body part targeted - __ workout, if 2 - __ and __ workout, if more so on
-        if len(body_parts) == 1:
-            plan_name = f"{body_parts[0]} workout"
-        elif len(body_parts) == 2:
-            plan_name = f"{body_parts[0]} and {body_parts[1]} workout"
-        else:
-            plan_name = f"{', '.join(body_parts[:-1])}, and {body_parts[-1]} workout"
+        plan_name = generated_plan_name(body_parts)
 
         # Check if a plan with the same name already exists for the user, if it does - do not make new plan
         existing_plan = Plan.query.filter_by(user_id=user_id, plan_name=plan_name).first()
         if existing_plan:
             return jsonify({"error": f"A plan named '{plan_name}' already exists."}), 400
 
-        # Predict lifts and reps using the model
-        predictions = predict_lifts(goal, body_parts)
+        # Predicted lifts and reps for this goal and body parts (precomputed when the model was loaded, or a micro-batched model call
+        # with the prediction table off), mapped onto the lift catalog
+        planned = plan_predictor.get_table().planned_lifts(goal, body_parts, lift_catalog.snapshot())
 
         # Create the Plan
         new_plan = Plan(
@@ -630,30 +923,122 @@ def generate_plan():
         db.session.add(new_plan) #adding new plan to database
         db.session.flush()  # Get the plan ID without committing
 
-        # Add lifts to the Plan
-        for prediction in predictions:
-            lift_names = prediction.get('lift_name').split(';')  # Split semicolon-separated lifts
-            for lift_name in lift_names:
-                lift_name = lift_name.strip()  # Clean up whitespace
-                lift = Lift.query.filter_by(name=lift_name).first() # finding lifts in database based on name
-
-                if not lift:
-                    continue
-
-                plan_lift = PlanLift( #Create plan lift with lift, plan_id, 
-                    plan_id=new_plan.id,
-                    lift_id=lift.id,
-                    sets=3,
-                    reps=prediction.get('reps', 10), #predicted reps
-                )
-                db.session.add(plan_lift) # Adding to database
+        # Add lifts to the Plan in one bulk insert, predicted names missing from the catalog are reported rather than added
+        if planned.lifts:
+            db.session.execute(insert(PlanLift), [
+                {"plan_id": new_plan.id, "lift_id": lift.id, "sets": 3, "reps": planned.reps} # predicted reps
+                for lift in planned.lifts
+            ])
+        if planned.unresolved:
+            app.logger.warning(f"Generated plan '{plan_name}' left out lifts missing from the catalog: {list(planned.unresolved)}")
 
         db.session.commit() 
 
-        return jsonify({"message": "Plan generated successfully", "plan_name": plan_name}), 201
+        return jsonify({
+            "message": "Plan generated successfully",
+            "plan_name": plan_name,
+            "plan_id": new_plan.id,
+            "lifts": [lift.name for lift in planned.lifts],
+            "unresolved_lifts": list(planned.unresolved), # predicted lift names with no catalog lift
+        }), 201
+
+    except Exception as e:
+        db.session.rollback()
+        return jsonify({"error": f"Server error: {e}"}), 500
+
+
+# Generate plans for a batch of users endpoint
+@app.route('/api/generate_plans', methods=['POST'])
+def generate_plans():
+    """
+    Batch form of generate_plan for onboarding a group of users at once. Takes {"plans": [{"user_id", "goal", "body_parts"}, ...]} and
+    answers with one result per request, in request order: the new plan's id, name, lifts and unresolved_lifts, or an error.
+    Predictions for the whole batch are looked up together and mapped onto one lift catalog snapshot, unknown users and plan name conflicts
+    (with existing plans or earlier requests in the batch) are found with one query each, and all Plans and PlanLifts are written
+    with two bulk inserts in a single transaction.
+    """
+    try:
+        data = request.get_json(silent=True)
+        requested = data.get('plans') if isinstance(data, dict) else None
+        if not isinstance(requested, list) or not requested:
+            return jsonify({"error": "plans must be a non-empty list"}), 400
+        max_batch = getattr(Config, 'GENERATE_PLANS_MAX_BATCH', GENERATE_PLANS_MAX_BATCH)
+        if len(requested) > max_batch:
+            return jsonify({"error": f"At most {max_batch} plans can be generated per request"}), 400
+
+        table = plan_predictor.get_table()
+        catalog = lift_catalog.snapshot()
+
+        # Validate every request, then predict the valid ones together
+        results, valid = [], [] # valid: (result, goal, body parts)
+        for item in requested:
+            item = item if isinstance(item, dict) else {}
+            user_id, goal, body_parts = item.get('user_id'), item.get('goal'), item.get('body_parts')
+            result = {"user_id": user_id}
+            results.append(result)
+            if not isinstance(user_id, int) or not goal or not isinstance(body_parts, list) or not body_parts \
+                    or not all(isinstance(part, str) for part in body_parts):
+                result["error"] = "user_id, goal, and body_parts are required"
+                continue
+            result["plan_name"] = generated_plan_name(body_parts)
+            valid.append((result, goal, body_parts))
+        planned = table.planned_lifts_many([(goal, body_parts) for _, goal, body_parts in valid], catalog)
+        pending = [(result, goal, lifts) for (result, goal, _), lifts in zip(valid, planned)] # (result, goal, planned lifts)
+
+        # One query for the users that exist and one for the plan names they already use
+        new_plans = []
+        if pending:
+            user_ids = {result["user_id"] for result, _, _ in pending}
+            plan_names = {result["plan_name"] for result, _, _ in pending}
+            known_users = set(db.session.scalars(select(User.id).where(User.id.in_(user_ids))))
+            taken = set(db.session.execute(plan_name_conflicts_query(user_ids, plan_names)).tuples())
+
+            for result, goal, planned in pending:
+                key = (result["user_id"], result["plan_name"])
+                if result["user_id"] not in known_users:
+                    result["error"] = "User not found"
+                elif key in taken:
+                    result["error"] = f"A plan named '{result['plan_name']}' already exists."
+                else:
+                    taken.add(key) # a repeat later in the batch conflicts with this one
+                    new_plans.append((result, goal, planned))
+
+        if new_plans:
+            plan_ids = db.session.scalars(
+                insert(Plan).returning(Plan.id, sort_by_parameter_order=True),
+                [
+                    {"user_id": result["user_id"], "plan_name": result["plan_name"], "plan_type": goal, "plan_duration": "50"}
+                    for result, goal, _ in new_plans
+                ]
+            ).all()
+
+            plan_lift_rows, unresolved = [], set()
+            for (result, _, planned), plan_id in zip(new_plans, plan_ids):
+                result.update({
+                    "plan_id": plan_id,
+                    "lifts": [lift.name for lift in planned.lifts],
+                    "unresolved_lifts": list(planned.unresolved),
+                })
+                plan_lift_rows.extend(
+                    {"plan_id": plan_id, "lift_id": lift.id, "sets": 3, "reps": planned.reps} for lift in planned.lifts
+                )
+                unresolved.update(planned.unresolved)
+            if plan_lift_rows:
+                db.session.execute(insert(PlanLift), plan_lift_rows)
+            if unresolved:
+                app.logger.warning(f"Generated plans left out lifts missing from the catalog: {sorted(unresolved)}")
+            db.session.commit()
+
+        summary = {"created": len(new_plans), "failed": len(results) - len(new_plans), "results": results}
+        if not new_plans:
+            return jsonify({"error": "No plans could be generated", **summary}), 400
+        if len(new_plans) < len(results):
+            return jsonify({"message": "Some plans could not be generated", **summary}), 207 # partial success
+        return jsonify({"message": "Plans generated successfully", **summary}), 201
 
     except Exception as e:
         db.session.rollback()
+        app.logger.error(f"Error generating plans: {e}")
         return jsonify({"error": f"Server error: {e}"}), 500
 
 
@@ -678,6 +1063,14 @@ def delete_plan():
         if not plan:
             return jsonify({"error": f"Plan with ID {plan_id} not found"}), 404
 
+        # Take the plan's tracked sets out of the calendar activity, then delete them (the bulk PlanLift delete below skips ORM cascades)
+        remove_activity(plan_day_counts(plan_id))
+        stats_keys = plan_stats_keys(plan_id)
+        LiftPerformance.query.filter(
+            LiftPerformance.plan_lift_id.in_(select(PlanLift.id).where(PlanLift.plan_id == plan_id))
+        ).delete(synchronize_session=False)
+        refresh_stats(stats_keys) # lift stats recomputed from the user's remaining performances
+
         # Deleting related PlanLift records manually incase cascade delete fails - models.py
         PlanLift.query.filter_by(plan_id=plan_id).delete()
 
@@ -688,10 +1081,101 @@ def delete_plan():
         return jsonify({"message": f"Plan {plan_id} deleted successfully"}), 200
 
     except Exception as e:
+        db.session.rollback()
         app.logger.error(f"Error deleting plan: {e}", exc_info=True)
         return jsonify({"error": "An unexpected error occurred while deleting the plan"}), 500
     
 
 
+# ----- PAGE ENDPOINTS  --------
+# One request per frontend page, everything the page renders assembled server side
+
+# Dashboard page endpoint
+@app.route('/api/pages/dashboard/<int:user_id>', methods=['GET'])
+def dashboard_page(user_id):
+    """
+    GET /api/pages/dashboard/{user_id}?year=&month=
+    ---
+    First name and the tracked dates of the requested month (defaults to the current month) for the dashboard calendar.
+    Two primary key lookups: the user and a daily activity range.
+    """
+    try:
+        user = db.session.get(User, user_id)
+        if not user:
+            return jsonify({"error": "User not found"}), 404
+
+        now = datetime.now()
+        year = request.args.get('year', now.year, type=int)
+        month = request.args.get('month', now.month, type=int)
+        error = calendar_month_error(year, month)
+        if error:
+            return jsonify({"error": error}), 400
+
+        return jsonify({
+            "first_name": user.first_name,
+            "year": year,
+            "month": month,
+            "tracked_dates": get_tracked_dates(user_id, year, month)
+        }), 200
+
+    except Exception as e:
+        app.logger.error(f"Error building dashboard page for user {user_id}: {str(e)}")
+        return jsonify({"error": "Server error"}), 500
+
+
+# My plans page endpoint
+@app.route('/api/pages/my-plans/<int:user_id>', methods=['GET'])
+def my_plans_page(user_id):
+    """
+    GET /api/pages/my-plans/{user_id}
+    ---
+    First name and every plan with its lifts. Two queries: the user and the joined plans read.
+    """
+    try:
+        user = db.session.get(User, user_id)
+        if not user:
+            return jsonify({"error": "User not found"}), 404
+
+        return jsonify({
+            "first_name": user.first_name,
+            "plans": get_user_plans_data(user_id)
+        }), 200
+
+    except Exception as e:
+        app.logger.error(f"Error building my plans page for user {user_id}: {str(e)}")
+        return jsonify({"error": "Server error"}), 500
+
+
+# Tracking history page endpoint
+@app.route('/api/pages/tracking-history/<int:user_id>', methods=['GET'])
+def tracking_history_page(user_id):
+    """
+    GET /api/pages/tracking-history/{user_id}?limit=&cursor=
+    ---
+    First name and one keyset page of tracking history, same paging as /api/users/{user_id}/trackings. Two queries.
+    """
+    try:
+        user = db.session.get(User, user_id)
+        if not user:
+            return jsonify({"error": "User not found"}), 404
+
+        try:
+            limit, cursor = trackings_page_args()
+        except ValueError:
+            return jsonify({"error": "Invalid cursor"}), 400
+
+        trackings, next_cursor = get_user_trackings_page(user_id, limit, cursor)
+        return jsonify({
+            "first_name": user.first_name,
+            "trackings": trackings,
+            "next_cursor": next_cursor
+        }), 200
+
+    except Exception as e:
+        app.logger.error(f"Error building tracking history page for user {user_id}: {str(e)}")
+        return jsonify({"error": "Server error"}), 500
+
+
+
 if __name__ == "__main__":
     app.run(debug=True, host='0.0.0.0', port=5001)
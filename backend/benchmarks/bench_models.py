@@ -0,0 +1,73 @@
+"""
+Plan model formulations compared (compact_tree.py): the combination classifier, where every distinct lift combination is a class,
+against the multilabel model that predicts each lift separately.
+
+For each dataset size, synthetic data is generated from the lifts catalog (generate_synthetic_data.py) and both kinds are trained
+with the same hyperparameters through train.py. Reported per kind: cross validated lift set Jaccard score and reps error, fit time,
+exported size and node count, and single row / batch inference latency of the exported model.
+
+From backend run:
+    py -m benchmarks.bench_models                                   1k, 10k and 100k rows from instance/fitness_app.db
+    py -m benchmarks.bench_models --rows 10000,1000000 --lifts lifts.csv --json results.json
+"""
+import argparse
+import json
+import os
+import tempfile
+from ML_plan_maker.model.compact_tree import MODEL_KINDS
+from ML_plan_maker.model.generate_synthetic_data import DEFAULT_LIFTS, generate_synthetic_data
+from ML_plan_maker.model.train import train
+
+PARAMS = {"criterion": ["gini"], "max_depth": [None], "min_samples_leaf": [1]}
+
+
+def bench(rows, lifts_path, folds, workers, seed):
+    """
+    One result per (rows, kind), trained on the same data.
+    """
+    results = []
+    with tempfile.TemporaryDirectory() as directory:
+        data_path = os.path.join(directory, 'data.csv')
+        generate_synthetic_data(rows, data_path, lifts_path, seed=seed, workers=workers)
+        for kind in MODEL_KINDS:
+            _, manifest = train(data_path, PARAMS, folds, workers, seed=seed, kind=kind, export_to=os.path.join(directory, kind))
+            best = manifest["cv"]["candidates"][0]
+            results.append({
+                "rows": rows,
+                "kind": kind,
+                "lift_combinations": manifest["data"]["lift_combinations"],
+                "cv_lift_score": round(best["mean_score"], 4),
+                "cv_reps_mae": round(best["reps_mae"], 3),
+                "fit_seconds": manifest["timings"]["train_seconds"],
+                "node_count": manifest["model"]["node_count"],
+                "bytes": manifest["model"]["bytes"],
+                **manifest["latency"],
+            })
+    return results
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__, formatter_class=argparse.RawDescriptionHelpFormatter)
+    parser.add_argument("--rows", type=lambda text: [int(value) for value in text.split(',')], default=[1000, 10_000, 100_000])
+    parser.add_argument("--lifts", default=DEFAULT_LIFTS, help="lifts CSV (name,targeted_area) or SQLite database")
+    parser.add_argument("--folds", type=int, default=3)
+    parser.add_argument("--workers", type=int, default=None, help="worker processes (default: CPU count)")
+    parser.add_argument("--seed", type=int, default=0)
+    parser.add_argument("--json", default=None, help="also write the results to this file")
+    args = parser.parse_args()
+
+    results = [result for rows in args.rows for result in bench(rows, args.lifts, args.folds, args.workers, args.seed)]
+
+    print(f"{'rows':>9} {'kind':12} {'combos':>8} {'jaccard':>8} {'reps mae':>9} {'fit s':>7} {'nodes':>7} {'KB':>8} "
+          f"{'p50 us':>8} {'p99 us':>8} {'batch us/row':>13}")
+    for result in results:
+        print(f"{result['rows']:9} {result['kind']:12} {result['lift_combinations']:8} {result['cv_lift_score']:8.4f} "
+              f"{result['cv_reps_mae']:9.3f} {result['fit_seconds']:7.2f} {result['node_count']:7} {result['bytes'] / 1024:8.1f} "
+              f"{result['single_row_p50_us']:8.1f} {result['single_row_p99_us']:8.1f} {result['batch_per_row_us']:13.2f}")
+    if args.json:
+        with open(args.json, 'w') as file:
+            json.dump(results, file, indent=2)
+
+
+if __name__ == "__main__":
+    main()
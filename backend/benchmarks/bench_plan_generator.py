@@ -0,0 +1,311 @@
+"""
+Plan generator latency: p50/p99 and throughput of predict_lifts, of a whole /api/generate_plan request through the Flask test
+client, and of each stage of the request on its own, for several model variants and both serving modes.
+
+Stages, as generate_plan runs them:
+    features        goal and body parts to the model's input row
+    predict         walking the exported trees for that row (compact_tree.py)
+    predict_plans   predict plus decoding the outputs to lift names and reps
+    resolve         mapping the predicted names onto the lift catalog
+    lookup          what a request does instead of the three above: the prediction table lookup, or a micro-batched model call
+    db_insert       Plan insert, PlanLift bulk insert and commit
+
+Variants are the bundled model plus, for each --kinds x --rows, a model trained on that many rows of synthetic data
+(generate_synthetic_data.py, train.py --export-to). Modes are "table" (the precomputed prediction table, the default) and
+"batched" (MODEL_PREDICTION_TABLE off, predictions micro-batched). predict_lifts is also timed from --threads threads at once,
+where batching matters.
+
+The app runs on a throwaway SQLite database built through the migrations, seeded with the lifts and one user per request.
+Results are keyed by (variant, mode, scenario); --json writes them with the run's environment, --compare reads an earlier run's
+file and lists the scenarios whose p50 grew by more than --threshold (and by more than --min-delta-us, so microsecond stages do
+not flag noise), exiting 1 if any did.
+
+From backend run (needs config.py, like the app):
+    py -m benchmarks.bench_plan_generator                                   bundled model, 10k and 100k row variants
+    py -m benchmarks.bench_plan_generator --rows none --repeat 5000 --json before.json
+    py -m benchmarks.bench_plan_generator --rows none --repeat 5000 --json after.json --compare before.json
+"""
+import argparse
+import contextlib
+import io
+import json
+import os
+import platform
+import shutil
+import subprocess
+import sys
+import tempfile
+import threading
+import time
+from datetime import datetime, timezone
+import numpy as np
+from sqlalchemy import insert
+
+BACKEND_DIR = os.path.dirname(os.path.dirname(os.path.abspath(__file__)))
+REQUESTS = [ # (goal, body parts), cycled through by every scenario
+    ("Strength", ["Legs"]), ("Hypertrophy", ["Chest", "Arms"]), ("Strength", ["Back", "Legs", "Full Body"]),
+    ("Hypertrophy", ["Legs", "Chest", "Arms", "Back", "Full Body"]), ("Strength", ["Arms"]), ("Hypertrophy", ["Back"]),
+]
+MODES = ["table", "batched"]
+
+
+def stats(timings_ns, elapsed_s=None):
+    """
+    p50/p99/mean in microseconds and calls per second, from per call timings (and the wall time when calls overlapped).
+    """
+    timings_us = np.asarray(timings_ns, dtype=np.float64) / 1000
+    elapsed_s = elapsed_s if elapsed_s is not None else timings_us.sum() / 1e6
+    return {
+        "n": len(timings_us),
+        "p50_us": round(float(np.percentile(timings_us, 50)), 2),
+        "p99_us": round(float(np.percentile(timings_us, 99)), 2),
+        "mean_us": round(float(timings_us.mean()), 2),
+        "throughput_per_s": round(len(timings_us) / elapsed_s, 1),
+    }
+
+
+def measure(call, repeat, warmup=20):
+    """
+    Times call(i) for i in range(repeat) after warmup untimed calls of call(repeat), call(repeat + 1)...
+    """
+    for index in range(repeat, repeat + warmup):
+        call(index)
+    timings = []
+    for index in range(repeat):
+        start = time.perf_counter_ns()
+        call(index)
+        timings.append(time.perf_counter_ns() - start)
+    return stats(timings)
+
+
+def measure_concurrent(call, repeat, threads):
+    """
+    Times call(i) for i in range(repeat) spread over threads running at once.
+    """
+    timings = [[] for _ in range(threads)]
+    barrier = threading.Barrier(threads + 1)
+
+    def worker(thread):
+        barrier.wait()
+        for index in range(thread, repeat, threads):
+            start = time.perf_counter_ns()
+            call(index)
+            timings[thread].append(time.perf_counter_ns() - start)
+
+    workers = [threading.Thread(target=worker, args=(thread,)) for thread in range(threads)]
+    for thread in workers:
+        thread.start()
+    barrier.wait()
+    start = time.perf_counter()
+    for thread in workers:
+        thread.join()
+    return stats([timing for thread_timings in timings for timing in thread_timings], time.perf_counter() - start)
+
+
+def tree_predict(model, X):
+    """
+    The exported trees' raw outputs, without decoding them to lift names.
+    """
+    if hasattr(model, "lifts"): # MultiLabelTree
+        return model.lifts.predict(X), model.reps.predict(X)
+    return model.predict(X)
+
+
+def build_variants(kinds, rows, lifts_path, workers, directory):
+    """
+    (name, model directory) of the bundled model and one trained model per kind and dataset size.
+    """
+    from ML_plan_maker.model.compact_tree import MODEL_DIR
+    from ML_plan_maker.model.generate_synthetic_data import generate_synthetic_data
+    from ML_plan_maker.model.train import train
+
+    variants = [("bundled", MODEL_DIR)]
+    grid = {"criterion": ["gini"], "max_depth": [None], "min_samples_leaf": [1]}
+    for row_count in rows:
+        data_path = os.path.join(directory, f"data-{row_count}.csv")
+        generate_synthetic_data(row_count, data_path, lifts_path, workers=workers)
+        for kind in kinds:
+            path = os.path.join(directory, f"{kind}-{row_count}")
+            train(data_path, grid, folds=2, workers=workers, kind=kind, export_to=path)
+            variants.append((f"{kind}-{row_count}", path))
+    return variants
+
+
+def point_app_at(app, db, database_uri):
+    """
+    Rebinds the app's Flask-SQLAlchemy engine to another database.
+    """
+    app.config["SQLALCHEMY_DATABASE_URI"] = database_uri
+    app.extensions.pop("sqlalchemy")
+    db.init_app(app)
+
+
+def git_commit():
+    try:
+        return subprocess.run(["git", "rev-parse", "--short", "HEAD"], cwd=BACKEND_DIR, capture_output=True, text=True).stdout.strip()
+    except OSError:
+        return None
+
+
+def bench_variant(app, predictor, user_ids, repeat, threads):
+    """
+    Results of every scenario for the model predictor currently serves.
+    """
+    from models import db, Plan, PlanLift
+    from lift_catalog import lift_catalog
+    from predict import Prediction, key_features, predict_lifts, prediction_key, resolve_prediction
+    from config import Config
+
+    table = predictor.get_table()
+    model = table.model
+    request_at = lambda index: REQUESTS[index % len(REQUESTS)]
+    rows = [np.array([key_features(prediction_key(goal, parts))]) for goal, parts in REQUESTS]
+    plans = [Prediction(*model.predict_plans(row)[0]) for row in rows]
+    results = {}
+
+    results["predict_lifts"] = measure(lambda index: predict_lifts(*request_at(index)), repeat)
+    results["predict_lifts_concurrent"] = measure_concurrent(lambda index: predict_lifts(*request_at(index)), repeat, threads)
+
+    with app.app_context():
+        catalog = lift_catalog.snapshot()
+        results["stage_features"] = measure(lambda index: np.array([key_features(prediction_key(*request_at(index)))]), repeat)
+        results["stage_predict"] = measure(lambda index: tree_predict(model, rows[index % len(rows)]), repeat)
+        results["stage_predict_plans"] = measure(lambda index: model.predict_plans(rows[index % len(rows)]), repeat)
+        results["stage_resolve"] = measure(lambda index: resolve_prediction(plans[index % len(plans)], catalog), repeat)
+        results["stage_lookup"] = measure(lambda index: table.planned_lifts(*request_at(index), catalog), repeat)
+
+        planned = [table.planned_lifts(goal, parts, catalog) for goal, parts in REQUESTS]
+        def db_insert(index):
+            plan = Plan(user_id=user_ids[0], plan_name=f"bench {index}", plan_type="Strength", plan_duration="50")
+            db.session.add(plan)
+            db.session.flush()
+            lifts = planned[index % len(planned)]
+            db.session.execute(insert(PlanLift), [
+                {"plan_id": plan.id, "lift_id": lift.id, "sets": 3, "reps": lifts.reps} for lift in lifts.lifts
+            ])
+            db.session.commit()
+        results["stage_db_insert"] = measure(db_insert, repeat, warmup=0)
+        db.session.execute(PlanLift.__table__.delete())
+        db.session.execute(Plan.__table__.delete())
+        db.session.commit()
+
+    client = app.test_client()
+    headers = {"X-API-KEY": Config.API_KEY}
+    def generate_plan(index):
+        goal, parts = request_at(index)
+        response = client.post("/api/generate_plan", json={"user_id": user_ids[index], "goal": goal, "body_parts": parts}, headers=headers)
+        if response.status_code != 201:
+            raise RuntimeError(f"generate_plan answered {response.status_code}: {response.get_json()}")
+    results["generate_plan"] = measure(generate_plan, repeat) # one user per call, generated plan names repeat
+    with app.app_context():
+        db.session.execute(PlanLift.__table__.delete())
+        db.session.execute(Plan.__table__.delete())
+        db.session.commit()
+    return results
+
+
+def compare(results, baseline_path, threshold, min_delta_us):
+    """
+    Prints p50 ratios against an earlier run's results, returns the (key, ratio) pairs that regressed.
+    """
+    with open(baseline_path) as file:
+        baseline = {(entry["variant"], entry["mode"], entry["scenario"]): entry for entry in json.load(file)["results"]}
+    regressions = []
+    print(f"\nagainst {baseline_path} (p50 now / before)")
+    for entry in results:
+        key = (entry["variant"], entry["mode"], entry["scenario"])
+        before = baseline.get(key)
+        if before is None:
+            continue
+        ratio = entry["p50_us"] / before["p50_us"] if before["p50_us"] else float("inf")
+        regressed = ratio > threshold and entry["p50_us"] - before["p50_us"] > min_delta_us
+        print(f"{' / '.join(key):60} {before['p50_us']:10.1f} -> {entry['p50_us']:10.1f} us  x{ratio:5.2f}{'  REGRESSION' if regressed else ''}")
+        if regressed:
+            regressions.append((key, ratio))
+    return regressions
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__, formatter_class=argparse.RawDescriptionHelpFormatter)
+    parser.add_argument("--rows", type=lambda text: [] if text == "none" else [int(value) for value in text.split(",")],
+                        default=[10_000, 100_000], help="training rows of the trained variants, 'none' for the bundled model only")
+    parser.add_argument("--kinds", type=lambda text: text.split(","), default=["combination", "multilabel"])
+    parser.add_argument("--modes", type=lambda text: text.split(","), default=MODES)
+    parser.add_argument("--lifts", default=None, help="lifts CSV or SQLite database for the synthetic data (default: the seeded catalog)")
+    parser.add_argument("--repeat", type=int, default=1000, help="timed calls per scenario")
+    parser.add_argument("--threads", type=int, default=8, help="threads of the concurrent predict_lifts scenario")
+    parser.add_argument("--workers", type=int, default=None, help="processes for generating and training (default: CPU count)")
+    parser.add_argument("--json", default=None, help="write the results to this file")
+    parser.add_argument("--compare", default=None, help="earlier --json output to compare against")
+    parser.add_argument("--threshold", type=float, default=1.2, help="p50 ratio counted as a regression")
+    parser.add_argument("--min-delta-us", type=float, default=10, help="smallest p50 increase counted as a regression")
+    args = parser.parse_args()
+
+    with contextlib.redirect_stdout(io.StringIO()): # import and seeding progress lines
+        import app as app_module
+        from app import app
+        from models import db, User
+        from migrate import upgrade
+        import db_creation
+        import predict
+
+    directory = tempfile.mkdtemp(prefix="bench-plans-")
+    try:
+        point_app_at(app, db, f"sqlite:///{os.path.join(directory, 'bench.db')}")
+        with contextlib.redirect_stdout(io.StringIO()):
+            with app.app_context():
+                upgrade(db.engine)
+            db_creation.populate_lifts()
+        with app.app_context():
+            db.session.execute(insert(User), [
+                {"username": f"bench{index}", "password_hash": "x", "first_name": "Bench", "last_name": "User", "email": f"bench{index}@example.com"}
+                for index in range(args.repeat + 20) # every timed and warm-up generate_plan call
+            ])
+            db.session.commit()
+            user_ids = sorted(user.id for user in User.query.all())
+
+        lifts_path = args.lifts or os.path.join(directory, "bench.db")
+        variants = build_variants(args.kinds, args.rows, lifts_path, args.workers, directory)
+
+        results = []
+        for variant, path in variants:
+            for mode in args.modes:
+                predictor = predict.PlanPredictor(path)
+                if mode == "batched":
+                    predictor.use_batching(app_module.MODEL_BATCH_MAX_SIZE, app_module.MODEL_BATCH_MAX_WAIT_MS)
+                predict.plan_predictor = app_module.plan_predictor = predictor # predict_lifts and the app read these globals
+                with contextlib.redirect_stdout(io.StringIO()):
+                    predictor.load()
+                for scenario, result in bench_variant(app, predictor, user_ids, args.repeat, args.threads).items():
+                    results.append({"variant": variant, "mode": mode, "scenario": scenario, **result})
+                if predictor.batcher is not None:
+                    predictor.batcher.close()
+    finally:
+        shutil.rmtree(directory, ignore_errors=True)
+
+    print(f"{'variant':18} {'mode':8} {'scenario':24} {'p50 us':>10} {'p99 us':>10} {'per s':>10}")
+    for entry in results:
+        print(f"{entry['variant']:18} {entry['mode']:8} {entry['scenario']:24} {entry['p50_us']:10.1f} {entry['p99_us']:10.1f} "
+              f"{entry['throughput_per_s']:10.0f}")
+
+    if args.json:
+        with open(args.json, "w") as file:
+            json.dump({
+                "created_at": datetime.now(timezone.utc).isoformat(timespec="seconds"),
+                "environment": {
+                    "commit": git_commit(),
+                    "python": platform.python_version(),
+                    "numpy": np.__version__,
+                    "platform": platform.platform(),
+                    "cpu_count": os.cpu_count(),
+                },
+                "args": {"rows": args.rows, "kinds": args.kinds, "modes": args.modes, "repeat": args.repeat, "threads": args.threads},
+                "results": results,
+            }, file, indent=2)
+
+    if args.compare and compare(results, args.compare, args.threshold, args.min_delta_us):
+        sys.exit(1)
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,101 @@
+"""
+Per request cost of the progression endpoint's work (load_lift_history + compute_progression) on a large history.
+
+Builds a throwaway SQLite database through the migrations, fills it with one user's synthetic history of one lift and times
+loading and computing separately. Foreign keys are not enforced by SQLite, so no users, plans or lifts rows are created.
+
+From backend run:
+    py -m benchmarks.bench_progression                      100k sets, 20 timed requests
+    py -m benchmarks.bench_progression --rows 1000000 --repeat 5
+"""
+import argparse
+import contextlib
+import io
+import os
+import statistics
+import tempfile
+import time
+from datetime import datetime, timedelta
+import numpy as np
+from sqlalchemy import create_engine, insert
+from migrate import upgrade
+from models import LiftPerformance
+from progression import compute_progression, load_lift_history
+
+USER_ID = 1
+LIFT_ID = 1
+
+
+def synthetic_history(rows, sets_per_session=5, seed=0):
+    """
+    rows sets of a lift trained every other day, weight trending up with noise, reps 3-12 and 0-4 reps in reserve.
+    """
+    rng = np.random.default_rng(seed)
+    session = np.arange(rows) // sets_per_session
+    start = datetime(2000, 1, 1)
+    seconds = session * 2 * 86400 + 18 * 3600 + (np.arange(rows) % sets_per_session) * 180
+    weight = np.round(95 + session * 0.05 + rng.normal(0, 5, rows), 1)
+    reps = rng.integers(3, 13, rows)
+    rir = rng.integers(0, 5, rows)
+    return [
+        {
+            "plan_lift_id": 1,
+            "lift_id": LIFT_ID,
+            "user_id": USER_ID,
+            "date": start + timedelta(seconds=offset),
+            "reps_performed": set_reps,
+            "weight_performed": set_weight,
+            "reps_in_reserve": set_rir,
+        }
+        for offset, set_weight, set_reps, set_rir in zip(seconds.tolist(), weight.tolist(), reps.tolist(), rir.tolist())
+    ]
+
+
+def percentile(values, fraction):
+    ordered = sorted(values)
+    return ordered[min(int(len(ordered) * fraction), len(ordered) - 1)]
+
+
+def report(name, timings_ms):
+    print(f"{name:10} median {statistics.median(timings_ms):8.2f} ms   p95 {percentile(timings_ms, 0.95):8.2f} ms   min {min(timings_ms):8.2f} ms")
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__, formatter_class=argparse.RawDescriptionHelpFormatter)
+    parser.add_argument("--rows", type=int, default=100_000, help="sets in the benchmarked history")
+    parser.add_argument("--repeat", type=int, default=20, help="timed requests")
+    args = parser.parse_args()
+
+    handle, db_path = tempfile.mkstemp(suffix=".db")
+    os.close(handle)
+    engine = create_engine(f"sqlite:///{db_path}")
+    try:
+        with contextlib.redirect_stdout(io.StringIO()): # migration progress lines
+            upgrade(engine)
+        with engine.begin() as conn:
+            conn.execute(insert(LiftPerformance), synthetic_history(args.rows))
+
+        load_ms, compute_ms, total_ms = [], [], []
+        with engine.connect() as conn:
+            compute_progression(load_lift_history(conn, USER_ID, LIFT_ID)) # warm up the page cache
+            for _ in range(args.repeat):
+                start = time.perf_counter()
+                history = load_lift_history(conn, USER_ID, LIFT_ID)
+                loaded = time.perf_counter()
+                result = compute_progression(history)
+                done = time.perf_counter()
+                load_ms.append((loaded - start) * 1000)
+                compute_ms.append((done - loaded) * 1000)
+                total_ms.append((done - start) * 1000)
+
+        print(f"{args.rows} sets, {result['sessions']} sessions, {args.repeat} requests")
+        report("load", load_ms)
+        report("compute", compute_ms)
+        report("total", total_ms)
+    finally:
+        engine.dispose()
+        os.remove(db_path)
+
+
+if __name__ == "__main__":
+    main()
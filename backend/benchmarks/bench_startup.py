@@ -0,0 +1,84 @@
+"""
+Backend startup cost: how long `import app` takes and which modules it spends that time on, plus the plan generator's model load
+that now happens after startup (warm-up thread or first plan request).
+
+Every measurement runs in a fresh interpreter, so nothing is already imported. Import times come from `python -X importtime`;
+a module's cumulative time includes the modules it imports first.
+
+From backend run:
+    py -m benchmarks.bench_startup                          5 runs, 15 slowest modules
+    py -m benchmarks.bench_startup --repeat 10 --top 30
+"""
+import argparse
+import os
+import statistics
+import subprocess
+import sys
+from collections import defaultdict
+
+BACKEND_DIR = os.path.dirname(os.path.dirname(os.path.abspath(__file__)))
+
+IMPORT_APP = "import time; start = time.perf_counter(); import app; print(time.perf_counter() - start)"
+LOAD_MODEL = (
+    "import time; from predict import plan_predictor; start = time.perf_counter(); plan_predictor.load(); "
+    "print(time.perf_counter() - start)"
+)
+
+
+def run_python(code, *flags):
+    """
+    Runs code in a fresh interpreter from the backend directory, returns (stdout, stderr).
+    """
+    result = subprocess.run(
+        [sys.executable, *flags, "-c", code], cwd=BACKEND_DIR, capture_output=True, text=True, check=True
+    )
+    return result.stdout, result.stderr
+
+
+def last_float(output):
+    return float(output.strip().splitlines()[-1])
+
+
+def import_times(stderr):
+    """
+    module -> (self us, cumulative us) from `-X importtime` output, for top level imports and their dependencies alike.
+    """
+    times = {}
+    for line in stderr.splitlines():
+        if not line.startswith("import time:") or "[us]" in line:
+            continue
+        self_us, cumulative_us, module = line[len("import time:"):].split("|")
+        times[module.strip()] = (int(self_us), int(cumulative_us))
+    return times
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__, formatter_class=argparse.RawDescriptionHelpFormatter)
+    parser.add_argument("--repeat", type=int, default=5, help="fresh interpreters per measurement")
+    parser.add_argument("--top", type=int, default=15, help="slowest modules listed")
+    args = parser.parse_args()
+
+    startup_s, load_s = [], []
+    cumulative, self_time = defaultdict(list), defaultdict(list)
+    for _ in range(args.repeat):
+        stdout, stderr = run_python(IMPORT_APP, "-X", "importtime")
+        startup_s.append(last_float(stdout))
+        for module, (self_us, cumulative_us) in import_times(stderr).items():
+            cumulative[module].append(cumulative_us)
+            self_time[module].append(self_us)
+        load_s.append(last_float(run_python(LOAD_MODEL)[0]))
+
+    print(f"{args.repeat} fresh interpreters, medians")
+    print(f"import app   {statistics.median(startup_s) * 1000:8.1f} ms   (includes -X importtime overhead)")
+    print(f"model load   {statistics.median(load_s) * 1000:8.1f} ms   (after startup, in the warm-up thread)")
+    loaded = [module for module in ("pandas", "sklearn", "ML_plan_maker.model.decision_tree") if module in cumulative]
+    print(f"ML stack imported at startup: {', '.join(loaded) if loaded else 'no'}")
+
+    print(f"\n{'module':40} {'cumulative ms':>14} {'self ms':>10}")
+    slowest = sorted(cumulative, key=lambda module: statistics.median(cumulative[module]), reverse=True)[:args.top]
+    for module in slowest:
+        print(f"{module:40} {statistics.median(cumulative[module]) / 1000:14.1f} {statistics.median(self_time[module]) / 1000:10.1f}")
+
+
+if __name__ == "__main__":
+    main()
@@ -1,5 +1,7 @@
 from app import app
 from models import db, Lift
+from lift_catalog import bump_catalog_version, lift_catalog
+from migrate import upgrade
 
 def populate_lifts():
     predefined_lifts = [
@@ -63,16 +65,21 @@ def populate_lifts():
     ]
 
     with app.app_context():
+        added = False
         for lift_data in predefined_lifts:
             existing_lift = Lift.query.filter_by(name=lift_data["name"]).first()
             if not existing_lift:
                 new_lift = Lift(name=lift_data["name"], targeted_area = lift_data["targeted_area"])
                 db.session.add(new_lift)
+                added = True
                 print(f"Added lift: {new_lift.name}")
+        if added:
+            bump_catalog_version() # running backends reload their lift catalog
         db.session.commit()
+        lift_catalog.invalidate()
         print("Lifts populated successfully!")
 
 if __name__ == "__main__":
     with app.app_context():
-     db.create_all()
+     upgrade(db.engine) # creates or upgrades the schema through the versioned migrations
      populate_lifts()
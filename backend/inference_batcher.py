@@ -0,0 +1,148 @@
+import threading
+import time
+from collections import deque
+from concurrent.futures import Future
+
+BATCH_SIZE_BUCKETS = (1, 2, 4, 8, 16, 32, 64, 128, 256) # upper bounds of the batch size and queue depth histograms, last bucket is +inf
+WAIT_BUCKETS_MS = (0.5, 1, 2, 5, 10, 25, 50, 100) # upper bounds of the submit to result latency histogram
+
+
+class Histogram:
+    """
+    Counts of observed values per bucket, a value goes in the first bucket whose upper bound it does not exceed.
+    """
+    def __init__(self, bounds):
+        self.bounds = bounds
+        self.buckets = [0] * (len(bounds) + 1)
+        self.count = 0
+        self.total = 0.0
+        self.max = 0
+
+    def observe(self, value):
+        self.count += 1
+        self.total += value
+        self.max = max(self.max, value)
+        self.buckets[next((i for i, bound in enumerate(self.bounds) if value <= bound), len(self.bounds))] += 1
+
+    def to_dict(self):
+        return {
+            "count": self.count,
+            "avg": round(self.total / self.count, 3) if self.count else 0,
+            "max": round(self.max, 3),
+            "histogram": dict(zip([str(bound) for bound in self.bounds] + ["inf"], self.buckets)),
+        }
+
+
+class MicroBatcher:
+    """
+    Gathers items submitted by concurrent threads and hands them to predict_batch together: a batch is dispatched once it holds
+    max_batch_size items or its oldest item has waited max_wait_ms, so one vectorized call replaces one call per request, at the
+    cost of at most max_wait_ms of extra latency. predict_batch(items) returns one result per item, in order; if it raises, every
+    submitter of that batch gets the exception.
+
+    Batches run one at a time on a daemon thread started with the first submit. After close() the queue is drained and later
+    submits are predicted inline.
+    """
+    def __init__(self, predict_batch, max_batch_size=64, max_wait_ms=2.0, name="micro-batcher"):
+        self.predict_batch = predict_batch
+        self.max_batch_size = max_batch_size
+        self.max_wait = max_wait_ms / 1000
+        self.name = name
+        self._pending = deque() # (item, future, submitted at)
+        self._condition = threading.Condition()
+        self._thread = None
+        self._closed = False
+        # metrics, updated under the condition's lock
+        self.batches = 0
+        self.failed_batches = 0
+        self.batch_sizes = Histogram(BATCH_SIZE_BUCKETS)
+        self.queue_depths = Histogram(BATCH_SIZE_BUCKETS) # queue depth seen by each submitted item, itself included
+        self.waits_ms = Histogram(WAIT_BUCKETS_MS)
+
+    def submit(self, item, timeout=None):
+        """
+        Result for one item, blocks until its batch has run.
+        """
+        return self.submit_many([item], timeout)[0]
+
+    def submit_many(self, items, timeout=None):
+        """
+        Results for several items from one caller, queued together so they share batches.
+        """
+        if self._closed:
+            return list(self.predict_batch(list(items)))
+        futures = []
+        with self._condition:
+            if self._thread is None:
+                self._thread = threading.Thread(target=self._run, name=self.name, daemon=True)
+                self._thread.start()
+            now = time.perf_counter()
+            for item in items:
+                future = Future()
+                self._pending.append((item, future, now))
+                self.queue_depths.observe(len(self._pending))
+                futures.append(future)
+            self._condition.notify()
+        return [future.result(timeout) for future in futures]
+
+    def close(self):
+        with self._condition:
+            self._closed = True
+            self._condition.notify()
+
+    def _next_batch(self):
+        """
+        Waits for the next batch to be due and takes it off the queue, None once closed and drained.
+        """
+        with self._condition:
+            while not self._pending:
+                if self._closed:
+                    return None
+                self._condition.wait()
+            deadline = self._pending[0][2] + self.max_wait
+            while len(self._pending) < self.max_batch_size and not self._closed:
+                remaining = deadline - time.perf_counter()
+                if remaining <= 0:
+                    break
+                self._condition.wait(remaining)
+            size = min(len(self._pending), self.max_batch_size)
+            return [self._pending.popleft() for _ in range(size)]
+
+    def _run(self):
+        while (batch := self._next_batch()) is not None:
+            try:
+                results = self.predict_batch([item for item, _, _ in batch])
+                if len(results) != len(batch):
+                    raise ValueError(f"predict_batch returned {len(results)} results for {len(batch)} items")
+            except Exception as e:
+                failed = True
+                for _, future, _ in batch:
+                    future.set_exception(e)
+            else:
+                failed = False
+                for (_, future, _), result in zip(batch, results):
+                    future.set_result(result)
+
+            done = time.perf_counter()
+            with self._condition:
+                self.batches += 1
+                self.failed_batches += failed
+                self.batch_sizes.observe(len(batch))
+                for _, _, submitted in batch:
+                    self.waits_ms.observe((done - submitted) * 1000)
+
+    def metrics(self):
+        """
+        Snapshot of the batching counters and histograms.
+        """
+        with self._condition:
+            return {
+                "max_batch_size": self.max_batch_size,
+                "max_wait_ms": self.max_wait * 1000,
+                "queue_depth": len(self._pending),
+                "batches": self.batches,
+                "failed_batches": self.failed_batches,
+                "batch_size": self.batch_sizes.to_dict(),
+                "queue_depth_at_submit": self.queue_depths.to_dict(),
+                "wait_ms": self.waits_ms.to_dict(),
+            }
@@ -0,0 +1,99 @@
+import hashlib
+import json
+import threading
+import time
+from collections import namedtuple
+from sqlalchemy import select
+from sqlalchemy.dialects.sqlite import insert as sqlite_insert
+from models import db, Lift, LiftCatalogVersion
+
+CatalogLift = namedtuple('CatalogLift', ['id', 'name', 'targeted_area'])
+
+CATALOG_VERSION_ID = 1 # id of the single lift_catalog_version row
+
+
+def normalize_lift_name(name):
+    """
+    Case and whitespace insensitive form of a lift name, so ' Hip Adductors' and 'hip  adductors' find the same lift.
+    """
+    return " ".join(name.split()).casefold()
+
+
+def bump_catalog_version():
+    """
+    Marks the lift catalog as changed in the current transaction, every process reloads its catalog on its next version check.
+    """
+    statement = sqlite_insert(LiftCatalogVersion).values(id=CATALOG_VERSION_ID, version=1)
+    db.session.execute(statement.on_conflict_do_update(
+        index_elements=[LiftCatalogVersion.id],
+        set_={"version": LiftCatalogVersion.version + 1}
+    ))
+
+
+class CatalogSnapshot:
+    """
+    Immutable view of the lifts table at one catalog version.
+    """
+    def __init__(self, version, lifts):
+        self.version = version
+        self.lifts = lifts
+        self.by_id = {lift.id: lift for lift in lifts}
+        self.by_name = {normalize_lift_name(lift.name): lift for lift in lifts}
+        self.json = [{"id": lift.id, "name": lift.name} for lift in lifts] # /api/lifts payload
+        self.etag = hashlib.sha1(json.dumps([version, self.json]).encode()).hexdigest()
+
+
+class LiftCatalog:
+    """
+    Process wide cache of the lifts table with id -> lift and normalized name -> lift maps. Lifts only change when they are seeded,
+    so the catalog is loaded once and reloaded only when the catalog version stored in the database moves. The version is checked
+    at most every check_interval seconds (one primary key lookup), invalidate() forces a reload on the next access.
+    """
+    def __init__(self, check_interval=60):
+        self.check_interval = check_interval
+        self._snapshot = None
+        self._checked_at = 0
+        self._lock = threading.Lock()
+
+    def _stored_version(self):
+        return db.session.execute(select(LiftCatalogVersion.version).where(LiftCatalogVersion.id == CATALOG_VERSION_ID)).scalar() or 0
+
+    def _load(self, version):
+        rows = db.session.execute(select(Lift.id, Lift.name, Lift.targeted_area).order_by(Lift.id)).all()
+        return CatalogSnapshot(version, [CatalogLift(*row) for row in rows])
+
+    def snapshot(self):
+        """
+        Current catalog snapshot, reloading it first if the stored catalog version changed. Needs an app context.
+        """
+        snapshot = self._snapshot
+        if snapshot is not None and time.monotonic() - self._checked_at < self.check_interval:
+            return snapshot
+
+        with self._lock:
+            if self._snapshot is not None and time.monotonic() - self._checked_at < self.check_interval:
+                return self._snapshot # another thread just revalidated
+            version = self._stored_version()
+            if self._snapshot is None or self._snapshot.version != version:
+                self._snapshot = self._load(version)
+            self._checked_at = time.monotonic()
+            return self._snapshot
+
+    def invalidate(self):
+        with self._lock:
+            self._snapshot = None
+
+    def get(self, lift_id):
+        """
+        Lift by id, or None.
+        """
+        return self.snapshot().by_id.get(lift_id)
+
+    def find(self, name):
+        """
+        Lift by name (case and whitespace insensitive), or None.
+        """
+        return self.snapshot().by_name.get(normalize_lift_name(name))
+
+
+lift_catalog = LiftCatalog()
@@ -0,0 +1,175 @@
+from sqlalchemy import and_, delete, insert, or_, select
+from sqlalchemy.dialects.sqlite import insert as sqlite_insert
+from models import db, LiftPerformance, PlanLift, UserLiftStats
+from analytics import brzycki, epley
+
+STATS_COLUMNS = [column.name for column in UserLiftStats.__table__.columns if column.name not in ('user_id', 'lift_id')]
+
+
+def keys_filter(table, keys):
+    """
+    WHERE clause matching any of the (user_id, lift_id) keys. Spelled as OR'ed equalities rather than a row value IN list,
+    which SQLite can only answer by scanning the whole index.
+    """
+    return or_(*(and_(table.user_id == user_id, table.lift_id == lift_id) for user_id, lift_id in keys))
+
+
+def empty_stats():
+    return {
+        "sets_count": 0,
+        "total_weight": 0.0,
+        "total_reps": 0,
+        "total_volume": 0.0,
+        "best_weight": None,
+        "best_weight_date": None,
+        "best_e1rm": None,
+        "best_e1rm_date": None,
+        "best_e1rm_brzycki": None,
+        "first_performed": None,
+        "last_performed": None,
+    }
+
+
+def add_set(stats, weight, reps, performed):
+    """
+    Folds one set into a stats dict in place and returns the personal records it set as {"weight": bool, "e1rm": bool}.
+    A lift's first set is not a record, there is nothing to beat yet. Sets must be added in the order they were performed.
+    """
+    e1rm = epley(weight, reps)
+    e1rm_brzycki = brzycki(weight, reps)
+    records = {
+        "weight": stats["sets_count"] > 0 and weight > stats["best_weight"],
+        "e1rm": stats["sets_count"] > 0 and e1rm > stats["best_e1rm"],
+    }
+
+    stats["sets_count"] += 1
+    stats["total_weight"] += weight
+    stats["total_reps"] += reps
+    stats["total_volume"] += weight * reps
+    if stats["best_weight"] is None or weight > stats["best_weight"]:
+        stats["best_weight"], stats["best_weight_date"] = weight, performed
+    if stats["best_e1rm"] is None or e1rm > stats["best_e1rm"]:
+        stats["best_e1rm"], stats["best_e1rm_date"] = e1rm, performed
+    if e1rm_brzycki is not None and (stats["best_e1rm_brzycki"] is None or e1rm_brzycki > stats["best_e1rm_brzycki"]):
+        stats["best_e1rm_brzycki"] = e1rm_brzycki
+    if stats["first_performed"] is None:
+        stats["first_performed"] = performed
+    stats["last_performed"] = performed
+    return records
+
+
+def load_stats(executor, keys):
+    """
+    Current stats rows for a set of (user_id, lift_id) keys, one primary key lookup per key.
+    """
+    if not keys:
+        return {}
+    rows = executor.execute(select(UserLiftStats.__table__).where(
+        keys_filter(UserLiftStats, keys)
+    )).mappings()
+    return {(row["user_id"], row["lift_id"]): {name: row[name] for name in STATS_COLUMNS} for row in rows}
+
+
+def write_stats(executor, stats_by_key):
+    """
+    Upserts full stats rows for (user_id, lift_id) keys.
+    """
+    if not stats_by_key:
+        return
+    statement = sqlite_insert(UserLiftStats)
+    executor.execute(statement.on_conflict_do_update(
+        index_elements=[UserLiftStats.user_id, UserLiftStats.lift_id],
+        set_={name: statement.excluded[name] for name in STATS_COLUMNS}
+    ), [{"user_id": user_id, "lift_id": lift_id, **stats} for (user_id, lift_id), stats in stats_by_key.items()])
+
+
+def record_sets(sets):
+    """
+    Folds newly tracked sets, (user_id, lift_id, weight, reps, performed) tuples, into user_lift_stats in the current transaction and
+    returns the personal records of each set in order. Call it after the sets' performances are written: the transaction then already
+    holds SQLite's write lock, so no other request can change the stats rows between this read and write.
+    """
+    sets = list(sets)
+    stats_by_key = load_stats(db.session, {(user_id, lift_id) for user_id, lift_id, *_ in sets})
+    records = [
+        add_set(stats_by_key.setdefault((user_id, lift_id), empty_stats()), weight, reps, performed)
+        for user_id, lift_id, weight, reps, performed in sets
+    ]
+    write_stats(db.session, stats_by_key)
+    return records
+
+
+def stats_from_performances_query(keys=None):
+    """
+    Performances of the given (user_id, lift_id) keys, or of every user and lift when keys is None, grouped by key in the order they were performed.
+    """
+    query = select(
+        LiftPerformance.user_id,
+        LiftPerformance.lift_id,
+        LiftPerformance.weight_performed,
+        LiftPerformance.reps_performed,
+        LiftPerformance.date,
+    ).order_by(LiftPerformance.user_id, LiftPerformance.lift_id, LiftPerformance.date, LiftPerformance.id)
+    return query.where(keys_filter(LiftPerformance, keys)) if keys is not None else query
+
+
+def stats_from_performances(executor, keys=None, batch_size=1000):
+    """
+    Recomputes stats from lift_performances for the given (user_id, lift_id) keys, or for every user and lift when keys is None.
+    Performances are streamed and folded with add_set, the same code path as incremental updates.
+    """
+    if keys is not None and not keys:
+        return {}
+    query = stats_from_performances_query(keys)
+
+    stats_by_key = {}
+    for user_id, lift_id, weight, reps, performed in executor.execute(query.execution_options(yield_per=batch_size)):
+        add_set(stats_by_key.setdefault((user_id, lift_id), empty_stats()), weight, reps, performed)
+    return stats_by_key
+
+
+def refresh_stats(keys):
+    """
+    Recomputes the stats of (user_id, lift_id) keys after some of their performances were deleted, in the current transaction.
+    Sums could be decremented but bests cannot, so the remaining performances of each key are folded again; keys left without
+    performances lose their row.
+    """
+    keys = set(keys)
+    if not keys:
+        return
+    stats_by_key = stats_from_performances(db.session, keys)
+    emptied = keys - stats_by_key.keys()
+    if emptied:
+        db.session.execute(delete(UserLiftStats).where(keys_filter(UserLiftStats, emptied)))
+    write_stats(db.session, stats_by_key)
+
+
+def plan_stats_keys_query(plan_id):
+    return select(LiftPerformance.user_id, LiftPerformance.lift_id).distinct().join(
+        PlanLift, PlanLift.id == LiftPerformance.plan_lift_id
+    ).where(PlanLift.plan_id == plan_id)
+
+
+def plan_stats_keys(plan_id):
+    """
+    (user_id, lift_id) keys with performances tracked in a plan, used before the plan's performances are deleted.
+    """
+    return {(user_id, lift_id) for user_id, lift_id in db.session.execute(plan_stats_keys_query(plan_id))}
+
+
+def clear_stats(user_id):
+    """
+    Removes all of a user's lift stats, used when the user is deleted.
+    """
+    db.session.execute(delete(UserLiftStats).where(UserLiftStats.user_id == user_id))
+
+
+def rebuild_lift_stats(conn):
+    """
+    Recomputes the whole user_lift_stats table from lift_performances.
+    """
+    conn.execute(delete(UserLiftStats))
+    stats_by_key = stats_from_performances(conn)
+    if stats_by_key:
+        conn.execute(insert(UserLiftStats), [{"user_id": user_id, "lift_id": lift_id, **stats} for (user_id, lift_id), stats in stats_by_key.items()])
+    return len(stats_by_key)
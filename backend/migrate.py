@@ -0,0 +1,250 @@
+"""
+Versioned schema migrations for the Fitness Friend database.
+
+Every migration runs in its own transaction and is recorded in the schema_migrations table, so an existing database can be
+upgraded in place and running upgrade again is a no-op. New migrations are appended to MIGRATIONS with the next version number.
+
+From backend run:
+    py migrate.py upgrade     apply pending migrations
+    py migrate.py status      list applied and pending migrations
+    py migrate.py check       EXPLAIN QUERY PLAN for every hot endpoint query, fails if one scans a whole table
+    py migrate.py schema      print the schema generated from models.py (instance/schema.sql)
+    py migrate.py backfill-activity   rebuild the user_daily_activity calendar table from lift_performances
+    py migrate.py rebuild-stats       rebuild the user_lift_stats table from lift_performances
+"""
+import sys
+from datetime import date
+from collections import namedtuple
+from sqlalchemy import select, text
+from sqlalchemy.dialects import sqlite
+from sqlalchemy.schema import CreateIndex, CreateTable
+from models import db, User, Lift, Plan, PlanLift, LiftPerformance, UserDailyActivity, LiftCatalogVersion, UserLiftStats
+from activity import rebuild_daily_activity, tracked_days_query
+from lift_stats import plan_stats_keys_query, rebuild_lift_stats, stats_from_performances_query
+from analytics import lift_summary_query, lift_weekly_query, max_weight_day_query
+from progression import lift_history_query
+from queries import plan_name_conflicts_query, user_plans_query, user_trackings_query
+
+Migration = namedtuple('Migration', ['version', 'description', 'upgrade'])
+
+SCHEMA_MIGRATIONS_DDL = """CREATE TABLE IF NOT EXISTS schema_migrations (
+	version INTEGER NOT NULL,
+	description VARCHAR(200) NOT NULL,
+	applied_at DATETIME DEFAULT (CURRENT_TIMESTAMP),
+	PRIMARY KEY (version)
+)"""
+
+
+def create_indexes(conn, *names):
+    """
+    Creates the named indexes (as declared in models.py) if they do not exist yet.
+    """
+    indexes = {index.name: index for table in db.metadata.sorted_tables for index in table.indexes}
+    for name in names:
+        indexes[name].create(bind=conn, checkfirst=True)
+
+
+# ----- MIGRATIONS --------
+
+def _0001_base_tables(conn):
+    # Tables as they existed before versioned migrations, databases created with db.create_all() already have them
+    for model in (User, Lift, Plan, PlanLift, LiftPerformance):
+        model.__table__.create(bind=conn, checkfirst=True)
+
+
+def _0002_hot_path_indexes(conn):
+    # Unique indexes need duplicates merged first: repoint references at the oldest row, then drop the newer copies
+    conn.execute(text("""
+        UPDATE plan_lifts SET lift_id = (SELECT MIN(d.id) FROM lifts l JOIN lifts d ON d.name = l.name WHERE l.id = plan_lifts.lift_id)
+        WHERE lift_id IN (SELECT id FROM lifts)
+    """))
+    conn.execute(text("""
+        UPDATE lift_performances SET lift_id = (SELECT MIN(d.id) FROM lifts l JOIN lifts d ON d.name = l.name WHERE l.id = lift_performances.lift_id)
+        WHERE lift_id IN (SELECT id FROM lifts)
+    """))
+    conn.execute(text("""
+        DELETE FROM lifts WHERE id > (SELECT MIN(d.id) FROM lifts d WHERE d.name = lifts.name)
+    """))
+    conn.execute(text("""
+        UPDATE lift_performances SET plan_lift_id = (
+            SELECT MIN(d.id) FROM plan_lifts p JOIN plan_lifts d ON d.plan_id = p.plan_id AND d.lift_id = p.lift_id
+            WHERE p.id = lift_performances.plan_lift_id
+        ) WHERE plan_lift_id IN (SELECT id FROM plan_lifts)
+    """))
+    conn.execute(text("""
+        DELETE FROM plan_lifts WHERE id > (SELECT MIN(d.id) FROM plan_lifts d WHERE d.plan_id = plan_lifts.plan_id AND d.lift_id = plan_lifts.lift_id)
+    """))
+
+    create_indexes(
+        conn,
+        'ix_lifts_name',
+        'ix_plans_user_id_plan_name',
+        'ix_plan_lifts_plan_id_lift_id',
+        'ix_lift_performances_user_id_lift_id_date',
+        'ix_lift_performances_user_id_date_id',
+        'ix_lift_performances_plan_lift_id_date',
+    )
+
+
+def _0003_daily_activity(conn):
+    UserDailyActivity.__table__.create(bind=conn, checkfirst=True)
+    rebuild_daily_activity(conn) # backfill from existing performances
+
+
+def _0004_lift_catalog_version(conn):
+    LiftCatalogVersion.__table__.create(bind=conn, checkfirst=True)
+    conn.execute(text("INSERT OR IGNORE INTO lift_catalog_version (id, version) VALUES (1, 1)"))
+
+
+def _0005_user_lift_stats(conn):
+    UserLiftStats.__table__.create(bind=conn, checkfirst=True)
+    rebuild_lift_stats(conn) # backfill from existing performances
+
+
+MIGRATIONS = [
+    Migration(1, "base tables", _0001_base_tables),
+    Migration(2, "hot path indexes and unique lifts/plan lifts", _0002_hot_path_indexes),
+    Migration(3, "user daily activity table for the calendar", _0003_daily_activity),
+    Migration(4, "lift catalog version", _0004_lift_catalog_version),
+    Migration(5, "per user, per lift stats table", _0005_user_lift_stats),
+]
+
+
+# ----- RUNNER --------
+
+def applied_versions(conn):
+    conn.execute(text(SCHEMA_MIGRATIONS_DDL))
+    return set(conn.execute(text("SELECT version FROM schema_migrations")).scalars())
+
+
+def upgrade(engine):
+    """
+    Applies every pending migration in version order, one transaction per migration. Returns the versions applied.
+    """
+    with engine.begin() as conn:
+        done = applied_versions(conn)
+
+    applied = []
+    for migration in MIGRATIONS:
+        if migration.version in done:
+            continue
+        with engine.begin() as conn:
+            migration.upgrade(conn)
+            conn.execute(
+                text("INSERT INTO schema_migrations (version, description) VALUES (:version, :description)"),
+                {"version": migration.version, "description": migration.description}
+            )
+        print(f"Applied migration {migration.version:04d}: {migration.description}")
+        applied.append(migration.version)
+    return applied
+
+
+def status(engine):
+    with engine.begin() as conn:
+        done = applied_versions(conn)
+    for migration in MIGRATIONS:
+        state = "applied" if migration.version in done else "pending"
+        print(f"{migration.version:04d} {state:8} {migration.description}")
+
+
+# ----- QUERY PLAN CHECK --------
+
+def hot_queries():
+    """
+    The lookups each endpoint performs on every request, keyed by a readable name. Parameter values are placeholders,
+    only the shape of the query matters for the plan.
+    """
+    return {
+        "get-id / login: user by username": select(User.id).where(User.username == "user"),
+        "get user plans": user_plans_query(1),
+        "trackings page": user_trackings_query(1, ("2025-01-01 00:00:00", 1)).limit(51),
+        "track lift: plan lift by plan and lift": select(PlanLift.id).where(PlanLift.plan_id == 1, PlanLift.lift_id == 1),
+        "lift performance by plan lift, newest first": select(LiftPerformance.id).where(LiftPerformance.plan_lift_id == 1).order_by(LiftPerformance.date.desc()),
+        "performance data by user and lift": select(LiftPerformance.id).where(LiftPerformance.user_id == 1, LiftPerformance.lift_id == 1),
+        "generate plan: plan by user and name": select(Plan.id).where(Plan.user_id == 1, Plan.plan_name == "plan"),
+        "generate plans: name conflicts for a batch": plan_name_conflicts_query([1, 2, 3], ["Legs workout", "Chest workout"]),
+        "lift by name": select(Lift.id).where(Lift.name == "Squat"),
+        "tracked dates: daily activity for a month": tracked_days_query(1, date(2025, 1, 1), date(2025, 2, 1)),
+        "lift analytics: all time stats": select(UserLiftStats.sets_count).where(UserLiftStats.user_id == 1, UserLiftStats.lift_id == 1),
+        "lift stats: refresh after a plan delete": stats_from_performances_query([(1, 1), (1, 2)]),
+        "lift stats: lifts tracked in a plan": plan_stats_keys_query(1),
+        "lift analytics: summary": lift_summary_query(1, 1, date(2025, 1, 1), date(2025, 3, 31)),
+        "lift analytics: max weight day": max_weight_day_query(1, 1),
+        "lift analytics: weekly": lift_weekly_query(1, 1, date(2025, 1, 1)),
+        "lift progression: history": lift_history_query(1, 1),
+    }
+
+
+def explain(conn, statement):
+    """
+    Returns the EXPLAIN QUERY PLAN detail lines for a statement.
+    """
+    compiled = statement.compile(dialect=conn.dialect, compile_kwargs={"render_postcompile": True}) # expands IN lists
+    rows = conn.exec_driver_sql(f"EXPLAIN QUERY PLAN {compiled}", tuple(compiled.params[name] for name in compiled.positiontup))
+    return [row[-1] for row in rows]
+
+
+def full_scans(plan):
+    """
+    Plan lines that read a whole table instead of going through an index.
+    """
+    return [line for line in plan if line.startswith("SCAN") and "USING" not in line]
+
+
+def check(engine):
+    """
+    Explains every hot query, prints the plans and returns the names of queries that scan a whole table.
+    """
+    failures = []
+    with engine.connect() as conn:
+        for name, statement in hot_queries().items():
+            plan = explain(conn, statement)
+            scans = full_scans(plan)
+            print(f"{'FAIL' if scans else 'ok  '} {name}")
+            for line in plan:
+                print(f"       {line}")
+            if scans:
+                failures.append(name)
+    return failures
+
+
+def schema_sql():
+    """
+    DDL for every model table and index plus the schema_migrations table, as written to instance/schema.sql.
+    """
+    statements = []
+    for table in db.metadata.sorted_tables:
+        statements.append(str(CreateTable(table).compile(dialect=sqlite.dialect())).strip())
+        for index in sorted(table.indexes, key=lambda index: index.name):
+            statements.append(str(CreateIndex(index).compile(dialect=sqlite.dialect())).strip())
+    statements.append(SCHEMA_MIGRATIONS_DDL)
+    return ";\n".join(statements) + ";\n"
+
+
+if __name__ == "__main__":
+    command = sys.argv[1] if len(sys.argv) > 1 else "upgrade"
+
+    if command == "schema":
+        sys.stdout.write(schema_sql())
+        sys.exit(0)
+
+    from app import app
+    with app.app_context():
+        if command == "upgrade":
+            applied = upgrade(db.engine)
+            print(f"Database is up to date ({len(applied)} migrations applied).")
+        elif command == "status":
+            status(db.engine)
+        elif command == "backfill-activity":
+            with db.engine.begin() as conn:
+                days = rebuild_daily_activity(conn)
+            print(f"Rebuilt daily activity ({days} user days).")
+        elif command == "rebuild-stats":
+            with db.engine.begin() as conn:
+                lifts = rebuild_lift_stats(conn)
+            print(f"Rebuilt lift stats ({lifts} user lifts).")
+        elif command == "check":
+            sys.exit(1 if check(db.engine) else 0)
+        else:
+            print(__doc__)
+            sys.exit(2)
@@ -29,6 +29,9 @@ class User(db.Model):
 
 class Lift(db.Model):
     __tablename__ = 'lifts'
+    __table_args__ = (
+        db.Index('ix_lifts_name', 'name', unique=True),
+    )
     id = db.Column(db.Integer, primary_key=True)
     name = db.Column(db.String(100), nullable=False)
     targeted_area = db.Column(db.String(30), nullable=False)
@@ -37,6 +40,9 @@ class Lift(db.Model):
 
 class Plan(db.Model):
     __tablename__ = 'plans'
+    __table_args__ = (
+        db.Index('ix_plans_user_id_plan_name', 'user_id', 'plan_name'),
+    )
     id = db.Column(db.Integer, primary_key=True)
     user_id = db.Column(db.Integer, db.ForeignKey('users.id'), nullable=False)
     plan_name = db.Column(db.String(100), nullable=False)
@@ -49,6 +55,9 @@ class Plan(db.Model):
 
 class PlanLift(db.Model):
     __tablename__ = 'plan_lifts'
+    __table_args__ = (
+        db.Index('ix_plan_lifts_plan_id_lift_id', 'plan_id', 'lift_id', unique=True), # a lift appears once per plan
+    )
     id = db.Column(db.Integer, primary_key=True)
     plan_id = db.Column(db.Integer, db.ForeignKey('plans.id'), nullable=False)
     lift_id = db.Column(db.Integer, db.ForeignKey('lifts.id'), nullable=False)
@@ -60,6 +69,11 @@ class PlanLift(db.Model):
 
 class LiftPerformance(db.Model):
     __tablename__ = 'lift_performances'
+    __table_args__ = (
+        db.Index('ix_lift_performances_user_id_lift_id_date', 'user_id', 'lift_id', 'date'),
+        db.Index('ix_lift_performances_user_id_date_id', 'user_id', 'date', 'id'), # tracking history keyset pagination
+        db.Index('ix_lift_performances_plan_lift_id_date', 'plan_lift_id', 'date'),
+    )
     id = db.Column(db.Integer, primary_key=True)
     plan_lift_id = db.Column(db.Integer, db.ForeignKey('plan_lifts.id'), nullable=False)
     lift_id = db.Column(db.Integer, db.ForeignKey('lifts.id'), nullable=False)
@@ -72,4 +86,33 @@ class LiftPerformance(db.Model):
     additional_notes = db.Column(db.Text, nullable=True)
 
     user = db.relationship('User', backref='lift_performances', lazy=True)
-    lift = db.relationship('Lift', backref='lifts',lazy=True)
\ No newline at end of file
+    lift = db.relationship('Lift', backref='lifts',lazy=True)
+
+class UserDailyActivity(db.Model):
+    __tablename__ = 'user_daily_activity'
+    user_id = db.Column(db.Integer, db.ForeignKey('users.id'), primary_key=True)
+    day = db.Column(db.Date, primary_key=True)
+    sets_tracked = db.Column(db.Integer, nullable=False, default=0) # lift performances tracked by the user on this day
+
+
+class LiftCatalogVersion(db.Model):
+    __tablename__ = 'lift_catalog_version'
+    id = db.Column(db.Integer, primary_key=True) # single row, id 1
+    version = db.Column(db.Integer, nullable=False, default=1) # bumped whenever the lifts table changes
+
+
+class UserLiftStats(db.Model):
+    __tablename__ = 'user_lift_stats'
+    user_id = db.Column(db.Integer, db.ForeignKey('users.id'), primary_key=True)
+    lift_id = db.Column(db.Integer, db.ForeignKey('lifts.id'), primary_key=True)
+    sets_count = db.Column(db.Integer, nullable=False, default=0)
+    total_weight = db.Column(db.Float, nullable=False, default=0) # sum of weight over every set, for the average
+    total_reps = db.Column(db.Integer, nullable=False, default=0)
+    total_volume = db.Column(db.Float, nullable=False, default=0) # sum of weight x reps
+    best_weight = db.Column(db.Float, nullable=True)
+    best_weight_date = db.Column(db.DateTime, nullable=True) # first time the best weight was lifted
+    best_e1rm = db.Column(db.Float, nullable=True) # best estimated 1RM (Epley)
+    best_e1rm_date = db.Column(db.DateTime, nullable=True)
+    best_e1rm_brzycki = db.Column(db.Float, nullable=True)
+    first_performed = db.Column(db.DateTime, nullable=True)
+    last_performed = db.Column(db.DateTime, nullable=True)
@@ -1,63 +1,329 @@
-import pickle
-import os
-from ML_plan_maker.model.decision_tree import DecisionTreeModel
-import pandas as pd
-
-BASE_DIR = os.path.dirname(os.path.abspath(__file__)) 
-MODEL_PATH = os.path.join(BASE_DIR, 'ML_plan_maker', 'saved_models', 'decision_tree_model.pkl')
-ENCODER_PATH = os.path.join(BASE_DIR, 'ML_plan_maker', 'saved_models', 'label_encoder.pkl')
-
-# Load the model
-dt_model = DecisionTreeModel()
-dt_model.load_model(MODEL_PATH)
-print("Model loaded successfully.")
-
-# Load the label encoder
-with open(ENCODER_PATH, 'rb') as file:
-    label_encoder = pickle.load(file)
-print("Label encoder loaded successfully.")
-
-# Load the label encoder
-with open(ENCODER_PATH, 'rb') as file:
-    label_encoder = pickle.load(file)
-print("Label encoder loaded successfully.")
+import logging
+import threading
+import time
+from collections import namedtuple
+from types import MappingProxyType
+import numpy as np
+from lift_catalog import normalize_lift_name
+from inference_batcher import MicroBatcher
+from ML_plan_maker.model import registry
+from ML_plan_maker.model.compact_tree import MODEL_DIR, load_model
 
-def predict_lifts(goal, body_parts):
+logger = logging.getLogger(__name__) # loads run on background threads outside the app context, so not app.logger
+
+BODY_PARTS = ['Legs', 'Chest', 'Arms', 'Back', 'Full Body'] # model feature order after Goal
+
+Prediction = namedtuple('Prediction', ['lift_names', 'reps']) # decoded model output for one input
+PlannedLifts = namedtuple('PlannedLifts', ['lifts', 'reps', 'unresolved']) # prediction mapped onto the lift catalog
+
+
+def prediction_key(goal, body_parts):
     """
-    Predict lifts and reps based on the goal and body parts.
+    What the model's input reduces to: (strength goal?, bitmask of the known body parts selected). Unknown body parts are ignored.
     """
-    # Map body parts to one-hot encoding, binary 1 if yes 0 if no
-    body_parts_mapping = ['Legs', 'Chest', 'Arms', 'Back', 'Full Body']
-    body_parts_input = [1 if part in body_parts else 0 for part in body_parts_mapping]
+    return goal == "Strength", sum(1 << index for index, part in enumerate(BODY_PARTS) if part in body_parts)
 
-    # Prepare input data for the model
-    input_data = pd.DataFrame([{
-        'Goal': 1 if goal == "Strength" else 0,
-        'Legs': body_parts_input[0],
-        'Chest': body_parts_input[1],
-        'Arms': body_parts_input[2],
-        'Back': body_parts_input[3],
-        'Full Body': body_parts_input[4],
-    }])
 
-    # Predict using the preloaded model based on user inpuut
-    predictions = dt_model.predict(input_data)
-    predicted_lifts_encoded = predictions[:, 0].astype(int)
-    predicted_reps = predictions[:, 1]
+def key_features(key):
+    """
+    Model input row for a prediction key.
+    """
+    strength, mask = key
+    return [int(strength), *((mask >> index) & 1 for index in range(len(BODY_PARTS)))]
 
-    # Decoding lift names
-    predicted_lifts = label_encoder.inverse_transform(predicted_lifts_encoded)
 
-    # Format predictions for API compatibility
-    formatted_predictions = [
-        {
-            "lift_name": lift,
-            "reps": int(reps),  # Predicted reps
+def check_features(model):
+    if model.feature_names != ['Goal', *BODY_PARTS]:
+        raise ValueError(f"Model features {model.feature_names} do not match {['Goal', *BODY_PARTS]}")
+
+
+def resolve_prediction(prediction, catalog):
+    """
+    A prediction mapped onto a lift catalog snapshot: catalog lifts in predicted order without repeats, the predicted reps and the
+    predicted names missing from the catalog.
+    """
+    lifts, unresolved = {}, []
+    for name in prediction.lift_names:
+        lift = catalog.by_name.get(normalize_lift_name(name))
+        if lift is None:
+            unresolved.append(name)
+        else:
+            lifts.setdefault(lift.id, lift)
+    return PlannedLifts(tuple(lifts.values()), prediction.reps, tuple(unresolved))
+
+
+class PredictionTable:
+    """
+    Every prediction the model can make. The features are a goal flag and one flag per body part, so all 2 x 32 inputs are predicted
+    in one batch when the model is loaded and decoded to lift names; a plan request is then a dictionary lookup.
+
+    Lift names are mapped to catalog lifts on first use with each catalog version (the catalog lives in the database, which is not
+    available when the model loads) and the mapping is kept until the catalog version changes.
+    """
+    def __init__(self, model, version=None):
+        self.model = model
+        self.version = version # model version the table was built from
+        check_features(model)
+
+        keys = [(strength, mask) for strength in (False, True) for mask in range(1 << len(BODY_PARTS))]
+        features = np.array([key_features(key) for key in keys])
+        self.predictions = MappingProxyType({
+            key: Prediction(lift_names, reps) for key, (lift_names, reps) in zip(keys, model.predict_plans(features))
+        })
+        self._resolved = (None, MappingProxyType({})) # (catalog version, key -> PlannedLifts), replaced as a whole
+
+    def self_check(self):
+        """
+        Raises ValueError unless every prediction names lifts and reps, and the model predicts a sample input as the table holds it
+        (which also touches the model's pages before it serves).
+        """
+        empty = [key for key, prediction in self.predictions.items() if not prediction.lift_names or prediction.reps <= 0]
+        if empty:
+            raise ValueError(f"Model predicts no lifts or reps for {len(empty)} inputs, e.g. {empty[0]}")
+        lift_names, reps = self.model.predict_plans(np.array([[1, 1, 0, 0, 0, 0]]))[0] # strength, legs
+        if Prediction(lift_names, reps) != self.predictions[(True, 1)]:
+            raise ValueError("Model prediction does not match its prediction table")
+
+    def lookup(self, goal, body_parts):
+        """
+        Decoded prediction for a goal and body parts.
+        """
+        return self.predictions[prediction_key(goal, body_parts)]
+
+    def planned_lifts(self, goal, body_parts, catalog):
+        """
+        Prediction for a goal and body parts mapped onto a lift catalog snapshot (see resolve_prediction).
+        """
+        version, resolved = self._resolved
+        if version != catalog.version:
+            resolved = MappingProxyType({key: resolve_prediction(prediction, catalog) for key, prediction in self.predictions.items()})
+            self._resolved = (catalog.version, resolved)
+        return resolved[prediction_key(goal, body_parts)]
+
+    def planned_lifts_many(self, requests, catalog):
+        """
+        planned_lifts for each (goal, body parts) of requests.
+        """
+        return [self.planned_lifts(goal, body_parts, catalog) for goal, body_parts in requests]
+
+
+def predict_batch(items):
+    """
+    MicroBatcher predict function: plans for (model, feature row) items, one predict_plans call per model in the batch (a batch only
+    holds two models around a reload).
+    """
+    plans = [None] * len(items)
+    by_model = {}
+    for index, (model, _) in enumerate(items):
+        by_model.setdefault(id(model), (model, []))[1].append(index)
+    for model, indexes in by_model.values():
+        for index, plan in zip(indexes, model.predict_plans(np.array([items[index][1] for index in indexes]))):
+            plans[index] = plan
+    return plans
+
+
+class BatchedPredictions:
+    """
+    Predictions made per request rather than precomputed, for when the prediction table is turned off: each lookup submits its
+    input row to a MicroBatcher, which stacks the rows of concurrent requests into one predict_plans call. Has the lookup
+    interface of PredictionTable, so PlanPredictor serves either.
+    """
+    def __init__(self, model, version, batcher):
+        self.model = model
+        self.version = version
+        self.batcher = batcher
+        check_features(model)
+
+    def self_check(self):
+        """
+        Raises ValueError unless the model predicts lifts and reps for a sample input.
+        """
+        lift_names, reps = self.model.predict_plans(np.array([[1, 1, 0, 0, 0, 0]]))[0] # strength, legs
+        if not lift_names or reps <= 0:
+            raise ValueError("Model predicts no lifts or reps for a strength legs plan")
+
+    def lookup_many(self, requests):
+        rows = [(self.model, key_features(prediction_key(goal, body_parts))) for goal, body_parts in requests]
+        return [Prediction(lift_names, reps) for lift_names, reps in self.batcher.submit_many(rows)]
+
+    def lookup(self, goal, body_parts):
+        return self.lookup_many([(goal, body_parts)])[0]
+
+    def planned_lifts(self, goal, body_parts, catalog):
+        return resolve_prediction(self.lookup(goal, body_parts), catalog)
+
+    def planned_lifts_many(self, requests, catalog):
+        return [resolve_prediction(prediction, catalog) for prediction in self.lookup_many(requests)]
+
+
+def serving_model(registry_dir=registry.REGISTRY_DIR):
+    """
+    (version, model directory) to serve: the model registry's current version, or the model bundled in saved_models before anything
+    has been trained into the registry.
+    """
+    version = registry.current_version(registry_dir)
+    if version is not None:
+        return version, registry.model_dir(version, registry_dir)
+    return "bundled", MODEL_DIR
+
+
+class PlanPredictor:
+    """
+    The plan generator's model and prediction table. load() builds a new table next to the one being served, checks it and swaps it
+    in as one reference, so requests always see a complete table that matches one model and are never blocked by a (re)load.
+
+    The model is a compact export of the trained trees (ML_plan_maker/model/compact_tree.py): memory mapped NumPy arrays, so serving
+    never imports sklearn and worker processes share the model's pages. Nothing is loaded at import; get_table() loads on first use,
+    warm_up() loads in a background thread ahead of the first plan request. Without a model_path the model registry's current version
+    is served: reload() loads it again in the background and watch() does so whenever the registry's CURRENT pointer moves.
+
+    After use_batching() the loads build BatchedPredictions instead of a table, so the model predicts on request through a
+    MicroBatcher (inference_batcher.py).
+    """
+    def __init__(self, model_path=None, registry_dir=registry.REGISTRY_DIR):
+        self.model_path = model_path
+        self.registry_dir = registry_dir
+        self.table = None
+        self.load_seconds = None # duration of the last successful load
+        self.load_error = None # message of the last failed load
+        self.loaded_at = None # unix time of the last successful load
+        self.loads = 0
+        self.failed_loads = 0
+        self._failed_version = None # version the last failed load tried, the watcher does not retry it
+        self._lock = threading.RLock() # serializes loads
+        self._threads_lock = threading.Lock() # background thread bookkeeping, never held during a load
+        self._warm_up_thread = None
+        self._reload_thread = None
+        self._watch_thread = None
+        self._stop_watching = threading.Event()
+        self.batcher = None # MicroBatcher of BatchedPredictions, None while serving prediction tables
+
+    def use_batching(self, max_batch_size, max_wait_ms):
+        """
+        Predicts on request, micro-batched, instead of from a prediction table. Applies from the next load.
+        """
+        self.batcher = MicroBatcher(predict_batch, max_batch_size, max_wait_ms, name="model-batcher")
+
+    def load(self):
+        """
+        Loads the model, checks it and swaps in a new prediction table, returns the table. On failure the served table is kept.
+        """
+        with self._lock:
+            start = time.perf_counter()
+            version = None
+            try:
+                version, path = serving_model(self.registry_dir) if self.model_path is None else (self.model_path, self.model_path)
+                model = load_model(path)
+                table = PredictionTable(model, version) if self.batcher is None else BatchedPredictions(model, version, self.batcher)
+                table.self_check()
+            except Exception as e:
+                self.load_error = f"{type(e).__name__}: {e}"
+                self.failed_loads += 1
+                self._failed_version = version
+                raise
+            self.load_seconds = time.perf_counter() - start
+            self.loaded_at = time.time()
+            self.loads += 1
+            self.load_error = None
+            self._failed_version = None
+            self.table = table # the swap
+            logger.info("Model %s loaded in %.2fs", version, self.load_seconds)
+        return table
+
+    def get_table(self):
+        """
+        The current prediction table (BatchedPredictions when batching), loading the model first if that has not happened yet (concurrent callers wait for one load).
+        """
+        table = self.table
+        if table is None:
+            with self._lock:
+                table = self.table or self.load()
+        return table
+
+    def _start(self, attribute, target, name):
+        with self._threads_lock:
+            thread = getattr(self, attribute)
+            if thread is not None and thread.is_alive():
+                return False
+            thread = threading.Thread(target=target, name=name, daemon=True)
+            setattr(self, attribute, thread)
+            thread.start()
+            return True
+
+    def warm_up(self):
+        """
+        Starts loading the model in a background thread, once per process. Load failures are kept in load_error and retried on first use.
+        """
+        if self.table is None and self._warm_up_thread is None:
+            self._start('_warm_up_thread', self._load_logged, "model-warm-up")
+
+    def reload(self):
+        """
+        Starts loading the model again in a background thread, returns False if a reload is already running.
+        """
+        return self._start('_reload_thread', self._load_logged, "model-reload")
+
+    def watch(self, interval):
+        """
+        Starts polling the registry's CURRENT pointer every interval seconds, loading the model whenever it names another version.
+        """
+        if self.model_path is None and self._watch_thread is None:
+            self._start('_watch_thread', lambda: self._watch(interval), "model-watch")
+
+    def stop_watching(self):
+        self._stop_watching.set()
+
+    def _watch(self, interval):
+        while not self._stop_watching.wait(interval):
+            current = registry.current_version(self.registry_dir) or "bundled"
+            if self.table is not None and current != self.table.version and current != self._failed_version:
+                self._load_logged()
+
+    def _load_logged(self):
+        try:
+            self.get_table() if self.table is None else self.load()
+        except Exception:
+            logger.exception("Model load failed")
+
+    @property
+    def ready(self):
+        return self.table is not None
+
+    @property
+    def version(self):
+        table = self.table
+        return table.version if table is not None else None
+
+    def metrics(self):
+        """
+        Model state for the metrics endpoint.
+        """
+        reload_thread = self._reload_thread
+        return {
+            "version": self.version,
+            "ready": self.ready,
+            "loaded_at": self.loaded_at,
+            "load_seconds": round(self.load_seconds, 4) if self.load_seconds is not None else None,
+            "loads": self.loads,
+            "failed_loads": self.failed_loads,
+            "last_error": self.load_error,
+            "reloading": reload_thread is not None and reload_thread.is_alive(),
+            "watching": self._watch_thread is not None and self._watch_thread.is_alive(),
+            "batching": self.batcher.metrics() if self.batcher is not None else None,
         }
-        for lift, reps in zip(predicted_lifts, predicted_reps)
-    ]
 
-    return formatted_predictions # Returning our finalized predictions
 
+plan_predictor = PlanPredictor()
 
 
+def predict_lifts(goal, body_parts):
+    """
+    Predict lifts and reps based on the goal and body parts.
+    """
+    prediction = plan_predictor.get_table().lookup(goal, body_parts)
+
+    # Format predictions for API compatibility
+    return [{
+        "lift_name": ";".join(prediction.lift_names),
+        "reps": prediction.reps,  # Predicted reps
+    }]
@@ -0,0 +1,181 @@
+"""
+Progression analytics for one user's lift, computed with NumPy over the lift's whole history.
+
+The history is loaded once into contiguous float64 arrays (day, weight, reps, reps in reserve) and every statistic is derived from
+whole-array operations: no ORM objects and no Python loop over sets. Only the bounded tail that is returned is turned back into json.
+"""
+from itertools import chain
+import numpy as np
+from sqlalchemy import func, select
+from models import LiftPerformance
+
+UNIX_EPOCH_JULIAN_DAY = 2440587.5 # julianday('1970-01-01')
+TREND_WINDOW_DAYS = 28 # trailing window of the rolling e1RM trend
+PLATEAU_WINDOW_DAYS = 28 # no e1RM gain within this many days counts as a plateau
+PLATEAU_TOLERANCE = 0.01 # recent best must beat the earlier best by more than this fraction to count as progress
+PLATEAU_MIN_SESSIONS = 3 # sessions needed in the window before a plateau is reported
+SERIES_DEFAULT_POINTS = 52 # most recent sessions returned in the e1RM series by default
+SERIES_MAX_POINTS = 365
+TONNAGE_DEFAULT_WEEKS = 12 # most recent training weeks returned in the tonnage series by default
+TONNAGE_MAX_WEEKS = 104
+
+
+def lift_history_query(user_id, lift_id):
+    """
+    One user's sets of one lift in the order they were performed, dates as fractional days since the Unix epoch.
+    """
+    return select(
+        func.julianday(LiftPerformance.date) - UNIX_EPOCH_JULIAN_DAY,
+        LiftPerformance.weight_performed,
+        LiftPerformance.reps_performed,
+        LiftPerformance.reps_in_reserve,
+    ).where(
+        LiftPerformance.user_id == user_id,
+        LiftPerformance.lift_id == lift_id
+    ).order_by(LiftPerformance.date, LiftPerformance.id)
+
+
+def load_lift_history(executor, user_id, lift_id):
+    """
+    Loads a lift's history as a (4, n) float64 array whose rows (day, weight, reps, rir) are each contiguous.
+    Rows are flattened straight into the array, np.array over result rows is two orders of magnitude slower.
+    """
+    rows = executor.execute(lift_history_query(user_id, lift_id)).all()
+    flat = np.fromiter(chain.from_iterable(rows), dtype=np.float64, count=len(rows) * 4)
+    return np.ascontiguousarray(flat.reshape(-1, 4).T)
+
+
+def epley_array(weight, reps):
+    return np.where(reps <= 1, weight, weight * (1 + reps / 30))
+
+
+def run_starts(keys):
+    """
+    Indexes where a new run of equal values starts in a sorted integer array.
+    """
+    return np.flatnonzero(np.r_[True, keys[1:] != keys[:-1]])
+
+
+def rolling_slope(x, y, window):
+    """
+    Least squares slope of y over x for every point, fitted on the points within `window` of it (x sorted, trailing window).
+    Uses prefix sums so each window costs O(1); points with fewer than two distinct x values in their window get NaN.
+    """
+    start = np.searchsorted(x, x - (window - 1))
+
+    def window_sum(values):
+        prefix = np.r_[0.0, np.cumsum(values)]
+        return prefix[1:] - prefix[start]
+
+    count = np.arange(1, x.size + 1) - start
+    sum_x, sum_y = window_sum(x), window_sum(y)
+    numerator = count * window_sum(x * y) - sum_x * sum_y
+    denominator = count * window_sum(x * x) - sum_x * sum_x
+    return np.divide(numerator, denominator, out=np.full(x.size, np.nan), where=denominator > 1e-9)
+
+
+def day_strings(days):
+    return np.datetime_as_string(days.astype('datetime64[D]'))
+
+
+def nan_divide(numerator, denominator):
+    """
+    numerator / denominator with NaN (null in json) where the denominator is not positive, e.g. bodyweight sets tracked at 0 lbs.
+    """
+    return np.divide(numerator, denominator, out=np.full(np.shape(numerator), np.nan), where=denominator > 0)
+
+
+def json_floats(values, digits=2):
+    return [None if value != value else round(value, digits) for value in values.tolist()] # NaN -> None
+
+
+def compute_progression(history, points=SERIES_DEFAULT_POINTS, weeks=TONNAGE_DEFAULT_WEEKS):
+    """
+    Progression stats from a history loaded by load_lift_history:
+      series          per session best e1RM (Epley), rolling 4 week trend (e1RM change per week) and effort, last `points` sessions
+      weekly_tonnage  weight x reps per training week (Monday start) with the change from the week before, last `weeks` weeks
+      trend           the latest rolling trend, absolute and relative to the latest session best
+      plateau         whether the last 4 weeks failed to beat the earlier best e1RM, and weeks since the all time best
+      effort          average intensity over the last 4 weeks as a percent of the RIR-adjusted max, and average RIR
+    Effort takes reps in reserve into account: a set of `reps` with `rir` left is treated as a max effort set of reps + rir,
+    so intensity is weight over that set's e1RM. Sets without weight (bodyweight lifts tracked at 0 lbs) have no intensity, and
+    effort and the relative trend are null when no set has one.
+    """
+    day, weight, reps, rir = history
+    if day.size == 0:
+        return {"sets": 0, "sessions": 0, "series": [], "weekly_tonnage": [], "trend": None, "plateau": None, "effort": None}
+
+    e1rm = epley_array(weight, reps)
+    intensity = nan_divide(weight, epley_array(weight, reps + rir))
+    weighted = ~np.isnan(intensity)
+
+    # Sessions - one point per training day
+    day_index = np.floor(day).astype(np.int64)
+    session_start = run_starts(day_index)
+    session_day = day_index[session_start]
+    session_e1rm = np.maximum.reduceat(e1rm, session_start)
+    session_effort = nan_divide(
+        np.add.reduceat(np.where(weighted, intensity, 0), session_start), np.add.reduceat(weighted, session_start)
+    )
+    session_trend = rolling_slope((session_day - session_day[0]).astype(np.float64), session_e1rm, TREND_WINDOW_DAYS) * 7
+
+    # Plateau - best e1RM of the recent window against the best before it
+    latest_day = session_day[-1]
+    recent = session_day > latest_day - PLATEAU_WINDOW_DAYS
+    best_session = int(np.argmax(session_e1rm)) # first session reaching the all time best
+    plateau = bool(
+        not recent.all()
+        and recent.sum() >= PLATEAU_MIN_SESSIONS
+        and session_e1rm[recent].max() <= session_e1rm[~recent].max() * (1 + PLATEAU_TOLERANCE)
+    )
+
+    # Weekly tonnage - weeks counted from Monday, 1970-01-01 was a Thursday
+    week = (day_index + 3) // 7
+    week_start = run_starts(week)
+    week_number = week[week_start]
+    tonnage = np.add.reduceat(weight * reps, week_start)
+    change = np.full(tonnage.size, np.nan)
+    previous = tonnage[:-1]
+    consecutive = (np.diff(week_number) == 1) & (previous > 0) # change only against a trained previous week
+    np.divide((tonnage[1:] - previous) * 100, previous, out=change[1:], where=consecutive)
+
+    recent_sets = day > day[-1] - PLATEAU_WINDOW_DAYS
+    series = slice(-points, None)
+    weekly = slice(-weeks, None)
+    return {
+        "sets": int(day.size),
+        "sessions": int(session_day.size),
+        "series": [
+            {"date": date, "e1rm": e1rm_value, "trend_per_week": trend, "effort": effort}
+            for date, e1rm_value, trend, effort in zip(
+                day_strings(session_day[series]).tolist(),
+                json_floats(session_e1rm[series]),
+                json_floats(session_trend[series]),
+                json_floats(session_effort[series] * 100, 1),
+            )
+        ],
+        "weekly_tonnage": [
+            {"week_start": week_start_day, "tonnage": week_tonnage, "change_pct": week_change}
+            for week_start_day, week_tonnage, week_change in zip(
+                day_strings(week_number[weekly] * 7 - 3).tolist(),
+                json_floats(tonnage[weekly]),
+                json_floats(change[weekly], 1),
+            )
+        ],
+        "trend": {
+            "e1rm_per_week": json_floats(session_trend[-1:])[0],
+            "pct_per_week": json_floats(nan_divide(session_trend[-1:] * 100, session_e1rm[-1:]))[0],
+        },
+        "plateau": {
+            "detected": plateau,
+            "best_e1rm": round(float(session_e1rm[best_session]), 2),
+            "best_date": str(day_strings(session_day[best_session:best_session + 1])[0]),
+            "weeks_since_best": round(float(latest_day - session_day[best_session]) / 7, 1),
+        },
+        "effort": {
+            "avg_intensity_pct": json_floats(
+                nan_divide(np.where(weighted & recent_sets, intensity, 0).sum(keepdims=True) * 100, (weighted & recent_sets).sum(keepdims=True)), 1
+            )[0],
+            "avg_rir": json_floats(rir[recent_sets].mean(keepdims=True), 1)[0],
+        },
+    }
@@ -0,0 +1,173 @@
+import base64
+import json
+from datetime import datetime
+from sqlalchemy import String, select, tuple_, type_coerce
+from models import db, LiftPerformance, Plan, PlanLift
+from lift_catalog import lift_catalog
+
+
+# ----- PLAN READ QUERIES --------
+
+def user_plans_query(user_id):
+    """
+    Single joined query for every plan a user owns along with its plan lifts, lift names come from the lift catalog.
+    Plans without lifts still come back as one row with NULL lift columns (outer join).
+    """
+    return select(
+        Plan.id,
+        Plan.plan_name,
+        Plan.plan_type,
+        Plan.plan_duration,
+        Plan.creation_date,
+        PlanLift.lift_id,
+        PlanLift.sets,
+        PlanLift.reps,
+    ).outerjoin(
+        PlanLift, PlanLift.plan_id == Plan.id
+    ).where(
+        Plan.user_id == user_id
+    ).order_by(Plan.id, PlanLift.id)
+
+
+def get_user_plans_data(user_id):
+    """
+    Returns a user's plans in the json format used by the frontend, built straight from the rows of user_plans_query.
+    """
+    rows = db.session.execute(user_plans_query(user_id)).all()
+    catalog = lift_catalog.snapshot()
+
+    plans_data = []
+    current = None
+    for plan_id, plan_name, plan_type, plan_duration, creation_date, lift_id, sets, reps in rows:
+        if current is None or current["plan_id"] != plan_id: # rows are ordered by plan, so a new plan id starts a new entry
+            current = {
+                "plan_id": plan_id,
+                "plan_name": plan_name,
+                "plan_type": plan_type,
+                "plan_duration": plan_duration,
+                "creation_date": creation_date.isoformat() if creation_date else None,
+                "lifts": []
+            }
+            plans_data.append(current)
+
+        lift = catalog.by_id.get(lift_id)
+        if lift is not None: # no plan lift (empty plan) or plan lift pointing at a missing lift
+            current["lifts"].append({
+                "lift_id": lift_id,
+                "lift_name": lift.name,
+                "sets": sets,
+                "reps": reps
+            })
+
+    return plans_data
+
+
+def plan_name_conflicts_query(user_ids, plan_names):
+    """
+    (user_id, plan_name) of existing plans among the given users and names, one query for a whole batch of generated plans.
+    Pairs that only combine a user and a name from different requests come back too, callers match the exact pairs.
+    """
+    return select(Plan.user_id, Plan.plan_name).where(Plan.user_id.in_(user_ids), Plan.plan_name.in_(plan_names))
+
+
+# ----- TRACKING HISTORY QUERIES --------
+
+def user_trackings_query(user_id, cursor=None):
+    """
+    Joined query for a user's tracked lifts, newest first, keyset ordered by (date, id). Lift names come from the lift catalog.
+    cursor is the (date_key, id) of the last row already returned; only older rows are selected.
+    """
+    # Dates are compared as the raw stored text: rows written with the CURRENT_TIMESTAMP default have no microseconds
+    # while bound datetimes always do, so comparing against a datetime parameter would never match equal dates.
+    date_key = type_coerce(LiftPerformance.date, String)
+
+    query = select(
+        Plan.id.label("plan_id"),
+        Plan.plan_name,
+        PlanLift.lift_id,
+        LiftPerformance.id.label("performance_id"),
+        LiftPerformance.date,
+        date_key.label("date_key"),
+        LiftPerformance.reps_performed,
+        LiftPerformance.weight_performed,
+        LiftPerformance.reps_in_reserve,
+        LiftPerformance.additional_notes,
+        LiftPerformance.recommended_weight,
+    ).select_from(
+        LiftPerformance
+    ).join(
+        PlanLift, PlanLift.id == LiftPerformance.plan_lift_id
+    ).join(
+        Plan, Plan.id == PlanLift.plan_id
+    ).where(
+        LiftPerformance.user_id == user_id
+    ).order_by(LiftPerformance.date.desc(), LiftPerformance.id.desc())
+
+    if cursor is not None:
+        query = query.where(tuple_(date_key, LiftPerformance.id) < tuple_(*cursor))
+    return query
+
+
+def tracking_row_to_dict(row, catalog):
+    """
+    Formats one row of user_trackings_query into the tracking json used by the frontend.
+    """
+    lift = catalog.by_id.get(row.lift_id)
+    return {
+        "plan_id": row.plan_id,
+        "plan_name": row.plan_name,
+        "lift_id": row.lift_id,
+        "lift_name": lift.name if lift else None,
+        "performance_id": row.performance_id,
+        "date": row.date.date().isoformat(),
+        "reps_performed": row.reps_performed,
+        "weight_performed": row.weight_performed,
+        "reps_in_reserve": row.reps_in_reserve,
+        "additional_notes": row.additional_notes,
+        "recommended_weight": row.recommended_weight
+    }
+
+
+def encode_cursor(date_key, performance_id):
+    """
+    Opaque pagination cursor for the (stored date, id) of the last returned tracking.
+    """
+    return base64.urlsafe_b64encode(f"{date_key}|{performance_id}".encode()).decode()
+
+
+def decode_cursor(cursor):
+    """
+    Reverses encode_cursor, raises ValueError for malformed cursors.
+    """
+    try:
+        date_key, performance_id = base64.urlsafe_b64decode(cursor.encode()).decode().split('|')
+        datetime.fromisoformat(date_key) # only accept real dates
+        return date_key, int(performance_id)
+    except (TypeError, ValueError) as e: # bad base64, missing separator, bad date or id
+        raise ValueError(f"Invalid cursor: {cursor}") from e
+
+
+def get_user_trackings_page(user_id, limit, cursor=None):
+    """
+    Returns one page of a user's trackings and the cursor for the next page (None on the last page).
+    One extra row is fetched to know whether another page exists.
+    """
+    rows = db.session.execute(user_trackings_query(user_id, cursor).limit(limit + 1)).all()
+
+    next_cursor = None
+    if len(rows) > limit:
+        rows = rows[:limit]
+        next_cursor = encode_cursor(rows[-1].date_key, rows[-1].performance_id)
+
+    catalog = lift_catalog.snapshot()
+    return [tracking_row_to_dict(row, catalog) for row in rows], next_cursor
+
+
+def stream_user_trackings(user_id, cursor=None, batch_size=500):
+    """
+    Generator yielding a user's trackings as NDJSON lines, rows are pulled from the database in batches instead of all at once.
+    """
+    catalog = lift_catalog.snapshot()
+    result = db.session.execute(user_trackings_query(user_id, cursor).execution_options(yield_per=batch_size))
+    for row in result:
+        yield json.dumps(tracking_row_to_dict(row, catalog)) + "\n"
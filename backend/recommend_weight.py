@@ -1,20 +1,89 @@
-def round_to_nearest_fifth(val):
-    return round(val/0.05) * 0.05
-
-def calculate_recommendation(weight_performed, reps_in_reserve):
-    if reps_in_reserve<= 2:
-        recommended_weight = weight_performed
-    elif 2< reps_in_reserve<5:
-        recommended_weight = weight_performed+5
-    else:
-        recommended_weight= weight_performed+10
-    return recommended_weight
-
-def true_math(weight_per, reps_in_r):
-    if weight_per is None or reps_in_r is None:
-        true_weight = 0
-    recommended_weight = calculate_recommendation(weight_per, reps_in_r)
-    true_weight = round_to_nearest_fifth(recommended_weight)
-    print(true_weight)
-    return true_weight
+import numpy as np
+from sqlalchemy import func, select
+from models import db, LiftPerformance
 
+SESSION_WEIGHTS = np.array([0.5, 0.3, 0.2]) # how much each recent session counts, newest first
+RECENT_SESSIONS = len(SESSION_WEIGHTS) # sessions of history behind each recommendation
+TARGET_RIR = 2 # next session is planned to end about two reps short of failure (RPE 8)
+GRIND_RIR = 1 # a newest session at or below this RIR (RPE 9+) never leads to a heavier next session
+MAX_INCREASE = 10 # lbs the next session may add at most
+MAX_DECREASE = 0.10 # fraction the next session may drop at most
+WEIGHT_INCREMENT = 2.5 # recommendations are rounded to loadable weights
+
+
+# ----- HISTORY AWARE RECOMMENDATIONS --------
+
+def recent_sessions(plan_lift_ids):
+    """
+    Last RECENT_SESSIONS tracked sessions of each plan lift, newest first, as (len(plan_lift_ids), sessions) float arrays of weight,
+    reps and reps in reserve. Plan lifts with fewer sessions are padded with NaN. One windowed query for the whole batch.
+    """
+    unique_ids = list(dict.fromkeys(plan_lift_ids))
+    position = {plan_lift: index for index, plan_lift in enumerate(unique_ids)}
+    weight, reps, rir = (np.full((len(unique_ids), RECENT_SESSIONS), np.nan) for _ in range(3))
+    batch_rows = np.array([position[plan_lift] for plan_lift in plan_lift_ids], dtype=int) # repeated plan lifts share a history
+    if not unique_ids:
+        return weight, reps, rir
+
+    newest = func.row_number().over(
+        partition_by=LiftPerformance.plan_lift_id,
+        order_by=(LiftPerformance.date.desc(), LiftPerformance.id.desc())
+    ).label("newest")
+    ranked = select(
+        LiftPerformance.plan_lift_id,
+        LiftPerformance.weight_performed,
+        LiftPerformance.reps_performed,
+        LiftPerformance.reps_in_reserve,
+        newest,
+    ).where(LiftPerformance.plan_lift_id.in_(unique_ids)).subquery()
+    rows = db.session.execute(select(ranked).where(ranked.c.newest <= RECENT_SESSIONS)).all()
+
+    if rows:
+        plan_lift_id, row_weight, row_reps, row_rir, row_newest = np.array([tuple(row) for row in rows], dtype=np.float64).T
+        batch_index = np.array([position[int(plan_lift)] for plan_lift in plan_lift_id])
+        session_index = row_newest.astype(int) - 1
+        weight[batch_index, session_index] = row_weight
+        reps[batch_index, session_index] = row_reps
+        rir[batch_index, session_index] = row_rir
+    return weight[batch_rows], reps[batch_rows], rir[batch_rows]
+
+
+def with_new_session(history, weight, reps, rir):
+    """
+    Puts just tracked sets in front of histories from recent_sessions, dropping each plan lift's oldest session.
+    """
+    return tuple(
+        np.concatenate([np.asarray(new, dtype=np.float64)[:, None], past[:, :-1]], axis=1)
+        for past, new in zip(history, (weight, reps, rir))
+    )
+
+
+def next_weights(weight, reps, rir, target_reps):
+    """
+    Next session weight for every row of a batch of histories (arrays shaped (batch, sessions), newest first, NaN padded) given the
+    reps each plan lift is planned for. Vectorized over the whole batch, NaN where a plan lift has no history.
+
+    RIR based autoregulation: a session of `reps` with `rir` in reserve is a max effort of reps + rir, giving an estimated 1RM (Epley).
+    A newest session below the recent sessions' blended estimate is smoothed by that blend, a better one counts as is. The estimate is
+    turned back into the weight that leaves TARGET_RIR in reserve at the planned reps. The change from the newest session is capped,
+    and a newest session ground out at GRIND_RIR or below is not followed by a heavier one.
+    """
+    present = ~np.isnan(weight)
+    e1rm = weight * (1 + (reps + rir) / 30)
+    blend = np.where(present, SESSION_WEIGHTS, 0.0)
+    blended_total = blend.sum(axis=1)
+    blended_e1rm = np.divide(np.nansum(e1rm * blend, axis=1), blended_total, out=np.full(len(weight), np.nan), where=blended_total > 0)
+
+    estimate = np.fmax(e1rm[:, 0], blended_e1rm) # bad days are smoothed, progress is not held back
+
+    target_reps = np.where(np.isnan(target_reps), reps[:, 0], target_reps) # plan lifts without planned reps repeat the newest session's
+    recommended = estimate / (1 + (target_reps + TARGET_RIR) / 30)
+
+    last_weight = weight[:, 0]
+    ceiling = np.where(rir[:, 0] <= GRIND_RIR, last_weight, last_weight + MAX_INCREASE)
+    recommended = np.clip(recommended, last_weight * (1 - MAX_DECREASE), ceiling)
+    return np.round(recommended / WEIGHT_INCREMENT) * WEIGHT_INCREMENT
+
+
+def weights_or_none(weights):
+    return [None if weight != weight else weight for weight in weights.tolist()] # NaN -> None
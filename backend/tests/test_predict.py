@@ -0,0 +1,179 @@
+import itertools
+import json
+import os
+import pickle
+import shutil
+import subprocess
+import sys
+import tempfile
+import time
+import unittest
+import warnings
+import numpy as np
+from concurrent.futures import ThreadPoolExecutor
+from inference_batcher import MicroBatcher
+from lift_catalog import CatalogLift, CatalogSnapshot
+from predict import BODY_PARTS, PlanPredictor, plan_predictor, prediction_key
+from ML_plan_maker.model import registry
+from ML_plan_maker.model.compact_tree import MODEL_DIR, PICKLED_ENCODER_PATH, PICKLED_MODEL_PATH, CompactTree, export_tree
+
+def wait_for(condition, timeout=5.0):
+    deadline = time.monotonic() + timeout
+    while not condition() and time.monotonic() < deadline:
+        time.sleep(0.01)
+    return condition()
+
+class TestPredictionTable(unittest.TestCase):
+    def test_01_table_matches_model(self):
+        """Test that the precomputed table holds the model's prediction for every goal and body part combination"""
+        table = plan_predictor.get_table()
+        self.assertEqual(len(table.predictions), 2 * 2 ** len(BODY_PARTS))
+
+        reloaded = plan_predictor.load() # reloading the model rebuilds the table
+        self.assertIsNot(reloaded, table)
+        self.assertEqual(dict(reloaded.predictions), dict(table.predictions))
+
+        strength, mask = prediction_key("Strength", ["Legs", "Back", "Unknown"])
+        self.assertEqual((strength, mask), (True, 0b1001))
+
+    def test_02_planned_lifts_use_the_catalog(self):
+        """Test that predicted names map onto catalog lifts and names missing from the catalog are reported"""
+        table = plan_predictor.get_table()
+        names = table.lookup("Strength", ["Legs"]).lift_names
+        catalog = CatalogSnapshot(1, [CatalogLift(index + 1, name.upper(), "Legs") for index, name in enumerate(names[1:])])
+
+        planned = table.planned_lifts("Strength", ["Legs"], catalog)
+        self.assertEqual([lift.id for lift in planned.lifts], list(range(1, len(names))))
+        self.assertEqual(planned.unresolved, (names[0],))
+
+        # A new catalog version is mapped again
+        planned = table.planned_lifts("Strength", ["Legs"], CatalogSnapshot(2, []))
+        self.assertEqual(planned.lifts, ())
+
+    def test_03_lazy_load_and_warm_up(self):
+        """Test that a predictor loads nothing until used and that warming up loads it in the background once"""
+        predictor = PlanPredictor()
+        self.assertFalse(predictor.ready)
+
+        predictor.warm_up()
+        thread = predictor._warm_up_thread
+        predictor.warm_up() # already warming up
+        self.assertIs(predictor._warm_up_thread, thread)
+        thread.join(timeout=60)
+        self.assertTrue(predictor.ready)
+        self.assertIsNotNone(predictor.load_seconds)
+        self.assertIs(predictor.get_table(), predictor.table)
+
+        broken = PlanPredictor(model_path="missing")
+        with self.assertRaises(FileNotFoundError):
+            broken.get_table()
+        self.assertFalse(broken.ready)
+        self.assertIn("FileNotFoundError", broken.load_error)
+
+    def test_04_compact_tree_matches_pickled_model(self):
+        """Test that the exported tree predicts what the pickled sklearn model does, lift names included"""
+        import pandas as pd
+        with warnings.catch_warnings(): # the pickles may come from another sklearn version
+            warnings.simplefilter("ignore")
+            with open(PICKLED_MODEL_PATH, 'rb') as file:
+                model = pickle.load(file)
+            with open(PICKLED_ENCODER_PATH, 'rb') as file:
+                label_encoder = pickle.load(file)
+
+        features = np.array(list(itertools.product([0, 1], repeat=1 + len(BODY_PARTS))))
+        expected = model.predict(pd.DataFrame(features, columns=model.feature_names_in_))
+        with tempfile.TemporaryDirectory() as path: # the bundled model is multilabel, the pickles are a combination model
+            export_tree(model, label_encoder, path)
+            compact = CompactTree(path, mmap=False)
+        predicted = compact.predict(features)
+        np.testing.assert_array_equal(predicted[:, 1], expected[:, 1])
+        self.assertEqual(
+            list(compact.lift_names[predicted[:, 0].astype(int)]),
+            list(label_encoder.inverse_transform(expected[:, 0].astype(int)))
+        )
+
+    def test_05_serving_does_not_import_sklearn(self):
+        """Test that loading the plan model in a fresh interpreter imports neither sklearn nor pandas"""
+        code = "import sys; from predict import plan_predictor; plan_predictor.load(); print('sklearn' in sys.modules, 'pandas' in sys.modules)"
+        result = subprocess.run([sys.executable, "-c", code], capture_output=True, text=True, check=True)
+        self.assertEqual(result.stdout.strip().splitlines()[-1], "False False")
+
+    def test_06_hot_reload_from_the_registry(self):
+        """Test that the watch swaps in a newly promoted model, keeps serving the old one if the new one fails and does not retry it"""
+        with tempfile.TemporaryDirectory() as registry_dir:
+            for version in ("0001", "0002", "0003"):
+                shutil.copytree(MODEL_DIR, registry.model_dir(version, registry_dir))
+            with open(os.path.join(registry.model_dir("0003", registry_dir), "manifest.json"), "w") as file:
+                json.dump({"format_version": 0}, file) # unreadable export
+            registry.set_current("0001", registry_dir)
+
+            predictor = PlanPredictor(registry_dir=registry_dir)
+            old_table = predictor.get_table()
+            self.assertEqual(predictor.version, "0001")
+            predictor.watch(0.02)
+            try:
+                registry.set_current("0002", registry_dir)
+                self.assertTrue(wait_for(lambda: predictor.version == "0002"))
+                self.assertEqual(old_table.lookup("Strength", ["Legs"]), predictor.table.lookup("Strength", ["Legs"])) # old table still usable
+
+                registry.set_current("0003", registry_dir)
+                self.assertTrue(wait_for(lambda: predictor.failed_loads == 1))
+                time.sleep(0.1)
+                metrics = predictor.metrics()
+                self.assertEqual((metrics["version"], metrics["loads"], metrics["failed_loads"]), ("0002", 2, 1))
+                self.assertIn("format version", metrics["last_error"])
+                self.assertTrue(metrics["watching"])
+            finally:
+                predictor.stop_watching()
+
+    def test_07_micro_batched_predictions(self):
+        """Test that concurrent submits share batches, fan results back in order and that batched predictions match the table"""
+        batches = []
+        batcher = MicroBatcher(lambda items: batches.append(len(items)) or [item * 2 for item in items], max_batch_size=8, max_wait_ms=50)
+        with ThreadPoolExecutor(max_workers=20) as pool:
+            doubled = list(pool.map(batcher.submit, range(20)))
+        self.assertEqual(doubled, [item * 2 for item in range(20)])
+        self.assertLess(len(batches), 20)
+        self.assertTrue(max(batches) <= 8)
+        metrics = batcher.metrics()
+        self.assertEqual((metrics["batches"], metrics["batch_size"]["count"], metrics["queue_depth_at_submit"]["count"]), (len(batches), len(batches), 20))
+        self.assertEqual(sum(metrics["batch_size"]["histogram"].values()), len(batches))
+
+        failing = MicroBatcher(lambda items: 1 / 0, max_wait_ms=1)
+        with self.assertRaises(ZeroDivisionError):
+            failing.submit(1)
+        self.assertEqual(failing.metrics()["failed_batches"], 1)
+
+        predictor = PlanPredictor(MODEL_DIR)
+        predictor.use_batching(max_batch_size=16, max_wait_ms=20)
+        requests = [(goal, [part for index, part in enumerate(BODY_PARTS) if mask >> index & 1])
+                    for goal in ("Strength", "Hypertrophy") for mask in range(1, 1 << len(BODY_PARTS))]
+        with ThreadPoolExecutor(max_workers=16) as pool:
+            predictions = list(pool.map(lambda request: predictor.get_table().lookup(*request), requests))
+        table = plan_predictor.get_table()
+        self.assertEqual(predictions, [table.lookup(*request) for request in requests])
+        self.assertEqual(predictor.get_table().lookup_many(requests), predictions)
+        self.assertLess(predictor.metrics()["batching"]["batches"], len(requests) // 2)
+
+    def test_08_model_threads_need_the_api_key(self):
+        """Test that requests without a valid API key do not start the model warm-up"""
+        import app as app_module
+        from config import Config
+        predictor, served = PlanPredictor(MODEL_DIR), app_module.plan_predictor
+        app_module.plan_predictor = predictor
+        try:
+            client = app_module.app.test_client()
+            self.assertEqual(client.get("/api/ready").status_code, 403)
+            self.assertIsNone(predictor._warm_up_thread)
+            client.get("/api/ready", headers={"X-API-KEY": Config.API_KEY})
+            self.assertIsNotNone(predictor._warm_up_thread)
+        finally:
+            app_module.plan_predictor = served
+            predictor.stop_watching()
+            if predictor._warm_up_thread is not None:
+                predictor._warm_up_thread.join()
+
+if __name__ == "__main__":
+    unittest.main()
+
+#from backend run:   py -m unittest discover -s tests
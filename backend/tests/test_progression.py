@@ -0,0 +1,56 @@
+import unittest
+import numpy as np
+from analytics import epley
+from progression import compute_progression
+
+def history(days, weights, reps=5, rir=2):
+    """(4, n) history array as load_lift_history returns, days counted from the Unix epoch"""
+    days = np.asarray(days, dtype=np.float64) + 0.75 # evening sessions
+    return np.vstack([days, np.asarray(weights, dtype=np.float64), np.full(days.size, reps, dtype=np.float64), np.full(days.size, rir, dtype=np.float64)])
+
+class TestProgression(unittest.TestCase):
+    def test_01_linear_progress(self):
+        """Test that steady progress gives the exact weekly trend and no plateau"""
+        days = np.arange(4, 4 + 70, 2) # every other day from a Monday for 10 weeks
+        result = compute_progression(history(days, 100 + days * 0.5)) # +3.5 lbs per week
+
+        self.assertEqual(result["sessions"], days.size)
+        self.assertAlmostEqual(result["trend"]["e1rm_per_week"], epley(3.5, 5), places=2)
+        self.assertFalse(result["plateau"]["detected"])
+        self.assertEqual(result["plateau"]["weeks_since_best"], 0)
+        self.assertEqual(result["weekly_tonnage"][0]["week_start"], "1970-01-05")
+        self.assertIsNone(result["weekly_tonnage"][0]["change_pct"])
+
+    def test_02_plateau(self):
+        """Test that a flat last month after earlier progress is reported as a plateau"""
+        days = np.arange(4, 4 + 84, 2)
+        weights = np.minimum(100 + days * 0.5, 130) # progress stops after day 60
+        result = compute_progression(history(days, weights))
+
+        self.assertTrue(result["plateau"]["detected"])
+        self.assertAlmostEqual(result["trend"]["e1rm_per_week"], 0, places=6)
+        self.assertEqual(result["effort"]["avg_rir"], 2)
+        self.assertAlmostEqual(result["effort"]["avg_intensity_pct"], round(100 / epley(1, 7), 1))
+
+    def test_03_empty_history(self):
+        """Test that a lift without sets returns empty progression"""
+        result = compute_progression(np.empty((4, 0)))
+        self.assertEqual(result["sets"], 0)
+        self.assertEqual(result["series"], [])
+
+    def test_04_bodyweight_lift(self):
+        """Test that a lift tracked at 0 lbs gives null intensity, effort and relative trend rather than NaN"""
+        import json
+        days = np.arange(4, 4 + 42, 2)
+        result = compute_progression(history(days, np.zeros(days.size), reps=15))
+
+        self.assertEqual(result["trend"], {"e1rm_per_week": 0.0, "pct_per_week": None})
+        self.assertIsNone(result["effort"]["avg_intensity_pct"])
+        self.assertEqual(result["effort"]["avg_rir"], 2)
+        self.assertTrue(all(point["effort"] is None for point in result["series"]))
+        json.dumps(result, allow_nan=False) # valid json
+
+if __name__ == "__main__":
+    unittest.main()
+
+#from backend run:   py -m unittest discover -s tests
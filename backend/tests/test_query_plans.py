@@ -0,0 +1,32 @@
+import os
+import tempfile
+import unittest
+from sqlalchemy import create_engine
+from migrate import MIGRATIONS, check, upgrade
+
+class TestQueryPlans(unittest.TestCase):
+    def setUp(self):
+        # Fresh database file built only through the migrations, no running backend needed
+        handle, self.db_path = tempfile.mkstemp(suffix=".db")
+        os.close(handle)
+        self.engine = create_engine(f"sqlite:///{self.db_path}")
+
+    def tearDown(self):
+        self.engine.dispose()
+        os.remove(self.db_path)
+
+    def test_01_upgrade_is_idempotent(self):
+        """Test that all migrations apply once and a second upgrade is a no-op"""
+        self.assertEqual(upgrade(self.engine), [migration.version for migration in MIGRATIONS])
+        self.assertEqual(upgrade(self.engine), [])
+
+    def test_02_hot_queries_use_indexes(self):
+        """Test that EXPLAIN QUERY PLAN for every hot endpoint query goes through an index"""
+        upgrade(self.engine)
+        self.assertEqual(check(self.engine), [])
+
+
+if __name__ == "__main__":
+    unittest.main()
+
+#from backend run:   py -m unittest discover -s tests
@@ -0,0 +1,70 @@
+import csv
+import importlib.util
+import os
+import tempfile
+import unittest
+import pandas as pd
+from ML_plan_maker.model.generate_synthetic_data import BODY_PARTS, COLUMNS, LIFTS_PER_PLAN, REP_RANGES, generate_synthetic_data, load_exercises
+
+LIFTS = {
+    "Legs": ["Squat", "Leg Press", "Calf Raise"],
+    "Chest": ["Bench Press", "Push-Ups"],
+    "Arms": ["Hammer Curl", "Skull Crushers", "Dips", "Barbell Curl"],
+    "Back": ["Deadlift", "Pull-Ups"],
+    "Full Body": ["Plank"],
+}
+
+class TestSyntheticData(unittest.TestCase):
+    def setUp(self):
+        self.dir = tempfile.TemporaryDirectory()
+        self.lifts_path = os.path.join(self.dir.name, "lifts.csv")
+        with open(self.lifts_path, "w", newline="") as file:
+            writer = csv.writer(file)
+            writer.writerow(["name", "targeted_area"])
+            writer.writerows((name, part) for part, names in LIFTS.items() for name in names)
+
+    def tearDown(self):
+        self.dir.cleanup()
+
+    def generate(self, name, **kwargs):
+        path = os.path.join(self.dir.name, name)
+        written = generate_synthetic_data(2000, path, self.lifts_path, seed=7, chunk_rows=500, **kwargs)
+        self.assertEqual(written, 2000)
+        return path
+
+    def test_01_rows_follow_the_selection(self):
+        """Test that every row targets a body part, picks one lift per targeted part and fills up to six distinct lifts from them"""
+        self.assertEqual(load_exercises(self.lifts_path), LIFTS)
+        data = pd.read_csv(self.generate("data.csv", workers=1))
+        self.assertEqual(list(data.columns), COLUMNS)
+        self.assertTrue((data[BODY_PARTS].sum(axis=1) > 0).all())
+
+        for row in data.itertuples(index=False):
+            targeted = [part for part, flag in zip(BODY_PARTS, row[1:6]) if flag]
+            pool = [name for part in targeted for name in LIFTS[part]]
+            lifts = row.Lifts.split(";")
+            self.assertEqual(len(lifts), min(LIFTS_PER_PLAN, len(pool)))
+            self.assertEqual(len(set(lifts)), len(lifts))
+            self.assertTrue(set(lifts) <= set(pool))
+            self.assertEqual([lifts[index] in LIFTS[part] for index, part in enumerate(targeted)], [True] * len(targeted))
+            self.assertTrue(REP_RANGES[row.Goal][0] <= row.Reps <= REP_RANGES[row.Goal][1])
+
+    def test_02_output_depends_only_on_the_seed(self):
+        """Test that the process pool writes the same file as a single process"""
+        with open(self.generate("inline.csv", workers=1)) as inline, open(self.generate("pool.csv", workers=3)) as pooled:
+            self.assertEqual(inline.read(), pooled.read())
+
+    @unittest.skipUnless(importlib.util.find_spec("pyarrow") or importlib.util.find_spec("fastparquet"), "needs a parquet engine")
+    def test_03_parquet_rerun_replaces_the_parts(self):
+        """Test that writing a smaller parquet dataset over a larger one leaves only the new part files"""
+        path = os.path.join(self.dir.name, "data")
+        generate_synthetic_data(2000, path, self.lifts_path, seed=7, chunk_rows=500, workers=1, file_format="parquet")
+        generate_synthetic_data(600, path, self.lifts_path, seed=7, chunk_rows=500, workers=1, file_format="parquet")
+        self.assertEqual(sorted(os.listdir(path)), ["part-00000.parquet", "part-00001.parquet"])
+        self.assertEqual(len(pd.read_parquet(path)), 600)
+        self.assertEqual([name for name in os.listdir(self.dir.name) if name.startswith(".staging-")], [])
+
+if __name__ == "__main__":
+    unittest.main()
+
+#from backend run:   py -m unittest discover -s tests
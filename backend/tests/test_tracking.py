@@ -0,0 +1,223 @@
+import unittest
+import requests
+from datetime import date
+from config import Config
+from analytics import brzycki, epley
+
+BASE_URL = "http://127.0.0.1:5001/api"  # Your backend API base URL
+
+API_KEY = Config.API_KEY
+
+headers = {
+    "X-API-KEY": API_KEY
+}
+
+class TestTrackingAPI(unittest.TestCase):
+    @classmethod
+    def setUpClass(cls):
+        # Register a throwaway user with a two lift plan to track against
+        test_user = {
+            "username": "TestingTracker",
+            "password": "password_123",
+            "first_name": "Test",
+            "last_name": "Tracker",
+            "email": "tracker@tester.com",
+            "date_of_birth": "2003-01-01",
+            "goal": "Track lifts",
+        }
+        requests.post(f"{BASE_URL}/register", json=test_user, headers=headers)
+        cls.user_id = requests.get(f"{BASE_URL}/get-id/{test_user['username']}", headers=headers).json()["id"]
+
+        lifts = requests.get(f"{BASE_URL}/lifts", headers=headers).json()
+        cls.lift_ids = [lifts[0]["id"], lifts[1]["id"]]
+        cls.lift_name = lifts[0]["name"]
+        plan = {
+            "user_id": cls.user_id,
+            "plan_name": "Tracking test plan",
+            "lifts": [{"lift_id": lift_id, "sets": 3, "reps": 8} for lift_id in cls.lift_ids]
+        }
+        cls.plan_id = requests.post(f"{BASE_URL}/plans", json=plan, headers=headers).json()["plan_id"]
+
+    @classmethod
+    def tearDownClass(cls):
+        requests.delete(f"{BASE_URL}/users/delete/{cls.user_id}", headers=headers)
+
+    def session_entry(self, lift_id):
+        return {
+            "lift_id": lift_id,
+            "reps_performed": 8,
+            "weight_performed": 135.0,
+            "reps_in_reserve": 2,
+            "additional_notes": "test set"
+        }
+
+    def test_01_track_session(self):
+        """Test tracking a whole workout session in one request"""
+        payload = {"user_id": self.user_id, "lifts": [self.session_entry(lift_id) for lift_id in self.lift_ids]}
+        response = requests.post(f"{BASE_URL}/plans/{self.plan_id}/track", json=payload, headers=headers)
+        print(f"Track session response status: {response.status_code}")
+        print(f"Track session response data: {response.json()}")
+
+        self.assertEqual(response.status_code, 201)
+        results = response.json()["results"]
+        self.assertEqual([result["lift_id"] for result in results], self.lift_ids)
+        self.assertTrue(all(result["performance_id"] for result in results))
+
+    def test_02_track_session_partial(self):
+        """Test that lifts outside the plan are reported per lift while valid lifts are still tracked"""
+        payload = {"user_id": self.user_id, "lifts": [self.session_entry(self.lift_ids[0]), self.session_entry(-1)]}
+        response = requests.post(f"{BASE_URL}/plans/{self.plan_id}/track", json=payload, headers=headers)
+
+        self.assertEqual(response.status_code, 207)
+        results = response.json()["results"]
+        self.assertTrue(results[0]["performance_id"])
+        self.assertIn("error", results[1])
+
+        # unhashable lift ids are per lift errors too, not a server error
+        payload = {"user_id": self.user_id, "lifts": [self.session_entry([self.lift_ids[0]]), self.session_entry({"id": 1})]}
+        response = requests.post(f"{BASE_URL}/plans/{self.plan_id}/track", json=payload, headers=headers)
+        self.assertEqual(response.status_code, 400)
+        self.assertEqual([result["error"] for result in response.json()["results"]], ["lift_id must be an integer"] * 2)
+
+    def test_03_trackings_pagination(self):
+        """Test paging through tracking history with the keyset cursor"""
+        seen = []
+        params = {"limit": 2}
+        while True:
+            response = requests.get(f"{BASE_URL}/users/{self.user_id}/trackings", params=params, headers=headers)
+            self.assertEqual(response.status_code, 200)
+            page = response.json()
+            self.assertLessEqual(len(page["trackings"]), 2)
+            seen.extend(tracking["performance_id"] for tracking in page["trackings"])
+            if not page["next_cursor"]:
+                break
+            params["cursor"] = page["next_cursor"]
+
+        self.assertEqual(len(seen), 3) # two lifts from the full session, one from the partial session
+        self.assertEqual(len(set(seen)), len(seen)) # no tracking repeated across pages
+
+    def test_04_trackings_ndjson(self):
+        """Test streaming the whole tracking history as NDJSON"""
+        response = requests.get(f"{BASE_URL}/users/{self.user_id}/trackings", params={"format": "ndjson"}, headers=headers)
+        self.assertEqual(response.status_code, 200)
+        lines = response.text.strip().splitlines()
+        self.assertEqual(len(lines), 3)
+
+    def test_05_lift_analytics(self):
+        """Test the aggregated stats of the lift tracked in both sessions"""
+        response = requests.get(f"{BASE_URL}/users/{self.user_id}/lifts/{self.lift_name}/analytics", headers=headers)
+        self.assertEqual(response.status_code, 200)
+        analytics = response.json()
+
+        summary = analytics["summary"]
+        self.assertEqual(summary["sets"], 2)
+        self.assertEqual(summary["max_weight"], 135.0)
+        self.assertEqual(summary["total_volume"], 2 * 135.0 * 8)
+        self.assertEqual(summary["e1rm_epley"], round(epley(135.0, 8), 2))
+        self.assertEqual(summary["e1rm_brzycki"], round(brzycki(135.0, 8), 2))
+        self.assertEqual(len(analytics["weekly"]), 1)
+        self.assertEqual(analytics["weekly"][0]["sets"], 2)
+
+        # A range ending before today has no sets, a reversed range is rejected
+        response = requests.get(f"{BASE_URL}/users/{self.user_id}/lifts/{self.lift_name}/analytics", params={"end": "2000-01-01"}, headers=headers)
+        self.assertEqual(response.json()["summary"]["sets"], 0)
+        response = requests.get(f"{BASE_URL}/users/{self.user_id}/lifts/{self.lift_name}/analytics", params={"start": date.today().isoformat(), "end": "2000-01-01"}, headers=headers)
+        self.assertEqual(response.status_code, 400)
+
+    def test_06_personal_record(self):
+        """Test that a heavier set is flagged as a personal record and the all time stats match the aggregated range stats"""
+        entry = dict(self.session_entry(self.lift_ids[0]), weight_performed=145.0)
+        response = requests.post(f"{BASE_URL}/plans/{self.plan_id}/track", json={"user_id": self.user_id, "lifts": [entry]}, headers=headers)
+        self.assertEqual(response.status_code, 201)
+        self.assertEqual(response.json()["results"][0]["personal_record"], {"weight": True, "e1rm": True})
+
+        url = f"{BASE_URL}/users/{self.user_id}/lifts/{self.lift_name}/analytics"
+        all_time = requests.get(url, headers=headers).json()["summary"] # served from user_lift_stats
+        in_range = requests.get(url, params={"start": "2000-01-01", "end": date.today().isoformat()}, headers=headers).json()["summary"] # aggregated from lift_performances
+        self.assertEqual(all_time, in_range)
+        self.assertEqual(all_time["max_weight"], 145.0)
+
+    def test_07_delete_plan_rolls_back_stats(self):
+        """Test that deleting a plan takes its sets back out of the lift stats"""
+        plan = {"user_id": self.user_id, "plan_name": "Stats rollback plan", "lifts": [{"lift_id": self.lift_ids[0], "sets": 1, "reps": 1}]}
+        plan_id = requests.post(f"{BASE_URL}/plans", json=plan, headers=headers).json()["plan_id"]
+        entry = dict(self.session_entry(self.lift_ids[0]), weight_performed=225.0)
+        requests.post(f"{BASE_URL}/plans/{plan_id}/track", json={"user_id": self.user_id, "lifts": [entry]}, headers=headers)
+
+        url = f"{BASE_URL}/users/{self.user_id}/lifts/{self.lift_name}/analytics"
+        self.assertEqual(requests.get(url, headers=headers).json()["summary"]["max_weight"], 225.0)
+        requests.post(f"{BASE_URL}/delete-plan", json={"plan_id": plan_id}, headers=headers)
+        summary = requests.get(url, headers=headers).json()["summary"]
+        self.assertEqual(summary["max_weight"], 145.0)
+        self.assertEqual(summary["sets"], 3)
+
+    def test_08_next_weights(self):
+        """Test next session weights for the whole plan and the recommendation stored with tracked sets"""
+        response = requests.get(f"{BASE_URL}/plans/{self.plan_id}/next-weights", headers=headers)
+        self.assertEqual(response.status_code, 200)
+        next_weights = {lift["lift_id"]: lift["recommended_weight"] for lift in response.json()["next_weights"]}
+        self.assertEqual(next_weights[self.lift_ids[1]], 135.0) # 8 reps with 2 in reserve is on target, keep the weight
+        self.assertEqual(next_weights[self.lift_ids[0]], 145.0) # newest session was heavier at the same effort
+
+        trackings = requests.get(f"{BASE_URL}/users/{self.user_id}/trackings", params={"limit": 1}, headers=headers).json()["trackings"]
+        self.assertEqual(trackings[0]["recommended_weight"], next_weights[trackings[0]["lift_id"]])
+
+    def test_09_generate_plan(self):
+        """Test that a generated plan holds every resolved lift and reports predicted names missing from the catalog"""
+        payload = {"user_id": self.user_id, "goal": "Strength", "body_parts": ["Legs"]}
+        response = requests.post(f"{BASE_URL}/generate_plan", json=payload, headers=headers)
+        self.assertEqual(response.status_code, 201)
+        data = response.json()
+        self.assertTrue(data["lifts"])
+        self.assertIsInstance(data["unresolved_lifts"], list)
+
+        plans = requests.get(f"{BASE_URL}/users/{self.user_id}/plans", headers=headers).json()
+        plan = next(plan for plan in plans if plan["plan_id"] == data["plan_id"])
+        self.assertEqual(sorted(lift["lift_name"] for lift in plan["lifts"]), sorted(data["lifts"]))
+
+    def test_10_generate_plans_batch(self):
+        """Test that a batch of plan requests reports created plans, name conflicts, unknown users and invalid requests per request"""
+        plan = {"user_id": self.user_id, "goal": "Hypertrophy", "body_parts": ["Chest", "Arms"]}
+        payload = {"plans": [plan, plan, {**plan, "user_id": 10 ** 9}, {"user_id": self.user_id}]}
+        response = requests.post(f"{BASE_URL}/generate_plans", json=payload, headers=headers)
+        self.assertEqual(response.status_code, 207)
+        data = response.json()
+        self.assertEqual((data["created"], data["failed"]), (1, 3))
+
+        created, repeated, unknown, invalid = data["results"]
+        self.assertEqual(created["plan_name"], "Chest and Arms workout")
+        self.assertTrue(created["lifts"])
+        self.assertIn("already exists", repeated["error"])
+        self.assertEqual(unknown["error"], "User not found")
+        self.assertIn("required", invalid["error"])
+
+        plans = requests.get(f"{BASE_URL}/users/{self.user_id}/plans", headers=headers).json()
+        plan = next(plan for plan in plans if plan["plan_id"] == created["plan_id"])
+        self.assertEqual(sorted(lift["lift_name"] for lift in plan["lifts"]), sorted(created["lifts"]))
+
+    def test_11_tracked_dates(self):
+        """Test that the last month of the calendar is answered and a year outside it is rejected"""
+        params = {"user_id": self.user_id, "year": 9999, "month": 12}
+        response = requests.get(f"{BASE_URL}/tracked-dates", params=params, headers=headers)
+        self.assertEqual(response.status_code, 200)
+        self.assertEqual(response.json()["tracked_dates"], [])
+
+        response = requests.get(f"{BASE_URL}/tracked-dates", params={**params, "year": 10000}, headers=headers)
+        self.assertEqual(response.status_code, 400)
+        self.assertEqual(response.json()["error"], "Year must be between 1 and 9999")
+
+    def test_12_dashboard_page(self):
+        """Test that the dashboard page takes the same calendar months as the tracked dates endpoint"""
+        url = f"{BASE_URL}/pages/dashboard/{self.user_id}"
+        response = requests.get(url, params={"year": 9999, "month": 12}, headers=headers)
+        self.assertEqual(response.status_code, 200)
+        self.assertEqual(response.json()["tracked_dates"], [])
+
+        response = requests.get(url, params={"year": 10000}, headers=headers)
+        self.assertEqual(response.status_code, 400)
+        self.assertEqual(response.json()["error"], "Year must be between 1 and 9999")
+
+if __name__ == "__main__":
+    unittest.main()
+
+#from backend run:   py -m unittest discover -s tests
@@ -0,0 +1,91 @@
+import csv
+import os
+import tempfile
+import unittest
+import numpy as np
+from ML_plan_maker.model import registry
+from ML_plan_maker.model.compact_tree import load_model
+from ML_plan_maker.model.generate_synthetic_data import generate_synthetic_data
+from ML_plan_maker.model.train import lift_indicators, load_training_data, train
+from predict import PlanPredictor
+
+LIFTS = [("Squat", "Legs"), ("Leg Press", "Legs"), ("Bench Press", "Chest"), ("Push-Ups", "Chest"), ("Hammer Curl", "Arms"),
+         ("Dips", "Arms"), ("Deadlift", "Back"), ("Pull-Ups", "Back"), ("Plank", "Full Body"), ("Burpees", "Full Body")]
+GRID = {"criterion": ["gini"], "max_depth": [None, 3], "min_samples_leaf": [1]}
+
+class TestTraining(unittest.TestCase):
+    @classmethod
+    def setUpClass(cls):
+        cls.dir = tempfile.TemporaryDirectory()
+        lifts_path = os.path.join(cls.dir.name, "lifts.csv")
+        with open(lifts_path, "w", newline="") as file:
+            csv.writer(file).writerows([("name", "targeted_area"), *LIFTS])
+        cls.data_path = os.path.join(cls.dir.name, "data.csv")
+        generate_synthetic_data(3000, cls.data_path, lifts_path, seed=3, workers=1)
+        cls.registry = os.path.join(cls.dir.name, "registry")
+
+    @classmethod
+    def tearDownClass(cls):
+        cls.dir.cleanup()
+
+    def test_01_chunked_loading(self):
+        """Test that chunked loading gives the same arrays as one chunk, with lift codes numbered like a LabelEncoder"""
+        whole = load_training_data(self.data_path, chunk_rows=10_000)
+        chunked = load_training_data(self.data_path, chunk_rows=128)
+        for expected, actual in zip(whole, chunked):
+            np.testing.assert_array_equal(expected, actual)
+        features, codes, reps, names = chunked
+        self.assertEqual(features.shape, (3000, 6))
+        self.assertEqual(list(names), sorted(names))
+        self.assertEqual(codes.max(), len(names) - 1)
+
+    def test_02_train_publishes_versions(self):
+        """Test that training publishes numbered versions with a manifest and only promoted ones become current"""
+        version, manifest = train(self.data_path, GRID, folds=3, workers=2, registry_dir=self.registry)
+        self.assertEqual(version, "0001")
+        self.assertEqual(registry.current_version(self.registry), "0001")
+        self.assertEqual(len(manifest["cv"]["candidates"]), 2)
+        self.assertEqual(manifest["data"]["rows"], 3000)
+        self.assertGreater(manifest["model"]["bytes"], 0)
+        self.assertEqual(registry.read_manifest(version, self.registry)["params"], manifest["params"])
+
+        self.assertEqual(manifest["kind"], "multilabel")
+        [(lifts, reps)] = load_model(registry.model_dir(version, self.registry)).predict_plans(np.array([[1, 1, 0, 0, 0, 0]]))
+        self.assertTrue(set(lifts) <= {name for name, area in LIFTS if area == "Legs"})
+
+        version, _ = train(self.data_path, GRID, folds=3, workers=1, registry_dir=self.registry, promote=False)
+        self.assertEqual(registry.list_versions(self.registry), ["0001", "0002"])
+        self.assertEqual(registry.current_version(self.registry), "0001")
+
+        predictor = PlanPredictor(registry.model_dir(version, self.registry))
+        self.assertEqual(len(predictor.get_table().predictions), 64)
+
+    def test_03_model_kinds_score_alike(self):
+        """Test that both model kinds plan lifts of the targeted body parts and are scored on the same lift sets"""
+        lift_names, indicators = lift_indicators(np.array(["Squat;Dips", "Dips", "Plank;Squat"]))
+        self.assertEqual(list(lift_names), ["Dips", "Plank", "Squat"])
+        np.testing.assert_array_equal(indicators, [[1, 0, 1], [1, 0, 0], [0, 1, 1]])
+
+        with tempfile.TemporaryDirectory() as registry_dir:
+            scores = {}
+            for kind in ("combination", "multilabel"):
+                version, manifest = train(self.data_path, GRID, folds=3, workers=1, registry_dir=registry_dir, kind=kind)
+                model = load_model(registry.model_dir(version, registry_dir))
+                self.assertEqual(model.manifest["kind"], kind)
+                scores[kind] = manifest["cv"]["best_score"]
+                plans = model.predict_plans(np.array([[0, 0, 0, 0, 1, 0], [1, 0, 1, 0, 0, 0]]))
+                self.assertTrue(set(plans[0][0]) <= {"Deadlift", "Pull-Ups"})
+                self.assertTrue(set(plans[1][0]) <= {"Bench Press", "Push-Ups"})
+            for score in scores.values():
+                self.assertTrue(0.5 < score <= 1.0)
+
+    def test_04_workers_limited_by_memory(self):
+        """Test that the search runs fewer workers when their fits would not fit in the memory budget"""
+        with tempfile.TemporaryDirectory() as registry_dir:
+            _, manifest = train(self.data_path, GRID, folds=3, workers=4, registry_dir=registry_dir, max_memory=200_000)
+            self.assertEqual(manifest["timings"]["workers"], 1)
+
+if __name__ == "__main__":
+    unittest.main()
+
+#from backend run:   py -m unittest discover -s tests
@@ -1,10 +1,15 @@
+import re
+import time
 from datetime import datetime
 from functools import wraps
-from flask import Flask, render_template, redirect, session, url_for, flash, request
+from flask import Flask, abort, jsonify, render_template, redirect, session, url_for, flash, request
 from calendar_creation import generate_calendar, get_month_name, generate_dashboard_calendar
 import requests
 from config import Config
 from forms import LoginForm, RegisterForm, ResetForm
+from backend_client import BackendClient, BackendUnavailable
+from fanout import FanOut
+from user_cache import UserCache
 
 
 app = Flask(__name__)
@@ -15,9 +20,26 @@ BACKEND_URL = "http://127.0.0.1:5001/api"
 
 API_KEY = Config.API_KEY
 
-headers = {
-    "X-API-KEY": API_KEY
-}
+# Shared backend client - keep-alive pool sized to the worker threads, timeouts on every call, GET retries and per route latency metrics
+backend = BackendClient(
+    BACKEND_URL,
+    API_KEY,
+    pool_size=getattr(Config, 'BACKEND_POOL_SIZE', 10),
+    connect_timeout=getattr(Config, 'BACKEND_CONNECT_TIMEOUT', 3.05),
+    read_timeout=getattr(Config, 'BACKEND_READ_TIMEOUT', 10),
+    get_retries=getattr(Config, 'BACKEND_GET_RETRIES', 2),
+)
+
+# Per user read-through cache of profile, plans and calendar data, invalidated by the views that change them
+user_cache = UserCache(max_users=getattr(Config, 'USER_CACHE_MAX_USERS', 1000))
+
+# Runs a page's independent backend calls concurrently under one shared deadline
+fan_out = FanOut(
+    max_workers=getattr(Config, 'BACKEND_FANOUT_WORKERS', 10),
+    deadline=getattr(Config, 'BACKEND_FANOUT_DEADLINE', 5.0),
+)
+
+TRACKING_HISTORY_PAGE_SIZE = 50 # trackings shown per tracking history page
 
 # Functions
 # Get user id in session func
@@ -25,6 +47,75 @@ def get_id():
     user_id = session.get('user_id')
     return user_id
 
+# Get the lift catalog func - the catalog rarely changes, so it is kept between requests and revalidated with the backend's ETag
+lift_catalog_cache = {"lifts": None, "etag": None, "expires": 0}
+
+def get_lifts():
+    now = time.monotonic()
+    if lift_catalog_cache["lifts"] is not None and now < lift_catalog_cache["expires"]:
+        return lift_catalog_cache["lifts"] # still fresh per the backend's Cache-Control max-age
+
+    request_headers = {}
+    if lift_catalog_cache["etag"]:
+        request_headers["If-None-Match"] = lift_catalog_cache["etag"]
+    response = backend.get("/lifts", headers=request_headers)
+
+    if response.status_code == 200:
+        lift_catalog_cache["lifts"] = response.json()
+        lift_catalog_cache["etag"] = response.headers.get("ETag")
+    elif response.status_code != 304: # 304 - our copy is still current
+        return None
+
+    max_age = re.search(r"max-age=(\d+)", response.headers.get("Cache-Control", ""))
+    lift_catalog_cache["expires"] = now + (int(max_age.group(1)) if max_age else 0)
+    return lift_catalog_cache["lifts"]
+
+
+# Cached per user backend data funcs - served from user_cache until it expires or the user changes it, None if the backend call failed
+def json_or_none(response):
+    return response.json() if response.status_code == 200 else None
+
+def get_profile(user_id):
+    return user_cache.get_or_fetch(user_id, "profile", lambda: json_or_none(backend.get("/settings/user-info/{user_id}", user_id=user_id)))
+
+def get_first_name(user_id):
+    def fetch():
+        profile = get_profile(user_id)
+        return profile.get('first_name') if profile else None
+    return user_cache.get_or_fetch(user_id, "first_name", fetch)
+
+def get_plans(user_id):
+    return user_cache.get_or_fetch(user_id, "plans", lambda: json_or_none(backend.get("/users/{user_id}/plans", user_id=user_id)))
+
+def get_tracked_dates(user_id, year, month):
+    def fetch():
+        response = backend.get("/tracked-dates", params={"user_id": user_id, "year": year, "month": month})
+        return response.json().get("tracked_dates", []) if response.status_code == 200 else None
+    return user_cache.get_or_fetch(user_id, "tracked_dates", fetch, key=(year, month))
+
+# Page data func - parts already cached are used as is. When nothing is cached the page endpoint returns every part in one backend call,
+# otherwise (or when the page endpoint answers with an error) the missing parts are fetched concurrently through their own cached funcs.
+# parts maps name -> (cache resource, cache key, fetch func), parts that could not be loaded are None
+def get_page_data(user_id, page, parts, params=None):
+    page_data = {name: user_cache.peek(user_id, resource, key) for name, (resource, key, _) in parts.items()}
+    missing = [name for name, value in page_data.items() if value is None]
+    if not missing:
+        return page_data
+
+    if len(missing) == len(parts):
+        response = backend.get(f"/pages/{page}/{{user_id}}", params=params, user_id=user_id)
+        if response.status_code == 200:
+            page_data = response.json()
+            for name, (resource, key, _) in parts.items():
+                user_cache.put(user_id, resource, page_data[name], key)
+            return page_data
+        if isinstance(response, BackendUnavailable):
+            return page_data # backend unreachable, separate calls would fail the same way
+
+    page_data.update(fan_out.run({name: parts[name][2] for name in missing}))
+    return page_data
+
+
 # Ensure user is logged in for according app routes func
 def login_required(f):
     @wraps(f) #preserves original functions name and data
@@ -64,23 +155,25 @@ def aboutus():
 @login_required
 def dashboard():
     user_id = get_id()
-    response = requests.get(f"{BACKEND_URL}/get-name/{user_id}", headers=headers)
-    if response.status_code==200:
-        user_firstname = response.json().get('firstname')
-    else:
-        user_firstname = response.json().get('error', 'An error occured')
-        print("An error occured")
     now = datetime.now()
     year, month = now.year, now.month
 
-    try:
-        # Call the backend API to get tracked dates
-        response = requests.get(f"{BACKEND_URL}/tracked-dates", params={"user_id": user_id, "year": year, "month": month}, headers=headers)
-        response.raise_for_status()  # Raise an error for non-200 responses
-        tracked_dates = response.json().get("tracked_dates", [])
+    # First name and tracked dates for the current month in one backend call (or none when both are cached)
+    page_data = get_page_data(user_id, "dashboard", {
+        "first_name": ("first_name", None, lambda: get_first_name(user_id)),
+        "tracked_dates": ("tracked_dates", (year, month), lambda: get_tracked_dates(user_id, year, month)),
+    }, params={"year": year, "month": month})
+
+    user_firstname = page_data["first_name"]
+    if user_firstname is None:
+        user_firstname = 'An error occured'
+        print("An error occured")
+
+    tracked_dates = page_data["tracked_dates"]
+    if tracked_dates is not None:
         tracked_days = [datetime.strptime(date, "%Y-%m-%d").day for date in tracked_dates]  # Extract day numbers
-    except Exception as e:
-        print(f"Error fetching tracked dates: {str(e)}")
+    else:
+        print("Error fetching tracked dates")
         flash("Could not load tracked lift dates from the backend.", "danger")
         tracked_days = []
 
@@ -107,7 +200,7 @@ def login():
             "username": form.username.data,
             "password": form.password.data,
         }
-        response = requests.post(f"{BACKEND_URL}/login", json=login_data, headers=headers)
+        response = backend.post("/login", json=login_data)
 
         if response.status_code == 200:
             # Extract user_id from the API response
@@ -125,6 +218,7 @@ def login():
 # Logout button
 @app.route('/logout')
 def logout():
+    user_cache.invalidate(get_id())
     session.clear()
     flash("You have been logged out.", "info")
     return redirect(url_for('login'))
@@ -141,7 +235,7 @@ def reset_password():
         }
         
         # Send reset data to backend
-        response = requests.post(f"{BACKEND_URL}/reset-password", json=reset_data, headers=headers)
+        response = backend.post("/reset-password", json=reset_data)
         
         if response.status_code == 200:
             return redirect(url_for('login'))
@@ -166,7 +260,7 @@ def register():
             "goal": form.goal.data,
             "password": form.password.data,
         }
-        response = requests.post(f"{BACKEND_URL}/register", json=user_data, headers=headers)
+        response = backend.post("/register", json=user_data)
 
         try:
             response_data = response.json()  # Try to parse JSON response
@@ -198,7 +292,7 @@ def settings():
             flash("Email is required.", "error")
             return redirect(url_for('settings'))
         else:
-            response = requests.post(f"{BACKEND_URL}/change-email", json=data, headers=headers)
+            response = backend.post("/change-email", json=data)
             if response.status_code==409:
                 flash("Email is already attached to another user account.", "error")
                 return redirect(url_for('settings'))
@@ -206,13 +300,13 @@ def settings():
                 flash("Email is missing or format is incorrect", "error")
                 return redirect(url_for('settings'))
             else:
+                user_cache.invalidate(user_id, "profile")
                 flash("Successfully changed user email")
 
 
     
-    response = requests.get(f"{BACKEND_URL}/settings/user-info/{user_id}", headers=headers)
-    if response.status_code==200:
-        user_data = response.json()
+    user_data = get_profile(user_id)
+    if user_data is not None:
         return render_template('settings.html', user=user_data)
     else:
         return "Error fetching user data",404 
@@ -257,8 +351,9 @@ def plan():
         }
 
         # Post to the backend to create the plan
-        response = requests.post(f"{BACKEND_URL}/plans", json=payload, headers=headers)
+        response = backend.post("/plans", json=payload)
         if response.status_code == 201:
+            user_cache.invalidate(user_id, "plans")
             flash("Plan created successfully!", "success")
             return redirect(url_for('my_plans'))
         else:
@@ -268,10 +363,8 @@ def plan():
 
     else:
         # GET request: render the plan creation form
-        lifts_resp = requests.get(f"{BACKEND_URL}/lifts", headers=headers)
-        if lifts_resp.status_code == 200:
-            lifts = lifts_resp.json()
-        else:
+        lifts = get_lifts()
+        if lifts is None:
             lifts = []
             flash("Could not load exercises from backend.", "danger")
 
@@ -284,19 +377,19 @@ def plan():
 def my_plans():
     user_id = get_id()
 
-    resp = requests.get(f"{BACKEND_URL}/users/{user_id}/plans", headers=headers)
+    # First name and plans in one backend call (or none when both are cached)
+    page_data = get_page_data(user_id, "my-plans", {
+        "first_name": ("first_name", None, lambda: get_first_name(user_id)),
+        "plans": ("plans", None, lambda: get_plans(user_id)),
+    })
+    plans = page_data["plans"]
 
-    response = requests.get(f"{BACKEND_URL}/get-name/{user_id}", headers=headers)
-    if response.status_code==200:
-        user_firstname = response.json().get('firstname')
-    else:
-        user_firstname = response.json().get('error', 'An error occured')
+    user_firstname = page_data["first_name"]
+    if user_firstname is None:
+        user_firstname = 'An error occured'
         print("An error occured")
 
-    if resp.status_code == 200:
-        plans = resp.json()
-        app.logger.info(f"Plans retrieved: {plans}")
-    else:
+    if plans is None:
         plans = []
         flash("Could not load plans from backend.", "danger")
 
@@ -319,10 +412,10 @@ def delete_plan():
             return redirect(url_for('delete_plan'))
 
         # Call the backend delete-plan API
-        delete_url = f"{BACKEND_URL}/delete-plan"
-        response = requests.post(delete_url, json={"plan_id": plan_id},headers=headers)
+        response = backend.post("/delete-plan", json={"plan_id": plan_id})
 
         if response.status_code == 200:
+            user_cache.invalidate(user_id) # plans and the plan's tracked sets are gone
             flash("Plan deleted successfully.", "success")
         else:
             error_message = response.json().get("error", "An error occurred.")
@@ -330,10 +423,8 @@ def delete_plan():
         return redirect(url_for('my_plans'))  
 
     # Fetch the plans for dropdown menu
-    plans_resp = requests.get(f"{BACKEND_URL}/users/{user_id}/plans",headers=headers)
-    if plans_resp.status_code == 200:
-        plans = plans_resp.json()
-    else:
+    plans = get_plans(user_id)
+    if plans is None:
         plans = []
         flash("Could not load plans", "danger")
 
@@ -356,19 +447,20 @@ def tracker():
             return redirect(url_for('tracker'))
 
         # Fetch the selected plan's details
-        plan_resp = requests.get(f"{BACKEND_URL}/users/{user_id}/plans",headers=headers)
-        if plan_resp.status_code != 200:
+        plans = get_plans(user_id)
+        if plans is None:
             flash("Could not load plan details from backend.", "danger")
             return redirect(url_for('tracker'))
 
-        plans = plan_resp.json()
         selected_plan = next((plan for plan in plans if str(plan['plan_id']) == plan_id), None)
         if not selected_plan:
             flash("Selected plan not found.", "danger")
             return redirect(url_for('tracker'))
 
-        # Iterate over each lift in the selected plan and send tracking data
+        # Collect every lift in the selected plan into one workout session
         tracking_success = True
+        lift_names = {}
+        session_lifts = []
         for lift in selected_plan['lifts']:
             lift_id = lift['lift_id']
             reps_performed_str = request.form.get(f"reps_performed_{lift_id}", '0')
@@ -386,20 +478,37 @@ def tracker():
                 tracking_success = False
                 continue
 
-            # Send POST request to track performance
-            track_url = f"{BACKEND_URL}/plans/{plan_id}/lifts/{lift_id}/track"
-            payload = {
-                "user_id": user_id,
+            lift_names[lift_id] = lift['lift_name']
+            session_lifts.append({
+                "lift_id": lift_id,
                 "reps_performed": reps_performed,
                 "weight_performed": weight_performed,
                 "reps_in_reserve": reps_in_reserve,
                 "additional_notes": additional_notes
+            })
+
+        if session_lifts:
+            # Send the whole session in one POST request
+            payload = {
+                "user_id": user_id,
+                "lifts": session_lifts
             }
-            response = requests.post(track_url, json=payload,headers=headers)
+            response = backend.post("/plans/{plan_id}/track", json=payload, plan_id=plan_id)
+            if response.status_code in (201, 207):
+                user_cache.invalidate(user_id, "tracked_dates") # calendar changes with the logged workout
+                for result in response.json().get('results', []):
+                    if (result.get('personal_record') or {}).get('weight'):
+                        flash(f"New personal record on {lift_names.get(result['lift_id'])}!", "success")
 
             if response.status_code != 201:
-                error_message = response.json().get('error', 'Error tracking performance.')
-                flash(f"Failed to track lift '{lift['lift_name']}': {error_message}", "danger")
+                response_data = response.json()
+                results = response_data.get('results')
+                if not results:
+                    flash(f"Failed to track workout: {response_data.get('error', 'Error tracking performance.')}", "danger")
+                for result in results or []:
+                    if result.get('error'):
+                        lift_name = lift_names.get(result.get('lift_id'), result.get('lift_id'))
+                        flash(f"Failed to track lift '{lift_name}': {result['error']}", "danger")
                 tracking_success = False
 
         if tracking_success:
@@ -411,25 +520,24 @@ def tracker():
 
     else:
         # GET request: render the tracking form
-        plans_resp = requests.get(f"{BACKEND_URL}/users/{user_id}/plans",headers=headers)
-        if plans_resp.status_code == 200:
-            user_plans = plans_resp.json()
-        else:
+        user_plans = get_plans(user_id)
+        if user_plans is None:
             user_plans = []
             flash("Could not load user plans.", "danger")
 
         selected_plan = None
+        next_weights = {}
         plan_id = request.args.get('plan_id')
         if plan_id:
-            # Fetch detailed plan information if plan_id is provided
-            plan_resp = requests.get(f"{BACKEND_URL}/users/{user_id}/plans",headers=headers)
-            if plan_resp.status_code == 200:
-                plans = plan_resp.json()
-                selected_plan = next((plan for plan in plans if str(plan['plan_id']) == plan_id), None)
-            else:
-                flash("Could not load plan details.", "danger")
+            # Plan details (lifts included) already came back with the user's plans
+            selected_plan = next((plan for plan in user_plans if str(plan['plan_id']) == plan_id), None)
+        if selected_plan:
+            # Recommended weights for the whole plan in one call, the form is prefilled with them
+            response = backend.get("/plans/{plan_id}/next-weights", plan_id=selected_plan['plan_id'])
+            if response.status_code == 200:
+                next_weights = {lift['lift_id']: lift['recommended_weight'] for lift in response.json().get('next_weights', [])}
 
-        return render_template('tracker.html', user_plans=user_plans, selected_plan=selected_plan)
+        return render_template('tracker.html', user_plans=user_plans, selected_plan=selected_plan, next_weights=next_weights)
 
 
 
@@ -441,19 +549,25 @@ def tracking_history():
     Displays all tracking data for the user.
     """
     user_id = get_id() # Get user id
-    resp = requests.get(f"{BACKEND_URL}/users/{user_id}/trackings",headers=headers) #call trackings api endpoint to recieve tracking history json info
-    resp2 = requests.get(f"{BACKEND_URL}/get-name/{user_id}",headers=headers)
+    cursor = request.args.get('cursor') # page of history to show, newest page if missing
+    params = {"limit": TRACKING_HISTORY_PAGE_SIZE}
+    if cursor:
+        params["cursor"] = cursor
+    resp = backend.get("/pages/tracking-history/{user_id}", params=params, user_id=user_id) #call tracking history page endpoint to recieve the first name and one page of tracking history json info
 
     if resp.status_code == 200:
-        trackings = resp.json()
+        page_data = resp.json()
+        trackings = page_data.get('trackings', [])
+        next_cursor = page_data.get('next_cursor')
+        first_name = page_data.get('first_name')
+        user_cache.put(user_id, "first_name", first_name)
     else:
         trackings = []
+        next_cursor = None
+        first_name = get_first_name(user_id)
         flash("Could not load tracking data from backend.", "danger")
 
-    if resp2.status_code == 200:
-        first_name = resp2.json().get('firstname')
-
-    return render_template('tracking_history.html', trackings=trackings, first_name=first_name)
+    return render_template('tracking_history.html', trackings=trackings, first_name=first_name, next_cursor=next_cursor, is_first_page=not cursor)
 
 
 # Generate_plan.html page
@@ -477,9 +591,13 @@ def generate_plan():
         }
 
         # Make a POST request to the backend API endpoint generate_plan
-        response = requests.post(f"{BACKEND_URL}/generate_plan", json=payload,headers=headers)
+        response = backend.post("/generate_plan", json=payload)
         if response.status_code == 201:
+            user_cache.invalidate(user_id, "plans")
             flash("Plan generated successfully!", "success")
+            unresolved = response.json().get("unresolved_lifts")
+            if unresolved:
+                flash(f"Some suggested lifts are not available yet and were left out: {', '.join(unresolved)}", "warning")
             return redirect(url_for('my_plans')) # Redirect the user to my_plans page to view plans
         elif response.status_code==400:
             error_message = response.json().get("error", "Plan already exists")
@@ -494,36 +612,50 @@ def generate_plan():
 @app.route('/advanced_tracking', methods=['GET', 'POST'])
 def advanced_tracking():
     user_id = get_id()
-    
-    response = requests.get(f"{BACKEND_URL}/lifts", headers=headers)
-    if response.status_code == 200:
-        lift_info = response.json()
-    else:
-        error_message = response.json().get('error', 'Error getting lift information')
-        flash(error_message, "danger")
+    lift_name = request.form.get('lift_name') if request.method == 'POST' else None
+    # Optional date range, empty fields mean no bound
+    date_range = {key: request.form.get(key) for key in ('start', 'end') if request.method == 'POST' and request.form.get(key)}
+
+    # Lift list and the selected lift's stats and trends are independent, fetch them concurrently.
+    # Both are aggregated by the backend, so the responses stay the same size however long the lift has been tracked
+    calls = {"lifts": get_lifts}
+    if lift_name:
+        calls["analytics"] = lambda: backend.get("/users/{user_id}/lifts/{lift_name}/analytics", params=date_range, user_id=user_id, lift_name=lift_name)
+        calls["progression"] = lambda: json_or_none(backend.get("/users/{user_id}/lifts/{lift_name}/progression", user_id=user_id, lift_name=lift_name))
+    results = fan_out.run(calls)
+
+    lift_info = results["lifts"]
+    if lift_info is None:
+        flash('Error getting lift information', "danger")
         lift_info = []
 
-    lift_name = None
-    real_record = None
-    max_weight = 0
-    avg_weight = 0
+    analytics = None
+    progression = results.get("progression") # trends are optional, the page renders without them
 
     if request.method == 'POST':
-        lift_name = request.form.get('lift_name')
-
         if not lift_name:
             flash('Please select a lift to track', 'danger')
         else:
-            performance_response = requests.get(f"{BACKEND_URL}/users/{user_id}/lifts/{lift_name}/performance", headers=headers)
-            if performance_response.status_code == 200:
-                real_record = performance_response.json().get('performance_data', [])
-                max_weight = max(real_record, key=lambda x: x['weight_performed'])
-                avg_weight = round(sum(r['weight_performed'] for r in real_record) / len(real_record), 2) if real_record else 0
-
+            analytics_response = results["analytics"]
+            if analytics_response is not None and analytics_response.status_code == 200:
+                analytics = analytics_response.json()
+                if analytics['summary']['sets'] == 0:
+                    analytics = None
+                    flash('No tracked sets for this lift in the selected range, make sure you have tracked this lift', 'danger')
+            elif analytics_response is not None and analytics_response.status_code == 400:
+                flash(analytics_response.json().get('error', 'Invalid date range'), 'danger')
             else:
                 flash('Could not retrieve performance data, make sure you have tracked this lift', 'danger')
 
-    return render_template("advanced_tracking.html", lift_info=lift_info, real_record=real_record, max_weight = max_weight, avg_weight=avg_weight, lift_name=lift_name)
+    return render_template("advanced_tracking.html", lift_info=lift_info, analytics=analytics, progression=progression, lift_name=lift_name, date_range=date_range)
+
+
+# Backend call latency metrics, requires the API key like the backend itself
+@app.route('/internal/backend-metrics')
+def backend_metrics():
+    if request.headers.get('X-API-KEY') != API_KEY:
+        abort(403)
+    return jsonify(backend.metrics())
 
 
 if __name__ == "__main__":
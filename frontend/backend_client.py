@@ -0,0 +1,117 @@
+import threading
+import time
+from urllib.parse import quote
+import requests
+from requests.adapters import HTTPAdapter
+from urllib3.util.retry import Retry
+
+LATENCY_BUCKETS_MS = (5, 10, 25, 50, 100, 250, 500, 1000, 2500) # upper bounds of the latency histogram, last bucket is +inf
+
+
+class BackendUnavailable:
+    """
+    Stand in response returned when the backend could not be reached or timed out, so views can keep handling
+    failures through status codes and response.json() like any other backend error.
+    """
+    status_code = 503
+    ok = False
+
+    def __init__(self, reason):
+        self.reason = reason
+        self.headers = {}
+        self.text = reason
+
+    def json(self):
+        return {"error": "The backend is unavailable, please try again later."}
+
+    def raise_for_status(self):
+        raise requests.HTTPError(f"Backend unavailable: {self.reason}", response=None)
+
+
+class RouteMetrics:
+    """
+    Latency counters for one backend route.
+    """
+    def __init__(self):
+        self.count = 0
+        self.errors = 0 # connection failures and timeouts
+        self.total_ms = 0.0
+        self.max_ms = 0.0
+        self.buckets = [0] * (len(LATENCY_BUCKETS_MS) + 1)
+
+    def record(self, elapsed_ms, failed):
+        self.count += 1
+        self.errors += failed
+        self.total_ms += elapsed_ms
+        self.max_ms = max(self.max_ms, elapsed_ms)
+        self.buckets[next((i for i, bound in enumerate(LATENCY_BUCKETS_MS) if elapsed_ms <= bound), len(LATENCY_BUCKETS_MS))] += 1
+
+    def to_dict(self):
+        return {
+            "count": self.count,
+            "errors": self.errors,
+            "avg_ms": round(self.total_ms / self.count, 2) if self.count else 0,
+            "max_ms": round(self.max_ms, 2),
+            "histogram_ms": dict(zip([str(bound) for bound in LATENCY_BUCKETS_MS] + ["inf"], self.buckets)),
+        }
+
+
+class BackendClient:
+    """
+    Shared HTTP client for every backend call the frontend makes. One keep-alive connection pool sized to the number of worker threads,
+    connect/read timeouts on every call, bounded retries for GETs only (they are idempotent) and per route latency metrics.
+
+    Routes are passed as templates, e.g. backend.get("/users/{user_id}/plans", user_id=3), so metrics group by route rather than by URL.
+    """
+    def __init__(self, base_url, api_key, pool_size=10, connect_timeout=3.05, read_timeout=10, get_retries=2):
+        self.base_url = base_url.rstrip('/')
+        self.timeout = (connect_timeout, read_timeout)
+
+        retry = Retry(
+            total=get_retries,
+            allowed_methods=frozenset(["GET"]),
+            status_forcelist=(502, 503, 504),
+            backoff_factor=0.1,
+            raise_on_status=False,
+        )
+        adapter = HTTPAdapter(pool_connections=1, pool_maxsize=pool_size, max_retries=retry)
+
+        self.session = requests.Session()
+        self.session.mount("http://", adapter)
+        self.session.mount("https://", adapter)
+        self.session.headers["X-API-KEY"] = api_key
+
+        self._metrics = {}
+        self._metrics_lock = threading.Lock()
+
+    def request(self, method, route, params=None, json=None, headers=None, timeout=None, **path_params):
+        url = self.base_url + route.format(**{name: quote(str(value), safe='') for name, value in path_params.items()})
+        start = time.perf_counter()
+        failed = False
+        try:
+            return self.session.request(method, url, params=params, json=json, headers=headers, timeout=timeout or self.timeout)
+        except requests.RequestException as e:
+            failed = True
+            return BackendUnavailable(str(e))
+        finally:
+            self._record(f"{method} {route}", (time.perf_counter() - start) * 1000, failed)
+
+    def get(self, route, **kwargs):
+        return self.request("GET", route, **kwargs)
+
+    def post(self, route, **kwargs):
+        return self.request("POST", route, **kwargs)
+
+    def delete(self, route, **kwargs):
+        return self.request("DELETE", route, **kwargs)
+
+    def _record(self, key, elapsed_ms, failed):
+        with self._metrics_lock:
+            self._metrics.setdefault(key, RouteMetrics()).record(elapsed_ms, failed)
+
+    def metrics(self):
+        """
+        Snapshot of the latency metrics per backend route.
+        """
+        with self._metrics_lock:
+            return {key: route.to_dict() for key, route in sorted(self._metrics.items())}
@@ -0,0 +1,52 @@
+import logging
+import time
+from concurrent.futures import ThreadPoolExecutor, wait
+
+logger = logging.getLogger(__name__) # propagates to the app's handlers; calls run outside the app context, so not app.logger
+
+
+class FanOut:
+    """
+    Runs independent backend calls for one page concurrently, so the page waits for the slowest call instead of the sum of all of them.
+
+    Calls run on a thread pool shared by every request, bounded so a traffic spike cannot open more backend connections than the
+    client's pool holds. All calls of a run share one deadline: a call that raised or is still running when it passes yields None,
+    the same value the cached data funcs return for a failed backend call, and the page renders with what it has. A late call keeps
+    its worker until the backend client's own timeouts end it.
+
+    Calls run outside the Flask request context, so they must not touch session, request or flash.
+    """
+    def __init__(self, max_workers=10, deadline=5.0):
+        self.deadline = deadline
+        self._executor = ThreadPoolExecutor(max_workers=max_workers, thread_name_prefix="backend-fanout")
+
+    def run(self, calls, deadline=None):
+        """
+        Runs calls, a dict of name -> zero argument callable, and returns a dict of name -> result (None if failed or late).
+        """
+        deadline = self.deadline if deadline is None else deadline
+        if len(calls) == 1: # nothing to overlap, skip the thread hop (the client's timeouts still bound it)
+            (name, call), = calls.items()
+            return {name: self._call(name, call)}
+
+        start = time.perf_counter()
+        futures = {name: self._executor.submit(self._call, name, call) for name, call in calls.items()}
+        wait(futures.values(), timeout=deadline)
+
+        results = {}
+        for name, future in futures.items():
+            if future.done():
+                results[name] = future.result()
+            else:
+                future.cancel() # only stops calls still queued behind a busy pool
+                logger.warning("Backend call '%s' missed the %ss page deadline (%.2fs)", name, deadline, time.perf_counter() - start)
+                results[name] = None
+        return results
+
+    @staticmethod
+    def _call(name, call):
+        try:
+            return call()
+        except Exception:
+            logger.exception("Backend call '%s' failed", name)
+            return None
@@ -0,0 +1,76 @@
+import threading
+import time
+from collections import OrderedDict
+
+DEFAULT_TTLS = {
+    "profile": 600, # settings user info
+    "first_name": 600, # shown in page headers
+    "plans": 300,
+    "tracked_dates": 300, # per month calendar highlights
+}
+
+
+class UserCache:
+    """
+    Per user read-through cache of backend data for this frontend process. Entries expire after their resource's TTL and the least
+    recently used users are evicted once max_users is reached. Views invalidate a user's entries whenever that user changes the data,
+    so the TTL only bounds staleness from changes made through another frontend process.
+    """
+    def __init__(self, max_users=1000, ttls=None):
+        self.max_users = max_users
+        self.ttls = dict(DEFAULT_TTLS, **(ttls or {}))
+        self._users = OrderedDict() # user_id -> {key: (expires, value)}, most recently used last
+        self._lock = threading.Lock()
+
+    def peek(self, user_id, resource, key=None):
+        """
+        Cached value for (user_id, resource[, key]) or None if missing or expired.
+        """
+        with self._lock:
+            entries = self._users.get(user_id)
+            if entries is None:
+                return None
+            self._users.move_to_end(user_id)
+            cached = entries.get((resource, key))
+            if cached is not None and cached[0] > time.monotonic():
+                return cached[1]
+            return None
+
+    def put(self, user_id, resource, value, key=None):
+        """
+        Caches a value fetched elsewhere, e.g. one part of a page endpoint response.
+        """
+        with self._lock:
+            entries = self._users.setdefault(user_id, {})
+            self._users.move_to_end(user_id)
+            entries[(resource, key)] = (time.monotonic() + self.ttls[resource], value)
+            while len(self._users) > self.max_users:
+                self._users.popitem(last=False)
+
+    def get_or_fetch(self, user_id, resource, fetch, key=None):
+        """
+        Returns the cached value for (user_id, resource[, key]) or calls fetch() and caches its result.
+        fetch returns None when the backend call failed, failures are never cached.
+        """
+        value = self.peek(user_id, resource, key)
+        if value is not None:
+            return value
+
+        value = fetch() # outside the lock, concurrent misses for the same entry may both fetch
+        if value is not None:
+            self.put(user_id, resource, value, key)
+        return value
+
+    def invalidate(self, user_id, *resources):
+        """
+        Drops the given resources (every key of each) for a user, or everything cached for the user when no resource is given.
+        """
+        with self._lock:
+            entries = self._users.get(user_id)
+            if entries is None:
+                return
+            if not resources:
+                del self._users[user_id]
+                return
+            for cache_key in [cache_key for cache_key in entries if cache_key[0] in resources]:
+                del entries[cache_key]